@@ -0,0 +1,226 @@
+import queue
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from logger_config import logger
+from instrumentation import stage_timings
+from metrics import alerts, alert_messages, alert_retries, alert_rate_limited
+from initial_config import TELEGRAM_API_URL, TELEGRAM_RATE_LIMIT, TELEGRAM_BURST, TELEGRAM_GLOBAL_RATE_LIMIT, TELEGRAM_BATCH_WINDOW, TELEGRAM_MAX_RETRIES
+
+# Largo máximo de un mensaje de Telegram
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n➖➖➖➖➖➖➖➖\n\n"
+# Marca en la cola para enviar lo acumulado del ciclo sin esperar la ventana de agrupación
+END_OF_CYCLE = object()
+# Latencias guardadas para calcular percentiles
+LATENCY_SAMPLES = 1000
+
+
+# Limitador de tasa: `rate` mensajes por segundo con ráfagas de hasta `capacity`
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+
+    # Segundos a esperar hasta tener un token disponible (0 si ya hay uno)
+    def _wait_time(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait = self._wait_time()
+        while wait > 0:
+            self.sleep(wait)
+            wait = self._wait_time()
+        self.tokens -= 1
+
+
+# Envío de alertas a Telegram en segundo plano.
+# Las alertas se encolan sin bloquear el análisis; un hilo las agrupa en un único mensaje
+# por chat (todas las del mismo ciclo o las que llegan dentro de batch_window segundos),
+# respeta el límite de mensajes por chat y global, y reintenta los 429 y errores de red.
+class AlertDispatcher:
+    def __init__(self, token, api_url=TELEGRAM_API_URL, rate_limit=TELEGRAM_RATE_LIMIT, burst=TELEGRAM_BURST,
+                 global_rate_limit=TELEGRAM_GLOBAL_RATE_LIMIT, batch_window=TELEGRAM_BATCH_WINDOW,
+                 max_retries=TELEGRAM_MAX_RETRIES, timeout=10):
+        self.url = f"{api_url}/bot{token}/sendMessage"
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        # Sesión con conexiones reutilizables (keep-alive) para todos los envíos
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        self.global_bucket = TokenBucket(global_rate_limit, global_rate_limit)
+        self.chat_buckets = {}
+        self.queue = queue.Queue()
+        self.stats_lock = threading.Lock()
+        self.counters = {'queued': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0, 'messages': 0}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+        self.thread = threading.Thread(target=self._run, name='telegram-dispatcher', daemon=True)
+        self.thread.start()
+
+    # Encolar una alerta sin bloquear
+    def submit(self, chat_id, text, parse_mode="Markdown"):
+        with self.stats_lock:
+            self.counters['queued'] += 1
+        self.queue.put((chat_id, text, parse_mode, time.monotonic()))
+
+    # Enviar ya lo acumulado en el ciclo actual
+    def end_cycle(self):
+        self.queue.put(END_OF_CYCLE)
+
+    # Esperar a que se entreguen (o fallen) todas las alertas encoladas.
+    # Devuelve False si vence `timeout` con alertas todavía pendientes.
+    def flush(self, timeout=None):
+        self.end_cycle()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    # Contadores y percentiles de latencia (numpy se carga recién al consultarlos)
+    def stats(self):
+        import numpy as np
+        with self.stats_lock:
+            stats = dict(self.counters)
+            latencies = np.array(self.latencies)
+        stats['pending'] = self.queue.qsize()
+        for percentile in (50, 95, 99):
+            stats[f'latency_p{percentile}'] = float(np.percentile(latencies, percentile)) if len(latencies) else None
+        return stats
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                logger.error(f"Error en el envío de alertas a Telegram: {e}")
+            finally:
+                for _ in range(batch['items']):
+                    self.queue.task_done()
+
+    # Esperar la primera alerta y juntar las siguientes hasta el fin de ciclo o la ventana de agrupación
+    def _next_batch(self):
+        alerts = {}
+        items = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is END_OF_CYCLE:
+                self.queue.task_done()
+                if alerts:
+                    break
+                continue
+            items += 1
+            chat_id, text, parse_mode, queued_at = item
+            alerts.setdefault((chat_id, parse_mode), []).append((text, queued_at))
+            if deadline is None:
+                deadline = time.monotonic() + self.batch_window
+        return {'alerts': alerts, 'items': items}
+
+    def _deliver(self, batch):
+        for (chat_id, parse_mode), chat_alerts in batch['alerts'].items():
+            for message, queued in _coalesce(chat_alerts):
+                delivered = self._send(chat_id, message, parse_mode)
+                now = time.monotonic()
+                with self.stats_lock:
+                    self.counters['messages'] += 1
+                    if delivered:
+                        self.counters['sent'] += len(queued)
+                        self.latencies.extend(now - queued_at for queued_at in queued)
+                    else:
+                        self.counters['failed'] += len(queued)
+                alert_messages.inc()
+                alerts.labels('sent' if delivered else 'failed').inc(len(queued))
+
+    def _chat_bucket(self, chat_id):
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.rate_limit, self.burst)
+        return self.chat_buckets[chat_id]
+
+    # Enviar un mensaje respetando los límites y reintentando 429, 5xx y errores de red
+    def _send(self, chat_id, message, parse_mode):
+        payload = {"chat_id": chat_id, "text": message, "parse_mode": parse_mode}
+        for attempt in range(self.max_retries + 1):
+            self._chat_bucket(chat_id).acquire()
+            self.global_bucket.acquire()
+            try:
+                with stage_timings.stage('telegram'):
+                    response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.warning(f"Error de red al enviar alerta a Telegram: {e}")
+                retry_after = 2 ** attempt
+            else:
+                if response.status_code == 200:
+                    logger.info(f"Alerta enviada a Telegram")
+                    return True
+                if response.status_code == 429:
+                    with self.stats_lock:
+                        self.counters['rate_limited'] += 1
+                    alert_rate_limited.inc()
+                    retry_after = _retry_after(response, 2 ** attempt)
+                elif response.status_code >= 500:
+                    retry_after = 2 ** attempt
+                else:
+                    logger.error(f"Error al enviar alerta a Telegram: {response.status_code} - {response.text}")
+                    return False
+            if attempt < self.max_retries:
+                with self.stats_lock:
+                    self.counters['retries'] += 1
+                alert_retries.inc()
+                time.sleep(retry_after)
+        logger.error(f"Alerta a Telegram descartada tras {self.max_retries} reintentos")
+        return False
+
+
+# Segundos de espera indicados por Telegram en una respuesta 429
+def _retry_after(response, default):
+    try:
+        return float(response.json()['parameters']['retry_after'])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return default
+
+
+# Unir las alertas [(texto, encolada)] en la menor cantidad de mensajes sin superar el largo
+# máximo. Devuelve [(mensaje, [encolada de cada alerta incluida])].
+def _coalesce(alerts):
+    messages = []
+    current, queued = "", []
+    for text, queued_at in alerts:
+        text = text[:MAX_MESSAGE_LENGTH]
+        candidate = f"{current}{MESSAGE_SEPARATOR}{text}" if current else text
+        if len(candidate) > MAX_MESSAGE_LENGTH:
+            messages.append((current, queued))
+            candidate, queued = text, []
+        current = candidate
+        queued.append(queued_at)
+    if current:
+        messages.append((current, queued))
+    return messages
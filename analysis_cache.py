@@ -0,0 +1,62 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from strategy_params import resolve_params
+from initial_config import ANALYSIS_CACHE_SIZE
+
+
+# Hash corto y estable de los parámetros de la estrategia (parte de la clave de caché)
+def params_hash(params=None):
+    encoded = json.dumps(resolve_params(params), sort_keys=True).encode()
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+# Resultados de análisis por (símbolo, timeframe, última vela cerrada, hash de parámetros).
+# Mientras no cierre una vela nueva el resultado se reutiliza sin recalcular indicadores.
+# Guarda hasta max_entries resultados y descarta el usado hace más tiempo (LRU).
+class AnalysisCache:
+    def __init__(self, max_entries=ANALYSIS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Última alerta enviada por símbolo para no repetir la misma señal
+class AlertTracker:
+    def __init__(self):
+        self.last = {}
+        self.lock = threading.Lock()
+
+    # True si `signature` (vela, señales, explicaciones) difiere de la última alerta de `key`
+    def should_alert(self, key, signature):
+        with self.lock:
+            if self.last.get(key) == signature:
+                return False
+            self.last[key] = signature
+            return True
@@ -1,5 +1,10 @@
-from flask import Flask, jsonify, request
-from bot import main
+import threading
+from flask import Flask, Response, jsonify, request
+from snapshot import signal_snapshot, normalize_symbol, filter_signals, filter_levels
+from initial_config import SYMBOLS, SERVER_BACKGROUND_SCAN, SERVERLESS, SERVERLESS_FLUSH_TIMEOUT
+from api_telegram import TELEGRAM_ENABLED, get_dispatcher
+from job_queue import JobQueue, QueueFullError
+from metrics import REGISTRY, CONTENT_TYPE, CallbackMetric
 from logger_config import logger
 
 app = Flask(__name__)
@@ -19,22 +24,130 @@ def home():
         logger.error(f"Error in bot execution: {e}")
         return jsonify({"error": str(e)}), 500
 
+# Enviar el resultado del análisis a cada chat que lo pidió
+def notify_job(job):
+    if not TELEGRAM_ENABLED:
+        return
+    if job.status == 'done':
+        lines = ["*Resultado del análisis*"]
+        for summary in job.result:
+            signals = ', '.join(summary['signals']) if summary['signals'] else 'sin señales claras'
+            lines.append(f"• *{summary['symbol']}* {summary['price']:.2f} USD: {signals}")
+        message = "\n".join(lines)
+    else:
+        message = f"No se pudo completar el análisis: {job.error}"
+    for chat_id in dict.fromkeys(job.requesters):
+        if chat_id is not None:
+            get_dispatcher().submit(chat_id, message)
+
+# El bot (pandas, ta, ccxt) se importa en el primer análisis: en un arranque en frío el
+# servidor sólo carga lo necesario para responder desde el snapshot
+def run_analysis(symbols):
+    from bot import main
+    return main(symbols=symbols)
+
+# Análisis pedidos por el webhook: se ejecutan en segundo plano y los pedidos
+# simultáneos para los mismos símbolos comparten una única ejecución. En serverless no hay
+# proceso que siga vivo después de responder: se ejecutan dentro del pedido.
+jobs = JobQueue(run_analysis, on_done=notify_job, inline=SERVERLESS)
+
+CallbackMetric('jobs', 'Análisis pedidos por el webhook por estado', 'gauge',
+               lambda: {(status,): count for status, count in jobs.stats().items()}, ['status'])
+
+# Símbolos mencionados en el mensaje (todos si no menciona ninguno)
+def requested_symbols(message_text):
+    text = message_text.upper()
+    symbols = [symbol for symbol in SYMBOLS if symbol in text or symbol.split('/')[0] in text.split()]
+    return symbols or list(SYMBOLS)
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
-    data = request.get_json()
-    print (f"Datos recibidos: {data}")
+    data = request.get_json(silent=True) or {}
+    message = data.get('message')
+    if not message:
+        return "OK", 200
+
+    message_text = message.get('text', '')
+    user_id = message['from']['id']
+    username = message['from'].get('username', '')
+    first_name = message['from'].get('first_name', '')
+    chat_id = message.get('chat', {}).get('id', user_id)
+    logger.info(f"Mensaje de {username} (ID: {user_id}, Nombre: {first_name}): {message_text}")
+
+    symbols = requested_symbols(message_text)
+    try:
+        job, coalesced = jobs.submit(tuple(symbols), symbols, requester=chat_id)
+    except QueueFullError as e:
+        logger.warning(str(e))
+        return jsonify({"error": str(e)}), 503, {'Retry-After': '30'}
 
-    message_text = data['message']['text']
-    user_id = data['message']['from']['id']
-    username = data['message']['from'].get('username', '')
-    first_name = data['message']['from'].get('first_name', '')
+    if jobs.inline and TELEGRAM_ENABLED:
+        # Entregar las respuestas antes de que se congele el proceso
+        if not get_dispatcher().flush(SERVERLESS_FLUSH_TIMEOUT):
+            logger.warning(f"Alertas sin entregar tras {SERVERLESS_FLUSH_TIMEOUT}s")
+    return jsonify({"job_id": job.id, "status": job.status, "coalesced": coalesced}), 200
 
-    print (f"ID del usuario: {user_id}")
-    print(f"Mensaje: {message_text}")
-    print(f"Usuario: {username} (ID: {user_id}, Nombre: {first_name})")
-    main()
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(job.to_dict())
+
+# Responder desde el snapshot actual con ETag; 304 si el cliente ya tiene esta versión
+def snapshot_response(snapshot, key, build):
+    headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
+    if request.if_none_match.contains_weak(snapshot.etag.strip('"')):
+        return Response(status=304, headers=headers)
+    return Response(snapshot.body(key, build), mimetype='application/json', headers=headers)
+
+@app.route('/signals')
+def signals():
+    snapshot = signal_snapshot.get()
+    signal = request.args.get('signal', '').upper() or None
+    symbols = tuple(normalize_symbol(symbol, SYMBOLS) for symbol in request.args.get('symbols', '').split(',') if symbol)
+    try:
+        min_signals = int(request.args.get('min_signals', 0))
+    except ValueError:
+        return jsonify({"error": "min_signals debe ser un entero"}), 400
+
+    def build(snapshot):
+        return {
+            'version': snapshot.version,
+            'updated': snapshot.updated,
+            'signals': filter_signals(snapshot, signal, symbols, min_signals),
+        }
+    return snapshot_response(snapshot, ('signals', signal, symbols, min_signals), build)
+
+@app.route('/signals/<path:symbol>')
+def symbol_signals(symbol):
+    snapshot = signal_snapshot.get()
+    symbol = normalize_symbol(symbol, SYMBOLS)
+    if symbol not in snapshot.symbols:
+        return jsonify({"error": "Símbolo sin análisis"}), 404
+    return snapshot_response(snapshot, ('symbol', symbol), lambda snapshot: snapshot.symbols[symbol])
+
+@app.route('/levels/<path:symbol>')
+def symbol_levels(symbol):
+    snapshot = signal_snapshot.get()
+    symbol = normalize_symbol(symbol, SYMBOLS)
+    if symbol not in snapshot.symbols:
+        return jsonify({"error": "Símbolo sin análisis"}), 404
+    try:
+        max_distance = float(request.args['max_distance']) if 'max_distance' in request.args else None
+    except ValueError:
+        return jsonify({"error": "max_distance debe ser un número"}), 400
+    return snapshot_response(snapshot, ('levels', symbol, max_distance),
+                             lambda snapshot: filter_levels(snapshot.symbols[symbol], max_distance))
 
-    return "OK", 200
+# Métricas en formato de texto de Prometheus
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 if __name__ == '__main__':
+    if SERVER_BACKGROUND_SCAN:
+        from bot import run_on_candle_close
+        # Mantener el snapshot actualizado analizando en cada cierre de vela
+        threading.Thread(target=run_on_candle_close, name='scan-loop', daemon=True).start()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -1,16 +1,47 @@
+import atexit
 from datetime import datetime
 from colorama import Fore, Style
 import requests
 from env import TELEGRAM_CHAT_ID, TELEGRAM_TOKEN
 from logger_config import logger
+from alert_dispatcher import AlertDispatcher
+from instrumentation import stage_timings
+from metrics import alerts, alert_messages, CallbackMetric
+from initial_config import TELEGRAM_ASYNC, TELEGRAM_API_URL, OUTPUT_MODE
 
 TELEGRAM_ENABLED = TELEGRAM_TOKEN is not None and TELEGRAM_CHAT_ID is not None
+# Sin salida de terminal en el modo headless (ver OUTPUT_MODE)
+HEADLESS = OUTPUT_MODE == 'headless'
+
+# Sesión HTTP reutilizada por los envíos bloqueantes
+session = requests.Session()
+# Despachador en segundo plano, creado con la primera alerta
+dispatcher = None
+
+def get_dispatcher():
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = AlertDispatcher(TELEGRAM_TOKEN)
+        # Entregar las alertas pendientes antes de salir
+        atexit.register(dispatcher.flush, 30)
+    return dispatcher
+
+# Alertas encoladas todavía sin entregar
+CallbackMetric('telegram_alerts_pending', 'Alertas en la cola de envío', 'gauge',
+               lambda: dispatcher.queue.qsize() if dispatcher is not None else 0)
+
+# Enviar juntas las alertas acumuladas en el ciclo de análisis
+def end_alert_cycle():
+    if dispatcher is not None:
+        dispatcher.end_cycle()
     
 def send_telegram_alert(symbol, signal_type, price, explanations, telegram_chatid = TELEGRAM_CHAT_ID):
     if TELEGRAM_ENABLED:
-        print(f"{Fore.GREEN}Alertas Telegram activadas - Envío a chat ID: {TELEGRAM_CHAT_ID}{Style.RESET_ALL}")
+        if not HEADLESS:
+            print(f"{Fore.GREEN}Alertas Telegram activadas - Envío a chat ID: {TELEGRAM_CHAT_ID}{Style.RESET_ALL}")
     else:
-        print(f"{Fore.YELLOW}Alertas Telegram desactivadas - Configure TELEGRAM_TOKEN y TELEGRAM_CHAT_ID en .env para activar{Style.RESET_ALL}")
+        if not HEADLESS:
+            print(f"{Fore.YELLOW}Alertas Telegram desactivadas - Configure TELEGRAM_TOKEN y TELEGRAM_CHAT_ID en .env para activar{Style.RESET_ALL}")
         return False
     
     try:
@@ -34,24 +65,31 @@ def send_telegram_alert(symbol, signal_type, price, explanations, telegram_chati
         
         message += f"\n*Fecha y hora:* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
 
-        send_msg(telegram_chatid, message)
+        if TELEGRAM_ASYNC:
+            get_dispatcher().submit(telegram_chatid, message)
+        else:
+            send_msg(telegram_chatid, message)
         return True
     except Exception as e:
         logger.error(f"Error al enviar alerta a Telegram: {e}")
         return False
     
 def send_msg(telegram_chatid, message):
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
+        url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_TOKEN}/sendMessage"
         payload = {
             "chat_id": telegram_chatid,
             "text": message,
             "parse_mode": "Markdown"
         }
-        response = requests.post(url, json=payload)
+        with stage_timings.stage('telegram'):
+            response = session.post(url, json=payload, timeout=10)
         
+        alert_messages.inc()
         if response.status_code == 200:
             logger.info(f"Alerta enviada a Telegram")
+            alerts.labels('sent').inc()
             return True
         else:
             logger.error(f"Error al enviar alerta a Telegram: {response.status_code} - {response.text}")
+            alerts.labels('failed').inc()
             return False
\ No newline at end of file
@@ -1,51 +1,81 @@
+import hashlib
+import json
+import time
 from colorama import Fore, Style
+import numpy as np
 import pandas as pd
 from bot import SYMBOLS, TIMEFRAME, apply_technical_indicators, get_historical_data, identify_key_levels, analyze_signals, init_exchange
 from plt_graph import generate_plt
+from vectorized_signals import compute_signal_counts, key_level_counts, last_break_levels, pivot_confirmation_lag
+from candle_store import candle_store
+from metrics import fetch_ohlcv, backtest_runs, backtest_duration, backtest_signals
+from trade_simulator import simulate_trades
+from parallel_backtest import parallel_indicators, resumed_indicators
+from backtest_store import backtest_store, format_ms
+from strategy_params import resolve_params
+from indicator_registry import enabled_rules
+from initial_config import (KEY_LEVELS_CLUSTER, KEY_LEVELS_LOOKBACK, KEY_LEVELS_TOLERANCE, PIVOT_WINDOW, CANDLE_STORE_ENABLED,
+                            BACKTEST_PROCESSES, BACKTEST_CHUNK_WARMUP, BACKTEST_CHECKPOINT_CANDLES)
 
 BACKTEST_MODE = True
+BACKTEST_VECTORIZED = True  # Calcular indicadores una sola vez y evaluar las señales como máscaras
+BACKTEST_SIMULATE = True  # Simular operaciones con stop-loss, take-profit y comisiones (modo vectorizado, ver SIM_*)
+BACKTEST_INCREMENTAL = True  # Guardar los resultados (BACKTEST_STORE_PATH) y procesar sólo las velas nuevas
 BACKTEST_START_DATE = '2025-05-01'
 BACKTEST_END_DATE = '2025-05-01'
 BACKTEST_RESULTS = []
 
-def run_backtest(exchange, symbol, timeframe, start_date, end_date):
+# Velas iniciales necesarias para los indicadores y velas finales reservadas para evaluar resultados
+BACKTEST_WARMUP = 100
+BACKTEST_TAIL = 20
+# Velas hacia adelante y movimiento mínimo para considerar exitosa una señal
+OUTCOME_HORIZON = 10
+OUTCOME_TARGET = 0.01
+
+# Obtener datos históricos para el período completo del backtesting
+def fetch_backtest_data(exchange, symbol, timeframe, start_date, end_date):
+    # Convertir fechas a timestamps
+    start_timestamp = int(pd.to_datetime(start_date).timestamp() * 1000)
+    end_timestamp = int(pd.to_datetime(end_date).timestamp() * 1000)
+
+    if CANDLE_STORE_ENABLED:
+        # Sólo se descargan las velas que todavía no están en el almacén local
+        return candle_store.get_range(exchange, symbol, timeframe, start_timestamp, end_timestamp)
+
+    ohlcv = fetch_ohlcv(exchange, symbol, timeframe, since=start_timestamp, limit=1000)
+    all_data = []
+
+    # Si necesitamos más datos, hacemos múltiples solicitudes
+    while ohlcv and ohlcv[-1][0] < end_timestamp:
+        all_data.extend(ohlcv)
+        last_timestamp = ohlcv[-1][0]
+        ohlcv = fetch_ohlcv(exchange, symbol, timeframe, since=last_timestamp + 1, limit=1000)
+
+    # Filtrar sólo los datos dentro del rango
+    filtered_data = [candle for candle in all_data if start_timestamp <= candle[0] <= end_timestamp]
+
+    # Convertir a DataFrame
+    df = pd.DataFrame(filtered_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('timestamp', inplace=True)
+    return df
+
+def run_backtest(exchange, symbol, timeframe, start_date, end_date, df=None):
     print(f"{Fore.CYAN}{Style.BRIGHT}Ejecutando backtesting para {symbol} desde {start_date} hasta {end_date}...{Style.RESET_ALL}")
     
     try:
-        # Convertir fechas a timestamps
-        start_timestamp = int(pd.to_datetime(start_date).timestamp() * 1000)
-        end_timestamp = int(pd.to_datetime(end_date).timestamp() * 1000)
-        
-        # Obtener datos históricos para el período completo
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=start_timestamp, limit=1000)
-        all_data = []
-        
-        # Si necesitamos más datos, hacemos múltiples solicitudes
-        while ohlcv and ohlcv[-1][0] < end_timestamp:
-            all_data.extend(ohlcv)
-            last_timestamp = ohlcv[-1][0]
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=last_timestamp + 1, limit=1000)
-        
-        # Filtrar sólo los datos dentro del rango
-        filtered_data = [candle for candle in all_data if start_timestamp <= candle[0] <= end_timestamp]
-        print("first good")
-        # Convertir a DataFrame
-        df = pd.DataFrame(filtered_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        print("first good37")
+        if df is None:
+            df = fetch_backtest_data(exchange, symbol, timeframe, start_date, end_date)
 
         results = []
-        signals_count = {'LONG': 0, 'SHORT': 0}
-        successful_signals = {'LONG': 0, 'SHORT': 0}
+        started = time.perf_counter()
         
         # Procesar cada punto de tiempo como si fuera "ahora"
-        for i in range(100, len(df) - 20):  # Empezamos después de suficientes datos para indicadores y dejamos margen para evaluar
+        for i in range(BACKTEST_WARMUP, len(df) - BACKTEST_TAIL):  # Empezamos después de suficientes datos para indicadores y dejamos margen para evaluar
             current_df = df.iloc[:i+1].copy()
             
             # Calcular indicadores
             current_df = apply_technical_indicators(current_df)
-            print("first good49")
 
             # Identificar soportes/resistencias
             key_levels = identify_key_levels(current_df)
@@ -60,7 +90,6 @@ def run_backtest(exchange, symbol, timeframe, start_date, end_date):
             # Si tenemos una señal clara
             if long_count >= 2 and long_count > short_count:
                 signal = "LONG"
-                signals_count['LONG'] += 1
                 entry_price = current_df['close'].iloc[-1]
                 
                 # Evaluar resultado (miramos 10 velas adelante)
@@ -69,7 +98,6 @@ def run_backtest(exchange, symbol, timeframe, start_date, end_date):
                     max_price = future_prices.max()
                     # Si el precio subió al menos un 1%
                     if max_price >= entry_price * 1.01:
-                        successful_signals['LONG'] += 1
                         success = True
                     else:
                         success = False
@@ -85,7 +113,6 @@ def run_backtest(exchange, symbol, timeframe, start_date, end_date):
             
             elif short_count >= 2 and short_count > long_count:
                 signal = "SHORT"
-                signals_count['SHORT'] += 1
                 entry_price = current_df['close'].iloc[-1]
                 
                 # Evaluar resultado (miramos 10 velas adelante)
@@ -94,7 +121,6 @@ def run_backtest(exchange, symbol, timeframe, start_date, end_date):
                     min_price = future_prices.min()
                     # Si el precio bajó al menos un 1%
                     if min_price <= entry_price * 0.99:
-                        successful_signals['SHORT'] += 1
                         success = True
                     else:
                         success = False
@@ -109,55 +135,282 @@ def run_backtest(exchange, symbol, timeframe, start_date, end_date):
                     })
         # Convertir resultados a DataFrame
         results_df = pd.DataFrame(results)
-        
-        # Calcular estadísticas
-        if not results_df.empty:
-            total_signals = signals_count['LONG'] + signals_count['SHORT']
-            total_successful = successful_signals['LONG'] + successful_signals['SHORT']
-            
-            success_rate = (total_successful / total_signals) * 100 if total_signals > 0 else 0
-            
-            long_success_rate = (successful_signals['LONG'] / signals_count['LONG']) * 100 if signals_count['LONG'] > 0 else 0
-            short_success_rate = (successful_signals['SHORT'] / signals_count['SHORT']) * 100 if signals_count['SHORT'] > 0 else 0
-            
-            avg_profit = results_df['profit_potential'].mean() if 'profit_potential' in results_df.columns else 0
-            
-            # Mostrar resultados
-            print("\n" + "="*80)
-            print(f"{Fore.CYAN}{Style.BRIGHT}RESULTADOS DEL BACKTESTING PARA {symbol}{Style.RESET_ALL}")
-            print("="*80)
-            print(f"Período: {start_date} a {end_date}")
-            print(f"Timeframe: {timeframe}")
-            print(f"Total señales generadas: {total_signals}")
-            print(f"  - Señales LONG: {signals_count['LONG']}")
-            print(f"  - Señales SHORT: {signals_count['SHORT']}")
-            print("-"*80)
-            print(f"{Fore.GREEN}Tasa de éxito global: {success_rate:.2f}%{Style.RESET_ALL}")
-            print(f"  - Tasa éxito LONG: {long_success_rate:.2f}%")
-            print(f"  - Tasa éxito SHORT: {short_success_rate:.2f}%")
-            print(f"Potencial de beneficio promedio: {avg_profit:.2f}%")
-            print("="*80)
-            
-            return results_df
-        else:
-            print(f"{Fore.YELLOW}No se generaron señales durante el período de backtesting{Style.RESET_ALL}")
-            return None
+        record_backtest('loop', started, results_df)
+        return print_backtest_summary(symbol, timeframe, start_date, end_date, results_df)
             
     except Exception as e:
         print(f"{Fore.RED}Error durante el backtesting: {e}{Style.RESET_ALL}")
         return None
     
-if BACKTEST_MODE:
+# Backtesting vectorizado: indicadores calculados una sola vez sobre todo el historial
+# y reglas de analyze_signals evaluadas como máscaras, sin mirar velas futuras
+def run_backtest_vectorized(exchange, symbol, timeframe, start_date, end_date, df=None):
+    print(f"{Fore.CYAN}{Style.BRIGHT}Ejecutando backtesting vectorizado para {symbol} desde {start_date} hasta {end_date}...{Style.RESET_ALL}")
+
+    try:
+        if df is None:
+            df = fetch_backtest_data(exchange, symbol, timeframe, start_date, end_date)
+        if len(df) <= BACKTEST_WARMUP + BACKTEST_TAIL:
+            return print_backtest_summary(symbol, timeframe, start_date, end_date, pd.DataFrame())
+        started = time.perf_counter()
+        df = backtest_indicators(df)
+        counts = compute_signal_counts(df)
+        results_df = evaluate_signal_outcomes(df, counts)
+        record_backtest('vectorized', started, results_df)
+        if BACKTEST_SIMULATE:
+            candles_with_signal, is_long = signal_candles(counts, len(df))
+            simulation = simulate_trades(df, candles_with_signal, is_long, timeframe=timeframe)
+            print_simulation_summary(symbol, simulation['stats'])
+        return print_backtest_summary(symbol, timeframe, start_date, end_date, results_df)
+
+    except Exception as e:
+        print(f"{Fore.RED}Error durante el backtesting: {e}{Style.RESET_ALL}")
+        return None
+
+# Indicadores del backtesting vectorizado sobre una copia de df
+def backtest_indicators(df):
+    if BACKTEST_PROCESSES > 0:
+        # Indicadores recursivos por bloques de tiempo en varios procesos (mismo resultado)
+        return parallel_indicators(df)
+    return apply_technical_indicators(df.copy())
+
+# Configuración de la que dependen las señales evaluadas (clave de los resultados guardados)
+def backtest_config():
+    return {
+        'params': resolve_params(),
+        'rules': sorted(enabled_rules()),
+        'key_levels': [KEY_LEVELS_LOOKBACK, KEY_LEVELS_TOLERANCE, PIVOT_WINDOW],
+        'candles': [BACKTEST_WARMUP, BACKTEST_TAIL],
+        'outcome': [OUTCOME_HORIZON, OUTCOME_TARGET],
+    }
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+# Backtesting vectorizado incremental: las señales evaluadas se guardan en backtest_store por
+# (símbolo, timeframe, configuración, fecha de inicio) junto con la última vela procesada.
+# Al extender el período sólo se procesan las velas nuevas, en bloques de
+# BACKTEST_CHECKPOINT_CANDLES que se guardan al terminar cada uno, por lo que una ejecución
+# cortada se retoma desde el último bloque guardado. Las estadísticas quedan guardadas para
+# comparar ejecuciones (python backtest_store.py).
+def run_backtest_incremental(exchange, symbol, timeframe, start_date, end_date, df=None, store=backtest_store):
+    print(f"{Fore.CYAN}{Style.BRIGHT}Ejecutando backtesting incremental para {symbol} desde {start_date} hasta {end_date}...{Style.RESET_ALL}")
+
+    try:
+        if df is None:
+            df = fetch_backtest_data(exchange, symbol, timeframe, start_date, end_date)
+        if len(df) <= BACKTEST_WARMUP + BACKTEST_TAIL:
+            return print_backtest_summary(symbol, timeframe, start_date, end_date, pd.DataFrame())
+        started = time.perf_counter()
+        timestamps = df.index.as_unit('ms').asi8
+        start = int(pd.to_datetime(start_date).timestamp() * 1000)
+        end = int(pd.to_datetime(end_date).timestamp() * 1000)
+
+        config = backtest_config()
+        run = store.get_run(symbol, timeframe, config_hash(config), start)
+        if run is None:
+            run = store.create_run(symbol, timeframe, config_hash(config), config, start, end, int(timestamps[0]))
+        elif run['first_candle'] != timestamps[0]:
+            # Cambió la primera vela y con ella la posición de todas: se procesa de nuevo
+            store.reset_run(run['id'], int(timestamps[0]))
+            run = store.get_run(symbol, timeframe, config_hash(config), start)
+
+        resumed = run['processed_until'] is not None
+        first = BACKTEST_WARMUP
+        if resumed:
+            first = max(first, int(np.searchsorted(timestamps, run['processed_until'], side='right')))
+        stop = len(df) - BACKTEST_TAIL
+        # Un período más corto que el guardado se lee sin reemplazar las estadísticas de la ejecución
+        covers_run = not resumed or timestamps[stop - 1] >= run['processed_until']
+        breaks = tuple(np.nan if value is None else value for value in (run['last_resistance_break'], run['last_support_break']))
+        if first < stop:
+            print(f"Procesando {stop - first} velas desde {format_ms(timestamps[first])} (ejecución #{run['id']})")
+        else:
+            print(f"Sin velas nuevas: resultados guardados hasta {format_ms(run['processed_until'])} (ejecución #{run['id']})")
+
+        computed = []
+        for block_start in range(first, stop, BACKTEST_CHECKPOINT_CANDLES):
+            block_stop = min(block_start + BACKTEST_CHECKPOINT_CANDLES, stop)
+            block_results, breaks = evaluate_backtest_block(df, block_start, block_stop, resumed, breaks)
+            store.save_progress(run['id'], block_results, int(timestamps[block_stop - 1]), end, breaks)
+            computed.append(block_results)
+            resumed = True
+        record_backtest('incremental', started, pd.concat(computed) if computed else pd.DataFrame())
+
+        # Señales de todo el período leídas del almacén (las guardadas más las nuevas)
+        results_df = store.results(run['id'], until=int(timestamps[stop - 1]))
+        if not results_df.empty:
+            stats = backtest_stats(results_df)
+            if BACKTEST_SIMULATE:
+                entries = np.searchsorted(timestamps, results_df['date'].dt.as_unit('ms').astype('int64').to_numpy())
+                simulation = simulate_trades(df, entries, (results_df['signal'] == 'LONG').to_numpy(), timeframe=timeframe)
+                print_simulation_summary(symbol, simulation['stats'])
+                stats['simulation'] = simulation['stats']
+            if covers_run:
+                store.save_stats(run['id'], stats)
+        return print_backtest_summary(symbol, timeframe, start_date, end_date, results_df)
+
+    except Exception as e:
+        print(f"{Fore.RED}Error durante el backtesting: {e}{Style.RESET_ALL}")
+        return None
+
+# Evaluar las velas [start, stop) de df. Al retomar, los indicadores recursivos se calculan
+# desde BACKTEST_CHUNK_WARMUP velas antes y las ventanas móviles sobre todo el prefijo (mismo
+# resultado que una ejecución completa); las
+# rupturas de niveles anteriores al bloque llegan en `breaks` (resistencia, soporte).
+# Devuelve los resultados y las últimas rupturas visibles en la vela stop - 1.
+def evaluate_backtest_block(df, start, stop, resumed, breaks):
+    offset = max(0, start - BACKTEST_CHUNK_WARMUP) if resumed else 0
+    if resumed:
+        # Mismos indicadores que una ejecución completa, desde BACKTEST_CHUNK_WARMUP velas antes
+        block = resumed_indicators(df.iloc[:stop + BACKTEST_TAIL], start)
+    else:
+        block = backtest_indicators(df.iloc[:stop + BACKTEST_TAIL])
+    levels_near = None
+    if 'key_levels' in enabled_rules():
+        # Sin retomar cuentan todas las rupturas del bloque, que empieza en la primera vela
+        since = start - offset - pivot_confirmation_lag() + 1 if resumed else 0
+        break_levels = last_break_levels(block, since, breaks if resumed else (np.nan, np.nan))
+        levels_near = key_level_counts(block, break_levels)
+        breaks = (break_levels[0][stop - offset - 1], break_levels[1][stop - offset - 1])
+    counts = compute_signal_counts(block, levels_near=levels_near)
+    return evaluate_signal_outcomes(block, counts, start - offset, stop - offset), breaks
+
+# Velas con una señal clara (al menos 2 señales y más que las contrarias) entre el
+# calentamiento y las velas finales reservadas (o entre `start` y `stop`), y si la señal es LONG
+def signal_candles(counts, rows, start=BACKTEST_WARMUP, stop=None):
+    long_count = counts['long_count'].to_numpy()
+    short_count = counts['short_count'].to_numpy()
+
+    stop = rows - BACKTEST_TAIL if stop is None else stop
+    candles = np.arange(start, max(start, stop))
+    is_long = (long_count[candles] >= 2) & (long_count[candles] > short_count[candles])
+    is_short = (short_count[candles] >= 2) & (short_count[candles] > long_count[candles])
+    return candles[is_long | is_short], is_long[is_long | is_short]
+
+# Convertir los conteos LONG/SHORT por vela en resultados evaluados OUTCOME_HORIZON velas adelante
+def evaluate_signal_outcomes(df, counts, start=BACKTEST_WARMUP, stop=None):
+    close = df['close'].to_numpy(dtype=float)
+    candles_with_signal, is_long = signal_candles(counts, len(df), start, stop)
+
+    if len(candles_with_signal) == 0:
+        return pd.DataFrame()
+
+    # Ventana de cierres futuros [i+1, i+OUTCOME_HORIZON] para cada vela con señal
+    future = np.lib.stride_tricks.sliding_window_view(close[1:], OUTCOME_HORIZON)[candles_with_signal]
+    entry_price = close[candles_with_signal]
+    max_price = future.max(axis=1)
+    min_price = future.min(axis=1)
+
+    return pd.DataFrame({
+        'date': df.index[candles_with_signal],
+        'signal': np.where(is_long, 'LONG', 'SHORT'),
+        'entry_price': entry_price,
+        'max_future_price': np.where(is_long, max_price, np.nan),
+        'min_future_price': np.where(is_long, np.nan, min_price),
+        'profit_potential': np.where(is_long,
+                                     (max_price - entry_price) / entry_price * 100,
+                                     (entry_price - min_price) / entry_price * 100),
+        'success': np.where(is_long,
+                            max_price >= entry_price * (1 + OUTCOME_TARGET),
+                            min_price <= entry_price * (1 - OUTCOME_TARGET)),
+    })
+
+# Métricas de un backtesting terminado
+def record_backtest(mode, started, results_df):
+    backtest_runs.labels(mode).inc()
+    backtest_duration.labels(mode).observe(time.perf_counter() - started)
+    if not results_df.empty:
+        for direction, count in results_df['signal'].value_counts().items():
+            backtest_signals.labels(direction).inc(int(count))
+
+# Estadísticas de los resultados de un backtesting
+def backtest_stats(results_df):
+    is_long = results_df['signal'] == 'LONG'
+    signals_count = {'LONG': int(is_long.sum()), 'SHORT': int((~is_long).sum())}
+    successful_signals = {
+        'LONG': int(results_df.loc[is_long, 'success'].sum()),
+        'SHORT': int(results_df.loc[~is_long, 'success'].sum()),
+    }
+    total_signals = signals_count['LONG'] + signals_count['SHORT']
+    total_successful = successful_signals['LONG'] + successful_signals['SHORT']
+
+    success_rate = (total_successful / total_signals) * 100 if total_signals > 0 else 0
+
+    long_success_rate = (successful_signals['LONG'] / signals_count['LONG']) * 100 if signals_count['LONG'] > 0 else 0
+    short_success_rate = (successful_signals['SHORT'] / signals_count['SHORT']) * 100 if signals_count['SHORT'] > 0 else 0
+
+    avg_profit = results_df['profit_potential'].mean() if 'profit_potential' in results_df.columns else 0
+
+    return {
+        'total_signals': total_signals,
+        'long_signals': signals_count['LONG'],
+        'short_signals': signals_count['SHORT'],
+        'success_rate': success_rate,
+        'long_success_rate': long_success_rate,
+        'short_success_rate': short_success_rate,
+        'avg_profit': avg_profit,
+    }
+
+# Calcular y mostrar estadísticas del backtesting
+def print_backtest_summary(symbol, timeframe, start_date, end_date, results_df):
+    if results_df.empty:
+        print(f"{Fore.YELLOW}No se generaron señales durante el período de backtesting{Style.RESET_ALL}")
+        return None
+
+    stats = backtest_stats(results_df)
+
+    # Mostrar resultados
+    print("\n" + "="*80)
+    print(f"{Fore.CYAN}{Style.BRIGHT}RESULTADOS DEL BACKTESTING PARA {symbol}{Style.RESET_ALL}")
+    print("="*80)
+    print(f"Período: {start_date} a {end_date}")
+    print(f"Timeframe: {timeframe}")
+    print(f"Total señales generadas: {stats['total_signals']}")
+    print(f"  - Señales LONG: {stats['long_signals']}")
+    print(f"  - Señales SHORT: {stats['short_signals']}")
+    print("-"*80)
+    print(f"{Fore.GREEN}Tasa de éxito global: {stats['success_rate']:.2f}%{Style.RESET_ALL}")
+    print(f"  - Tasa éxito LONG: {stats['long_success_rate']:.2f}%")
+    print(f"  - Tasa éxito SHORT: {stats['short_success_rate']:.2f}%")
+    print(f"Potencial de beneficio promedio: {stats['avg_profit']:.2f}%")
+    print("="*80)
+
+    return results_df
+
+# Mostrar el resultado de la simulación de operaciones
+def print_simulation_summary(symbol, stats):
+    print("\n" + "="*80)
+    print(f"{Fore.CYAN}{Style.BRIGHT}SIMULACIÓN DE OPERACIONES PARA {symbol}{Style.RESET_ALL}")
+    print("="*80)
+    print(f"Operaciones: {stats['trades']} (LONG {stats['long_trades']}, SHORT {stats['short_trades']})")
+    print("Salidas: " + ", ".join(f"{reason} {count}" for reason, count in stats['exits'].items()))
+    print(f"Duración promedio: {stats['avg_holding']:.1f} velas")
+    print("-"*80)
+    color = Fore.GREEN if stats['total_return'] > 0 else Fore.RED
+    print(f"{color}Rendimiento total: {stats['total_return']:.2f}%{Style.RESET_ALL}")
+    print(f"Operaciones ganadoras: {stats['win_rate']:.2f}%")
+    print(f"Rendimiento promedio por operación (neto): {stats['avg_return']:.3f}%")
+    print(f"Factor de beneficio: {stats['profit_factor']:.2f}")
+    print(f"Drawdown máximo: {stats['max_drawdown']:.2f}%")
+    print(f"Sharpe anualizado: {stats['sharpe']:.2f}")
+    print("="*80)
+
+if BACKTEST_MODE and __name__ == "__main__":
     exchange = init_exchange()
     print(f"{Fore.CYAN}Modo backtesting activado - Período: {BACKTEST_START_DATE} hasta {BACKTEST_END_DATE}{Style.RESET_ALL}")
     for symbol in SYMBOLS:
-        results_df = run_backtest(exchange, symbol, TIMEFRAME, BACKTEST_START_DATE, BACKTEST_END_DATE)
+        # El modo vectorizado reproduce identify_key_levels sin agrupar niveles
+        if BACKTEST_VECTORIZED and BACKTEST_INCREMENTAL and not KEY_LEVELS_CLUSTER:
+            results_df = run_backtest_incremental(exchange, symbol, TIMEFRAME, BACKTEST_START_DATE, BACKTEST_END_DATE)
+        elif BACKTEST_VECTORIZED and not KEY_LEVELS_CLUSTER:
+            results_df = run_backtest_vectorized(exchange, symbol, TIMEFRAME, BACKTEST_START_DATE, BACKTEST_END_DATE)
+        else:
+            results_df = run_backtest(exchange, symbol, TIMEFRAME, BACKTEST_START_DATE, BACKTEST_END_DATE)
         if results_df is not None and not results_df.empty:
-            # Obtener datos para graficar
-            df = get_historical_data(exchange, symbol, TIMEFRAME, limit=1000)
-            if df is not None:
+            # Graficar el período del backtesting (las series largas se reducen antes de dibujar)
+            df = fetch_backtest_data(exchange, symbol, TIMEFRAME, BACKTEST_START_DATE, BACKTEST_END_DATE)
+            if df is not None and not df.empty:
                 df = apply_technical_indicators(df)
-                plt = generate_plt(symbol, df, results_df.to_dict('records'))
-                plt.savefig(f"backtest_results_{symbol.replace('/', '_')}.png")
-                plt.close()
-                print(f"{Fore.GREEN}Gráfico de resultados guardado como backtest_results_{symbol.replace('/', '_')}.png{Style.RESET_ALL}")
\ No newline at end of file
+                path = generate_plt(symbol, df, results_df.to_dict('records'), path=f"backtest_results_{symbol.replace('/', '_')}.png")
+                print(f"{Fore.GREEN}Gráfico de resultados guardado como {path}{Style.RESET_ALL}")
\ No newline at end of file
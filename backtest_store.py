@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+import pandas as pd
+from colorama import Fore, Style
+from initial_config import BACKTEST_STORE_PATH
+
+RESULT_COLUMNS = ['date', 'signal', 'entry_price', 'max_future_price', 'min_future_price', 'profit_potential', 'success']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    config TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    first_candle INTEGER,
+    processed_until INTEGER,
+    last_resistance_break REAL,
+    last_support_break REAL,
+    stats TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (symbol, timeframe, config_hash, start)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    date INTEGER NOT NULL,
+    signal TEXT NOT NULL,
+    entry_price REAL NOT NULL,
+    max_future_price REAL,
+    min_future_price REAL,
+    profit_potential REAL NOT NULL,
+    success INTEGER NOT NULL,
+    PRIMARY KEY (run_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_by_symbol ON runs (symbol, timeframe, updated);
+"""
+
+
+# Fecha en ms como texto legible (UTC)
+def format_ms(value):
+    return '' if value is None or pd.isna(value) else pd.to_datetime(int(value), unit='ms').strftime('%Y-%m-%d %H:%M')
+
+
+# Backtestings guardados en SQLite por (símbolo, timeframe, hash de la configuración, inicio).
+# Cada ejecución guarda las señales evaluadas y hasta qué vela llegó (checkpoint), así que al
+# extender el período sólo se procesan las velas nuevas y una ejecución cortada se retoma.
+# Las estadísticas quedan guardadas para consultar y comparar ejecuciones sin recalcular.
+class BacktestStore:
+    def __init__(self, path=BACKTEST_STORE_PATH):
+        self.path = path
+        self.ready = False
+
+    def _connect(self):
+        if not self.ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        if not self.ready:
+            conn.executescript(SCHEMA)
+            self.ready = True
+        return conn
+
+    def get_run(self, symbol, timeframe, config_hash, start):
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM runs WHERE symbol = ? AND timeframe = ? AND config_hash = ? AND start = ?',
+                               (symbol, timeframe, config_hash, start)).fetchone()
+        return dict(row) if row else None
+
+    def create_run(self, symbol, timeframe, config_hash, config, start, end, first_candle):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT INTO runs (symbol, timeframe, config_hash, config, start, end, first_candle, created, updated) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         (symbol, timeframe, config_hash, json.dumps(config, sort_keys=True), start, end, first_candle, now, now))
+        return self.get_run(symbol, timeframe, config_hash, start)
+
+    # Descartar lo procesado de una ejecución (por ejemplo si cambiaron las velas guardadas)
+    def reset_run(self, run_id, first_candle):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM results WHERE run_id = ?', (run_id,))
+            conn.execute('UPDATE runs SET first_candle = ?, processed_until = NULL, last_resistance_break = NULL, '
+                         'last_support_break = NULL, stats = NULL, updated = ? WHERE id = ?', (first_candle, time.time(), run_id))
+
+    # Guardar las señales de un bloque y el checkpoint en la misma transacción: si el proceso se
+    # corta, la ejecución se retoma desde el último bloque guardado completo
+    def save_progress(self, run_id, results_df, processed_until, end, breaks):
+        rows = []
+        if not results_df.empty:
+            dates = pd.DatetimeIndex(results_df['date']).as_unit('ms').asi8
+            for date, row in zip(dates.tolist(), results_df.itertuples(index=False)):
+                rows.append((run_id, date, row.signal, row.entry_price, _optional(row.max_future_price),
+                             _optional(row.min_future_price), row.profit_potential, int(row.success)))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.execute('UPDATE runs SET processed_until = ?, end = MAX(end, ?), last_resistance_break = ?, '
+                         'last_support_break = ?, updated = ? WHERE id = ?',
+                         (processed_until, end, _optional(breaks[0]), _optional(breaks[1]), time.time(), run_id))
+
+    def save_stats(self, run_id, stats):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('UPDATE runs SET stats = ?, updated = ? WHERE id = ?', (json.dumps(stats), time.time(), run_id))
+
+    # Señales guardadas de una ejecución (hasta la vela `until` en ms) en el formato de
+    # evaluate_signal_outcomes
+    def results(self, run_id, until=None):
+        query = f"SELECT {', '.join(RESULT_COLUMNS)} FROM results WHERE run_id = ?"
+        args = [run_id]
+        if until is not None:
+            query += ' AND date <= ?'
+            args.append(until)
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(query + ' ORDER BY date', conn, params=args)
+        if df.empty:
+            return pd.DataFrame()
+        df['date'] = pd.to_datetime(df['date'], unit='ms')
+        df['success'] = df['success'].astype(bool)
+        return df
+
+    # Ejecuciones guardadas (las más recientes primero), con sus estadísticas como columnas
+    def runs(self, symbol=None, timeframe=None):
+        query = 'SELECT id, symbol, timeframe, config_hash, start, end, processed_until, stats, updated FROM runs'
+        conditions, args = [], []
+        if symbol:
+            conditions.append('symbol = ?')
+            args.append(symbol)
+        if timeframe:
+            conditions.append('timeframe = ?')
+            args.append(timeframe)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for row in conn.execute(query + ' ORDER BY updated DESC', args)]
+        return pd.DataFrame([_flatten(row) for row in rows])
+
+    # Estadísticas de varias ejecuciones lado a lado (una columna por ejecución)
+    def compare(self, run_ids):
+        with closing(self._connect()) as conn:
+            rows = [dict(row) for run_id in run_ids
+                    for row in conn.execute('SELECT * FROM runs WHERE id = ?', (run_id,))]
+        if not rows:
+            return pd.DataFrame()
+        table = pd.DataFrame([_flatten(row) for row in rows]).set_index('id')
+        return table.drop(columns=['config', 'first_candle', 'last_resistance_break', 'last_support_break', 'created']).T
+
+
+def _optional(value):
+    return None if value is None or pd.isna(value) else float(value)
+
+
+# Fila de `runs` con las fechas legibles y las estadísticas (JSON) como columnas
+def _flatten(row):
+    stats = json.loads(row.pop('stats') or '{}')
+    for key in ('start', 'end', 'processed_until'):
+        row[key] = format_ms(row[key])
+    row['updated'] = pd.to_datetime(row['updated'], unit='s').strftime('%Y-%m-%d %H:%M')
+    simulation = stats.pop('simulation', None) or {}
+    stats.update({f"sim_{key}": value for key, value in simulation.items() if key != 'exits'})
+    row.update(stats)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtestings guardados: listar y comparar sin recalcular')
+    parser.add_argument('run_ids', nargs='*', type=int, help='ejecuciones a comparar (sin ids se listan todas)')
+    parser.add_argument('--symbol')
+    parser.add_argument('--timeframe')
+    parser.add_argument('--path', default=BACKTEST_STORE_PATH)
+    args = parser.parse_args(argv)
+
+    store = BacktestStore(args.path)
+    table = store.compare(args.run_ids) if args.run_ids else store.runs(args.symbol, args.timeframe)
+    if table.empty:
+        print(f"{Fore.YELLOW}No hay backtestings guardados en {args.path}{Style.RESET_ALL}")
+        return 1
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:.2f}'.format):
+        print(table.to_string())
+    return 0
+
+
+# Backtestings del bot (BACKTEST_STORE_PATH)
+backtest_store = BacktestStore()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
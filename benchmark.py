@@ -0,0 +1,202 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from colorama import Fore, Style
+from fake_exchange import synthetic_ohlcv, FakeExchange
+from bot import apply_technical_indicators, identify_key_levels, analyze_signals, generate_terminal_analysis, analyze_symbol, analyze_symbols_matrix
+from backtest import run_backtest, run_backtest_vectorized
+from trade_simulator import simulate_trades
+from scanner import scan_symbols, scan_symbols_batch
+from initial_config import TIMEFRAME, SCAN_CONCURRENCY
+
+# Tamaños de serie (velas) y cantidades de símbolos medidos por defecto
+BENCHMARK_SIZES = [500, 10000, 1000000]
+BENCHMARK_SYMBOLS = [1, 10]
+BENCHMARK_REPEAT = 5
+BENCHMARK_WARMUP = 1
+# El backtest vela a vela recalcula todo en cada vela (O(n²)): sólo se mide hasta este tamaño
+BENCHMARK_LOOP_MAX_SIZE = 500
+# Velas por símbolo en el escaneo (lo mismo que descarga el bot)
+BENCHMARK_SCAN_CANDLES = 500
+BENCHMARK_BASELINE = 'benchmark_baseline.json'
+# Tiempo relativo a la línea base a partir del cual se considera una regresión
+BENCHMARK_REGRESSION_THRESHOLD = 1.2
+
+
+# Etapas del análisis medidas sobre una serie: (nombre, preparar, ejecutar, tamaño máximo).
+# `preparar` corre fuera de la medición y devuelve el argumento de `ejecutar`.
+def _stages():
+    def indicators(df):
+        return df.copy()
+
+    def analyzed(df):
+        df = apply_technical_indicators(df.copy())
+        return df, identify_key_levels(df)
+
+    def signals(df):
+        df, key_levels = analyzed(df)
+        return df, key_levels, analyze_signals(df, key_levels)
+
+    # Una entrada cada 2 velas alternando LONG y SHORT, sin descartar las superpuestas
+    def entries(df):
+        candles = np.arange(0, len(df), 2)
+        return df, candles, candles % 4 == 0
+
+    return [
+        ('indicators', indicators, apply_technical_indicators, None),
+        ('key_levels', lambda df: analyzed(df)[0], identify_key_levels, None),
+        ('signals', lambda df: analyzed(df), lambda args: analyze_signals(*args), None),
+        ('terminal', signals, lambda args: generate_terminal_analysis('BENCH/USDT', args[0], *args[2], key_levels=args[1], send_alert=False), None),
+        ('backtest_vectorized', lambda df: df, lambda df: run_backtest_vectorized(None, 'BENCH/USDT', TIMEFRAME, df.index[0], df.index[-1], df=df), None),
+        ('simulate', entries, lambda args: simulate_trades(*args, one_position=False), None),
+        ('backtest_loop', lambda df: df, lambda df: run_backtest(None, 'BENCH/USDT', TIMEFRAME, df.index[0], df.index[-1], df=df), BENCHMARK_LOOP_MAX_SIZE),
+    ]
+
+
+# Ejecutar `run` sin imprimir en la terminal
+def _quiet(run, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run(*args)
+
+
+# Medir una función: `warmup` ejecuciones descartadas, `repeat` medidas y una más con
+# tracemalloc para el pico de memoria (por separado, porque tracemalloc la hace más lenta)
+def measure(prepare, run, repeat=BENCHMARK_REPEAT, warmup=BENCHMARK_WARMUP):
+    for _ in range(warmup):
+        _quiet(run, _quiet(prepare))
+    times = []
+    for _ in range(repeat):
+        arg = _quiet(prepare)
+        start = time.perf_counter()
+        _quiet(run, arg)
+        times.append(time.perf_counter() - start)
+
+    arg = _quiet(prepare)
+    tracemalloc.start()
+    try:
+        _quiet(run, arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'median': statistics.median(times), 'best': min(times), 'peak_memory': peak}
+
+
+def _record(results, name, size, symbols, timing):
+    candles = size * symbols
+    timing.update({
+        'stage': name,
+        'candles': size,
+        'symbols': symbols,
+        'candles_per_second': candles / timing['median'] if timing['median'] > 0 else None,
+    })
+    results[f'{name}:{size}x{symbols}'] = timing
+    print_result(timing)
+
+
+# Medir cada etapa del análisis con series de cada tamaño y el escaneo completo
+# (descarga + análisis) con cada cantidad de símbolos, todo sin red
+def run_benchmarks(sizes=BENCHMARK_SIZES, symbol_counts=BENCHMARK_SYMBOLS, repeat=BENCHMARK_REPEAT, warmup=BENCHMARK_WARMUP, stages=None):
+    results = {}
+    for size in sizes:
+        df = synthetic_ohlcv(size, seed=size)
+        for name, prepare, run, max_size in _stages():
+            if stages and name not in stages:
+                continue
+            if max_size is not None and size > max_size:
+                continue
+            timing = measure(lambda: prepare(df), run, repeat, warmup)
+            _record(results, name, size, 1, timing)
+
+    if stages and 'scan' not in stages:
+        return results
+    for count in symbol_counts:
+        frames = {f'SYM{i}/USDT': synthetic_ohlcv(BENCHMARK_SCAN_CANDLES, seed=i) for i in range(count)}
+        exchange = FakeExchange(frames)
+
+        # Misma conversión que get_historical_data, sin pasar por el almacén de velas
+        def fetch(symbol):
+            ohlcv = exchange.fetch_ohlcv(symbol, TIMEFRAME, limit=BENCHMARK_SCAN_CANDLES)
+            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            return df.set_index('timestamp')
+
+        def scan(symbols):
+            for item in scan_symbols(symbols, fetch, analyze_symbol, SCAN_CONCURRENCY, 0):
+                if item['error'] is not None:
+                    raise item['error']
+
+        # Mismo escaneo con el motor matricial (todos los símbolos juntos)
+        def scan_matrix(symbols):
+            for item in scan_symbols_batch(symbols, fetch, analyze_symbols_matrix, SCAN_CONCURRENCY):
+                if item['error'] is not None:
+                    raise item['error']
+
+        timing = measure(lambda: list(frames), scan, repeat, warmup)
+        _record(results, 'scan', BENCHMARK_SCAN_CANDLES, count, timing)
+        timing = measure(lambda: list(frames), scan_matrix, repeat, warmup)
+        _record(results, 'scan_matrix', BENCHMARK_SCAN_CANDLES, count, timing)
+    return results
+
+
+def print_result(timing):
+    throughput = timing['candles_per_second']
+    print(f"{Fore.CYAN}{timing['stage']:<20}{Style.RESET_ALL} {timing['candles']:>9} velas x {timing['symbols']:<3} "
+          f"mediana {timing['median'] * 1000:>10.2f} ms  mejor {timing['best'] * 1000:>10.2f} ms  "
+          f"{throughput:>14,.0f} velas/s  memoria pico {timing['peak_memory'] / 2**20:>8.1f} MB")
+
+
+# Comparar con la línea base. Devuelve las mediciones más lentas que `threshold` veces la base.
+def compare_baseline(results, baseline, threshold=BENCHMARK_REGRESSION_THRESHOLD):
+    regressions = []
+    print(f"\n{Fore.CYAN}{Style.BRIGHT}Comparación con la línea base:{Style.RESET_ALL}")
+    for key, timing in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<35} sin línea base")
+            continue
+        ratio = timing['median'] / base['median'] if base['median'] > 0 else 1.0
+        color = Fore.RED if ratio > threshold else Fore.GREEN if ratio < 1 / threshold else Fore.WHITE
+        print(f"{key:<35} {color}{ratio:>6.2f}x{Style.RESET_ALL}  ({base['median'] * 1000:.2f} ms -> {timing['median'] * 1000:.2f} ms)")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del análisis técnico con datos sintéticos (sin red)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=BENCHMARK_SIZES, help='velas por serie')
+    parser.add_argument('--symbols', type=int, nargs='+', default=BENCHMARK_SYMBOLS, help='cantidades de símbolos del escaneo')
+    parser.add_argument('--stages', nargs='+', help='etapas a medir (por defecto todas, "scan" incluido)')
+    parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT)
+    parser.add_argument('--warmup', type=int, default=BENCHMARK_WARMUP)
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE, help='archivo JSON de la línea base')
+    parser.add_argument('--save', action='store_true', help='guardar los resultados como nueva línea base')
+    parser.add_argument('--threshold', type=float, default=BENCHMARK_REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.symbols, args.repeat, args.warmup, args.stages)
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_baseline(results, json.load(f), args.threshold)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"{Fore.GREEN}Línea base guardada en {args.baseline}{Style.RESET_ALL}")
+    if regressions:
+        print(f"{Fore.RED}{Style.BRIGHT}Regresiones: {', '.join(regressions)}{Style.RESET_ALL}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
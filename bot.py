@@ -1,24 +1,43 @@
 import pandas as pd
 import numpy as np
-import ccxt
 import time
-import ta
+import signal
+from functools import partial
 from datetime import datetime
 import colorama
 from colorama import Fore, Back, Style
 from env import API_KEY, API_SECRET
-from api_telegram import send_telegram_alert
+from api_telegram import send_telegram_alert, end_alert_cycle
 from logger_config import logger
-from plt_graph import generate_plt
-from initial_config import SYMBOLS, TIMEFRAME, FAST_MA, SLOW_MA, RSI_PERIOD, RSI_OVERBOUGHT, RSI_OVERSOLD, MACD_FAST, MACD_SIGNAL, MACD_SLOW, ADX_PERIOD, ADX_THRESHOLD, VOLUME_THRESHOLD
+from chart_renderer import chart_renderer, CHART_COLUMNS
+from streaming_indicators import StreamingIndicators
+from key_levels import find_levels
+from compact_frame import compact_frame
+from indicator_registry import compute_indicators, enabled_rules, required_columns, min_indicator_rows
+from candle_store import candle_store, to_dataframe, to_candles
+from resampler import candle_resampler
+from scanner import scan_symbols, scan_symbols_batch
+from matrix_indicators import stack_frames, compute_matrix_indicators, matrix_signal_counts, matrix_frames
+from strategy_params import resolve_params
+from scheduler import CandleCloseScheduler, ClosedCandleTracker, ReplayFeed, closed_candles, last_closed_in, next_close
+from timeframes import now_ms, timeframe_to_ms
+from analysis_cache import AnalysisCache, AlertTracker, params_hash
+from snapshot import signal_snapshot
+from instrumentation import stage_timings, profile_cycle
+from metrics import fetch_ohlcv, CallbackMetric, cycle_duration, cycle_overrun, cycles_late, symbols_analyzed, signals_emitted
+from initial_config import EXCHANGE_ID, SYMBOLS, TIMEFRAME, FAST_MA, SLOW_MA, RSI_PERIOD, ADX_PERIOD, ADX_THRESHOLD, VOLUME_THRESHOLD, INDICATOR_ENGINE, STREAMING_FETCH_LIMIT, KEY_LEVELS_LOOKBACK, KEY_LEVELS_TOLERANCE, KEY_LEVELS_CLUSTER, CANDLE_STORE_ENABLED, MULTI_TIMEFRAMES, SCAN_CONCURRENCY, SCHEDULER_MODE, ANALYSIS_CACHE_ENABLED, CHART_ENABLED, OUTPUT_MODE
 
 # Inicializar colorama para colores en terminal
 colorama.init(autoreset=True)
+# Sin reportes de terminal (ver OUTPUT_MODE)
+HEADLESS = OUTPUT_MODE == 'headless'
 
 
 # Inicializar exchange
+# ccxt se importa al crear el cliente (tarda en cargar todos los exchanges)
 def init_exchange():
-    exchange = ccxt.binance({
+    import ccxt
+    exchange = getattr(ccxt, EXCHANGE_ID)({
         'apiKey': API_KEY,
         'secret': API_SECRET,
         'enableRateLimit': True,
@@ -28,177 +47,97 @@ def init_exchange():
     })
     return exchange
 
+# Cliente del exchange compartido entre ciclos, creado en el primer análisis
+_exchange = None
+
+def get_exchange():
+    global _exchange
+    if _exchange is None:
+        _exchange = init_exchange()
+    return _exchange
+
 # Función para obtener datos históricos
 def get_historical_data(exchange, symbol, timeframe, limit=500):
     try:
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        print(f"Datos históricos obtenidos para {symbol} ({len(df)} velas)")
-        #print (df)
+        with stage_timings.stage('fetch', symbol):
+            if CANDLE_STORE_ENABLED:
+                # Velas cerradas del almacén local más la vela abierta actual
+                df = candle_store.get_candles(exchange, symbol, timeframe, limit=limit)
+            else:
+                ohlcv = fetch_ohlcv(exchange, symbol, timeframe, limit=limit)
+                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                df.set_index('timestamp', inplace=True)
+        if not HEADLESS:
+            print(f"Datos históricos obtenidos para {symbol} ({len(df)} velas)")
         return df
     except Exception as e:
         logger.error(f"Error al obtener datos históricos para {symbol}: {e}")
         return None
 
-# Aplicar indicadores técnicos al dataframe
-def apply_technical_indicators(df):
-    # Media móvil simple
-    df['sma_fast'] = ta.trend.sma_indicator(df['close'], window=FAST_MA)
-    df['sma_slow'] = ta.trend.sma_indicator(df['close'], window=SLOW_MA)
-
-    # RSI
-    df['rsi'] = ta.momentum.rsi(df['close'], window=RSI_PERIOD)
-
-    # MACD
-    macd = ta.trend.MACD(df['close'], window_fast=MACD_FAST, window_slow=MACD_SLOW, window_sign=MACD_SIGNAL)
-    df['macd'] = macd.macd()
-    df['macd_signal'] = macd.macd_signal()
-    df['macd_histogram'] = macd.macd_diff()
-    
-    # ADX - Average Directional Index para medir fuerza de tendencia
-    adx = ta.trend.ADXIndicator(df['high'], df['low'], df['close'], window=ADX_PERIOD)
-    df['adx'] = adx.adx()
-    df['di_plus'] = adx.adx_pos()  # Indicador Direccional Positivo
-    df['di_minus'] = adx.adx_neg()  # Indicador Direccional Negativo
-    
-    # Bollinger Bands
-    bollinger = ta.volatility.BollingerBands(df['close'], window=20, window_dev=2)
-    df['bollinger_high'] = bollinger.bollinger_hband()
-    df['bollinger_low'] = bollinger.bollinger_lband()
-    df['bollinger_mid'] = bollinger.bollinger_mavg()
-    
-    # Análisis de Volumen
-    if isinstance(df['volume'], pd.Series):
-        df['volume_sma'] = ta.trend.sma_indicator(df['volume'], window=20)
-        df['volume_ratio'] = df['volume'] / df['volume_sma']
-        df['volume_increasing'] = df['volume'] > df['volume'].shift(1)
-        # Detectar tendencia de volumen decreciente (3 periodos consecutivos)
-        df['volume_decreasing_trend'] = (
-            (df['volume'] < df['volume'].shift(1)) & 
-            (df['volume'].shift(1) < df['volume'].shift(2)) & 
-            (df['volume'].shift(2) < df['volume'].shift(3))
-        )
-    else:
-        # If volume is a scalar, set default values
-        df['volume_sma'] = np.nan
-        df['volume_ratio'] = np.nan
-        df['volume_increasing'] = False
-        df['volume_decreasing_trend'] = False
-    
-    # Ichimoku Cloud
-    ichimoku = ta.trend.IchimokuIndicator(
-        high=df['high'],
-        low=df['low'],
-        window1=9,   # Tenkan-sen (Conversion Line)
-        window2=26,  # Kijun-sen (Base Line)
-        window3=52   # Senkou Span B (Leading Span B)
-    )
-    df['ichimoku_conversion_line'] = ichimoku.ichimoku_conversion_line()
-    df['ichimoku_base_line'] = ichimoku.ichimoku_base_line()
-    df['ichimoku_a'] = ichimoku.ichimoku_a()  # Senkou Span A (Leading Span A)
-    df['ichimoku_b'] = ichimoku.ichimoku_b()  # Senkou Span B (Leading Span B)
-    # Calcular si el precio está por encima o por debajo de la nube
-    df['above_cloud'] = (df['close'] > df['ichimoku_a'].shift(26)) & (df['close'] > df['ichimoku_b'].shift(26))
-    df['below_cloud'] = (df['close'] < df['ichimoku_a'].shift(26)) & (df['close'] < df['ichimoku_b'].shift(26))
-
-    df['in_cloud'] = ~(df['above_cloud'] | df['below_cloud'])
-    # Calcular el estado del Kumo futuro (nube adelantada)
-    df['future_cloud_bullish'] = df['ichimoku_a'] > df['ichimoku_b']
-    df['future_cloud_bearish'] = df['ichimoku_a'] < df['ichimoku_b']
-    
-    # Soportes y resistencias más avanzados
-    # Método 1: Basado en mínimos y máximos locales
-    window = 20
-    
-    # Picos para resistencias (máximos locales)
-    df['is_resistance'] = df['high'].rolling(window=window, center=True).apply(
-        lambda x: x[len(x)//2] == max(x), raw=True
-    ).fillna(0).astype(bool)
-    
-    # Valles para soportes (mínimos locales)
-    df['is_support'] = df['low'].rolling(window=window, center=True).apply(
-        lambda x: x[len(x)//2] == min(x), raw=True
-    ).fillna(0).astype(bool)
-    
-    # Método 2: Niveles de soporte y resistencia basados en cuartiles de precio
-    price_range = df['high'].max() - df['low'].min()
-    q1 = df['low'].min() + price_range * 0.25
-    q3 = df['low'].min() + price_range * 0.75
-    df['support_level'] = q1
-    df['resistance_level'] = q3
-    
-    # Soportes y resistencias dinámicas
-    # Detectar última resistencia superada
-    df['broke_resistance'] = (df['close'] > df['close'].shift(1)) & df['is_resistance'].shift(1) & (df['close'] > df['high'].shift(1))
-    # Detectar último soporte roto
-    df['broke_support'] = (df['close'] < df['close'].shift(1)) & df['is_support'].shift(1) & (df['close'] < df['low'].shift(1))
-    
-    # Marcar últimos puntos donde ocurrieron estos eventos
-    df['last_broke_resistance'] = None
-    df['last_broke_support'] = None
-    
-    # Encontrar y marcar la última resistencia superada
-    resistance_indices = df.index[df['broke_resistance']]
-    if len(resistance_indices) > 0:
-        last_resistance_idx = resistance_indices[-1]
-        df.loc[last_resistance_idx:, 'last_broke_resistance'] = df.loc[last_resistance_idx, 'high']
-    
-    # Encontrar y marcar el último soporte roto
-    support_indices = df.index[df['broke_support']]
-    if len(support_indices) > 0:
-        last_support_idx = support_indices[-1]
-        df.loc[last_support_idx:, 'last_broke_support'] = df.loc[last_support_idx, 'low']
-    
-    # Tendencia
-    df['trend'] = np.where(df['close'] > df['sma_slow'], 'BULLISH',
-                         np.where(df['close'] < df['sma_slow'], 'BEARISH', 'NEUTRAL'))
-    
-    return df
+# Motores de indicadores incrementales por símbolo (INDICATOR_ENGINE = 'streaming')
+streaming_engines = {}
+
+# Obtener indicadores actualizando el motor incremental sólo con las velas cerradas nuevas
+def get_streaming_indicators(exchange, symbol, timeframe, limit=500, rows=100):
+    engine = streaming_engines.get(symbol)
+    try:
+        if engine is not None:
+            # La última vela devuelta sigue abierta, sólo se procesan las cerradas
+            with stage_timings.stage('fetch', symbol):
+                closed = fetch_ohlcv(exchange, symbol, timeframe, limit=STREAMING_FETCH_LIMIT)[:-1]
+            last_timestamp = int(engine.last_timestamp.timestamp() * 1000)
+            # Si no hay solapamiento con la última vela procesada puede faltar historial
+            if closed and closed[0][0] > last_timestamp:
+                engine = None
+            else:
+                for candle in closed:
+                    engine.update(pd.to_datetime(candle[0], unit='ms'), *candle[1:])
+    except Exception as e:
+        logger.error(f"Error al actualizar indicadores para {symbol}: {e}")
+        return None
+
+    if engine is None:
+        df = get_historical_data(exchange, symbol, timeframe, limit=limit)
+        if df is None or len(df) < 2:
+            return None
+        engine = StreamingIndicators(max_rows=limit).seed(df.iloc[:-1])
+        streaming_engines[symbol] = engine
+    return engine.frame(rows=rows)
+
+# Aplicar indicadores técnicos al dataframe.
+# Con `columns` sólo se calculan los indicadores necesarios para esas columnas (ver indicator_registry).
+def apply_technical_indicators(df, params=None, columns=None):
+    params = resolve_params(params)
+    compute_indicators(df, params, columns)
+    return compact_frame(df)
 
 # Identificar zonas de soporte y resistencia importantes
-def identify_key_levels(df):
+def identify_key_levels(df, lookback=KEY_LEVELS_LOOKBACK, cluster=KEY_LEVELS_CLUSTER):
     # Encontrar soportes recientes
-    recent_df = df.iloc[-100:]  # Analizar últimas 100 velas
-    print (f"Analizando soportes y resistencias en las últimas {len(recent_df)} velas")
-    print (recent_df)
-    supports = []
-    resistances = []
-    
-    # Identificar niveles de soporte recientes
-    for i in range(5, len(recent_df)-5):
-        if recent_df['is_support'].iloc[i]:
-            support_price = recent_df['low'].iloc[i]
-            # Verificar si este nivel ha sido testeado múltiples veces
-            touches = sum(abs(recent_df['low'] - support_price) < support_price * 0.005)
-            if touches >= 2:  # Al menos 2 toques para considerarlo importante
-                supports.append((support_price, touches))
-    
-    # Identificar niveles de resistencia recientes
-    for i in range(5, len(recent_df)-5):
-        if recent_df['is_resistance'].iloc[i]:
-            resistance_price = recent_df['high'].iloc[i]
-            # Verificar si este nivel ha sido testeado múltiples veces
-            touches = sum(abs(recent_df['high'] - resistance_price) < resistance_price * 0.005)
-            if touches >= 2:  # Al menos 2 toques para considerarlo importante
-                resistances.append((resistance_price, touches))
+    recent_df = df.iloc[-lookback:]  # Analizar últimas `lookback` velas
+    # Sólo se arma el texto si el registro de depuración está activo
+    logger.debug("Analizando soportes y resistencias en las últimas %d velas\n%s", len(recent_df), recent_df)
+    
+    # Niveles testeados múltiples veces (al menos 2 toques para considerarlo importante)
+    supports = find_levels(recent_df['low'], recent_df['is_support'], cluster=cluster)
+    resistances = find_levels(recent_df['high'], recent_df['is_resistance'], cluster=cluster)
     
     # Añadir soporte y resistencia dinámicos
     last_row = recent_df.iloc[-1]
     
     # Añadir última resistencia superada como nuevo soporte
-    if last_row['last_broke_resistance'] is not None and not np.isnan(last_row['last_broke_resistance']):
+    if pd.notna(last_row['last_broke_resistance']):
         resistance_price = last_row['last_broke_resistance']
         # Verificar que no esté ya en la lista
-        if not any(abs(s[0] - resistance_price) < resistance_price * 0.005 for s in supports):
+        if not any(abs(s[0] - resistance_price) < resistance_price * KEY_LEVELS_TOLERANCE for s in supports):
             supports.append((resistance_price, 1))
     
     # Añadir último soporte roto como nueva resistencia
-    if last_row['last_broke_support'] is not None and not np.isnan(last_row['last_broke_support']):
+    if pd.notna(last_row['last_broke_support']):
         support_price = last_row['last_broke_support']
         # Verificar que no esté ya en la lista
-        if not any(abs(r[0] - support_price) < support_price * 0.005 for r in resistances):
+        if not any(abs(r[0] - support_price) < support_price * KEY_LEVELS_TOLERANCE for r in resistances):
             resistances.append((support_price, 1))
     
     # Ordenar y filtrar para obtener los más importantes
@@ -213,7 +152,10 @@ def identify_key_levels(df):
     return supports, resistances
 
 # Analizar señales de trading con explicación detallada
-def analyze_signals(df, key_levels=None):
+# `rules` limita las reglas evaluadas (por defecto las del perfil configurado, ver indicator_registry.RULES)
+def analyze_signals(df, key_levels=None, params=None, rules=None):
+    params = resolve_params(params)
+    rules = enabled_rules(rules)
     signals = []
     explanations = []
     current_price = df['close'].iloc[-1]
@@ -223,102 +165,112 @@ def analyze_signals(df, key_levels=None):
     prev_row = df.iloc[-2]
     
     # Señal por cruce de medias móviles
-    if (prev_row['sma_fast'] <= prev_row['sma_slow']) and (last_row['sma_fast'] > last_row['sma_slow']):
-        signals.append("LONG")
-        explanations.append(f"Cruce alcista de medias móviles (SMA{FAST_MA} cruza por encima de SMA{SLOW_MA})")
-    elif (prev_row['sma_fast'] >= prev_row['sma_slow']) and (last_row['sma_fast'] < last_row['sma_slow']):
-        signals.append("SHORT")
-        explanations.append(f"Cruce bajista de medias móviles (SMA{FAST_MA} cruza por debajo de SMA{SLOW_MA})")
+    if 'ma_cross' in rules:
+        if (prev_row['sma_fast'] <= prev_row['sma_slow']) and (last_row['sma_fast'] > last_row['sma_slow']):
+            signals.append("LONG")
+            explanations.append(f"Cruce alcista de medias móviles (SMA{params['fast_ma']} cruza por encima de SMA{params['slow_ma']})")
+        elif (prev_row['sma_fast'] >= prev_row['sma_slow']) and (last_row['sma_fast'] < last_row['sma_slow']):
+            signals.append("SHORT")
+            explanations.append(f"Cruce bajista de medias móviles (SMA{params['fast_ma']} cruza por debajo de SMA{params['slow_ma']})")
     
     # Señal por RSI
-    if prev_row['rsi'] < RSI_OVERSOLD and last_row['rsi'] > RSI_OVERSOLD:
-        signals.append("LONG")
-        explanations.append(f"RSI saliendo de zona de sobreventa ({last_row['rsi']:.2f})")
-    elif prev_row['rsi'] > RSI_OVERBOUGHT and last_row['rsi'] < RSI_OVERBOUGHT:
-        signals.append("SHORT")
-        explanations.append(f"RSI saliendo de zona de sobrecompra ({last_row['rsi']:.2f})")
+    if 'rsi' in rules:
+        if prev_row['rsi'] < params['rsi_oversold'] and last_row['rsi'] > params['rsi_oversold']:
+            signals.append("LONG")
+            explanations.append(f"RSI saliendo de zona de sobreventa ({last_row['rsi']:.2f})")
+        elif prev_row['rsi'] > params['rsi_overbought'] and last_row['rsi'] < params['rsi_overbought']:
+            signals.append("SHORT")
+            explanations.append(f"RSI saliendo de zona de sobrecompra ({last_row['rsi']:.2f})")
     
     # Señal por MACD
-    if (prev_row['macd'] <= prev_row['macd_signal']) and (last_row['macd'] > last_row['macd_signal']):
-        signals.append("LONG")
-        explanations.append("Cruce alcista MACD (MACD cruza por encima de línea de señal)")
-    elif (prev_row['macd'] >= prev_row['macd_signal']) and (last_row['macd'] < last_row['macd_signal']):
-        signals.append("SHORT") 
-        explanations.append("Cruce bajista MACD (MACD cruza por debajo de línea de señal)")
+    if 'macd' in rules:
+        if (prev_row['macd'] <= prev_row['macd_signal']) and (last_row['macd'] > last_row['macd_signal']):
+            signals.append("LONG")
+            explanations.append("Cruce alcista MACD (MACD cruza por encima de línea de señal)")
+        elif (prev_row['macd'] >= prev_row['macd_signal']) and (last_row['macd'] < last_row['macd_signal']):
+            signals.append("SHORT") 
+            explanations.append("Cruce bajista MACD (MACD cruza por debajo de línea de señal)")
     
     # Señal por ADX y Direccional
-    if last_row['adx'] > ADX_THRESHOLD:
-        if last_row['di_plus'] > last_row['di_minus']:
-            signals.append("LONG")
-            explanations.append(f"ADX fuerte ({last_row['adx']:.2f}) con tendencia alcista (DI+ > DI-)")
-        elif last_row['di_minus'] > last_row['di_plus']:
-            signals.append("SHORT")
-            explanations.append(f"ADX fuerte ({last_row['adx']:.2f}) con tendencia bajista (DI- > DI+)")
+    if 'adx' in rules:
+        if last_row['adx'] > params['adx_threshold']:
+            if last_row['di_plus'] > last_row['di_minus']:
+                signals.append("LONG")
+                explanations.append(f"ADX fuerte ({last_row['adx']:.2f}) con tendencia alcista (DI+ > DI-)")
+            elif last_row['di_minus'] > last_row['di_plus']:
+                signals.append("SHORT")
+                explanations.append(f"ADX fuerte ({last_row['adx']:.2f}) con tendencia bajista (DI- > DI+)")
     
     # Señal por Bollinger Bands
-    if last_row['close'] < last_row['bollinger_low']:
-        signals.append("LONG")
-        explanations.append("Precio por debajo de banda inferior de Bollinger (posible sobreventa)")
-    elif last_row['close'] > last_row['bollinger_high']:
-        signals.append("SHORT")
-        explanations.append("Precio por encima de banda superior de Bollinger (posible sobrecompra)")
-    
-    # Señal por volumen
-    if isinstance(last_row['volume_ratio'], (float, np.float64, np.float32, int, np.int64, np.int32)):
-        volume_ratio_check = last_row['volume_ratio'] > VOLUME_THRESHOLD
-    else:
-        volume_ratio_check = last_row['volume_ratio'] > VOLUME_THRESHOLD if not pd.isna(last_row['volume_ratio']) else False
-    
-    if volume_ratio_check:
-        # Confirmar señales si hay alto volumen
-        if "LONG" in signals:
-            explanations.append(f"Alto volumen ({last_row['volume_ratio']:.2f}x promedio) confirma señal de compra")
-        elif "SHORT" in signals:
-            explanations.append(f"Alto volumen ({last_row['volume_ratio']:.2f}x promedio) confirma señal de venta")
-        # O generar nueva señal basada en ruptura de precio con alto volumen
-        elif isinstance(last_row['close'], pd.Series) and last_row['close'] > last_row['close'].shift(1) * 1.01:  # Subida de más del 1%
+    if 'bollinger' in rules:
+        if last_row['close'] < last_row['bollinger_low']:
             signals.append("LONG")
-            explanations.append(f"Ruptura alcista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
-        elif isinstance(last_row['close'], pd.Series) and last_row['close'] < last_row['close'].shift(1) * 0.99:  # Bajada de más del 1%
+            explanations.append("Precio por debajo de banda inferior de Bollinger (posible sobreventa)")
+        elif last_row['close'] > last_row['bollinger_high']:
             signals.append("SHORT")
-            explanations.append(f"Ruptura bajista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
-        # Si close no es una Series, usamos una comparación con el valor anterior (que debería estar disponible)
-        elif not isinstance(last_row['close'], pd.Series) and 'close' in prev_row and last_row['close'] > prev_row['close'] * 1.01:
-            signals.append("LONG")
-            explanations.append(f"Ruptura alcista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
-        elif not isinstance(last_row['close'], pd.Series) and 'close' in prev_row and last_row['close'] < prev_row['close'] * 0.99:
-            signals.append("SHORT")
-            explanations.append(f"Ruptura bajista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
+            explanations.append("Precio por encima de banda superior de Bollinger (posible sobrecompra)")
+    
+    # Señal por volumen
+    if 'volume' in rules:
+        if isinstance(last_row['volume_ratio'], (float, np.float64, np.float32, int, np.int64, np.int32)):
+            volume_ratio_check = last_row['volume_ratio'] > params['volume_threshold']
+        else:
+            volume_ratio_check = last_row['volume_ratio'] > params['volume_threshold'] if not pd.isna(last_row['volume_ratio']) else False
+    
+        if volume_ratio_check:
+            # Confirmar señales si hay alto volumen
+            if "LONG" in signals:
+                explanations.append(f"Alto volumen ({last_row['volume_ratio']:.2f}x promedio) confirma señal de compra")
+            elif "SHORT" in signals:
+                explanations.append(f"Alto volumen ({last_row['volume_ratio']:.2f}x promedio) confirma señal de venta")
+            # O generar nueva señal basada en ruptura de precio con alto volumen
+            elif isinstance(last_row['close'], pd.Series) and last_row['close'] > last_row['close'].shift(1) * 1.01:  # Subida de más del 1%
+                signals.append("LONG")
+                explanations.append(f"Ruptura alcista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
+            elif isinstance(last_row['close'], pd.Series) and last_row['close'] < last_row['close'].shift(1) * 0.99:  # Bajada de más del 1%
+                signals.append("SHORT")
+                explanations.append(f"Ruptura bajista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
+            # Si close no es una Series, usamos una comparación con el valor anterior (que debería estar disponible)
+            elif not isinstance(last_row['close'], pd.Series) and 'close' in prev_row and last_row['close'] > prev_row['close'] * 1.01:
+                signals.append("LONG")
+                explanations.append(f"Ruptura alcista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
+            elif not isinstance(last_row['close'], pd.Series) and 'close' in prev_row and last_row['close'] < prev_row['close'] * 0.99:
+                signals.append("SHORT")
+                explanations.append(f"Ruptura bajista con volumen alto ({last_row['volume_ratio']:.2f}x promedio)")
     
     #  Alerta de agotamiento por volumen decreciente
-    if isinstance(last_row['volume_decreasing_trend'], bool) and last_row['volume_decreasing_trend']:
-        if last_row['trend'] == 'BULLISH':
-            signals.append("SHORT")
-            explanations.append("Volumen decreciente en tendencia alcista (posible agotamiento)")
-        elif last_row['trend'] == 'BEARISH':
-            signals.append("LONG")
-            explanations.append("Volumen decreciente en tendencia bajista (posible agotamiento)")
+    if 'volume_exhaustion' in rules:
+        # bool() también acepta numpy.bool, que es lo que devuelve pandas al leer una fila mixta
+        if bool(last_row['volume_decreasing_trend']):
+            if last_row['trend'] == 'BULLISH':
+                signals.append("SHORT")
+                explanations.append("Volumen decreciente en tendencia alcista (posible agotamiento)")
+            elif last_row['trend'] == 'BEARISH':
+                signals.append("LONG")
+                explanations.append("Volumen decreciente en tendencia bajista (posible agotamiento)")
     
     #  Señales basadas en Ichimoku Cloud
-    if last_row['above_cloud']:
-        if last_row['ichimoku_conversion_line'] > last_row['ichimoku_base_line']:
-            signals.append("LONG")
-            explanations.append("Precio por encima de la nube Ichimoku con TK Cross alcista")
-    elif last_row['below_cloud']:
-        if last_row['ichimoku_conversion_line'] < last_row['ichimoku_base_line']:
-            signals.append("SHORT")
-            explanations.append("Precio por debajo de la nube Ichimoku con TK Cross bajista")
+    if 'ichimoku' in rules:
+        if last_row['above_cloud']:
+            if last_row['ichimoku_conversion_line'] > last_row['ichimoku_base_line']:
+                signals.append("LONG")
+                explanations.append("Precio por encima de la nube Ichimoku con TK Cross alcista")
+        elif last_row['below_cloud']:
+            if last_row['ichimoku_conversion_line'] < last_row['ichimoku_base_line']:
+                signals.append("SHORT")
+                explanations.append("Precio por debajo de la nube Ichimoku con TK Cross bajista")
     
     #  Señal basada en Kumo futuro
-    if last_row['future_cloud_bullish'] and not prev_row['future_cloud_bullish']:
-        signals.append("LONG")
-        explanations.append("Kumo futuro se torna alcista (Senkou Span A cruza por encima de Senkou Span B)")
-    elif last_row['future_cloud_bearish'] and not prev_row['future_cloud_bearish']:
-        signals.append("SHORT")
-        explanations.append("Kumo futuro se torna bajista (Senkou Span A cruza por debajo de Senkou Span B)")
+    if 'kumo' in rules:
+        if last_row['future_cloud_bullish'] and not prev_row['future_cloud_bullish']:
+            signals.append("LONG")
+            explanations.append("Kumo futuro se torna alcista (Senkou Span A cruza por encima de Senkou Span B)")
+        elif last_row['future_cloud_bearish'] and not prev_row['future_cloud_bearish']:
+            signals.append("SHORT")
+            explanations.append("Kumo futuro se torna bajista (Senkou Span A cruza por debajo de Senkou Span B)")
     
     # Señales basadas en soportes y resistencias
-    if key_levels:
+    if key_levels and 'key_levels' in rules:
         supports, resistances = key_levels
         
         # Comprobar si el precio está cerca de soporte
@@ -338,7 +290,7 @@ def analyze_signals(df, key_levels=None):
     return signals, explanations
 
 # Generar análisis detallado para terminal
-def generate_terminal_analysis(symbol, df, signals, explanations, key_levels=None):
+def generate_terminal_analysis(symbol, df, signals, explanations, key_levels=None, send_alert=True):
     current_price = df['close'].iloc[-1]
     last_row = df.iloc[-1]
     
@@ -346,51 +298,62 @@ def generate_terminal_analysis(symbol, df, signals, explanations, key_levels=Non
     if "LONG" in signals:
         print(f"{Fore.GREEN}{Style.BRIGHT}🚨 ALERTA: {symbol} - SEÑALES DE COMPRA (LONG) DETECTADAS 🚨{Style.RESET_ALL}")
         #  Enviar alerta a Telegram
-        send_telegram_alert(symbol, "LONG", current_price, explanations)
+        if send_alert:
+            send_telegram_alert(symbol, "LONG", current_price, explanations)
     elif "SHORT" in signals:
         print(f"{Fore.RED}{Style.BRIGHT}🚨 ALERTA: {symbol} - SEÑALES DE VENTA (SHORT) DETECTADAS 🚨{Style.RESET_ALL}")
         #  Enviar alerta a Telegram
-        send_telegram_alert(symbol, "SHORT", current_price, explanations)
+        if send_alert:
+            send_telegram_alert(symbol, "SHORT", current_price, explanations)
     else:
         print(f"{Fore.YELLOW}{Style.BRIGHT}ℹ️ ANÁLISIS: {symbol} - SIN SEÑALES CLARAS{Style.RESET_ALL}")
     
     print("="*80)
     print(f"📊 Fecha y hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"💵 Precio actual: {Fore.CYAN}{current_price:.2f} USD{Style.RESET_ALL}")
-    print(f"⏱️ Timeframe: {TIMEFRAME}")
+    print(f"⏱️ Timeframe: {TIMEFRAME}" + (f" (confirmación en {', '.join(MULTI_TIMEFRAMES)})" if MULTI_TIMEFRAMES else ""))
     print("-"*80)
     
-    # Análisis técnico
+    # Análisis técnico (sólo los indicadores calculados para las reglas activas)
     print(f"{Fore.YELLOW}{Style.BRIGHT}📈 ANÁLISIS TÉCNICO:{Style.RESET_ALL}")
-    print(f"• Tendencia: {Fore.GREEN if last_row['trend'] == 'BULLISH' else Fore.RED if last_row['trend'] == 'BEARISH' else Fore.YELLOW}{last_row['trend']}{Style.RESET_ALL}")
-    print(f"• RSI ({RSI_PERIOD}): {Fore.GREEN if last_row['rsi'] < 50 else Fore.RED}{last_row['rsi']:.2f}{Style.RESET_ALL} {'(Sobreventa)' if last_row['rsi'] < 30 else '(Sobrecompra)' if last_row['rsi'] > 70 else ''}")
-    print(f"• MACD: {Fore.GREEN if last_row['macd'] > last_row['macd_signal'] else Fore.RED}{last_row['macd']:.6f}{Style.RESET_ALL} (Señal: {last_row['macd_signal']:.6f})")
-    print(f"• Histograma MACD: {Fore.GREEN if last_row['macd_histogram'] > 0 else Fore.RED}{last_row['macd_histogram']:.6f}{Style.RESET_ALL}")
-    print(f"• ADX ({ADX_PERIOD}): {Fore.GREEN if last_row['adx'] > ADX_THRESHOLD else Fore.YELLOW}{last_row['adx']:.2f}{Style.RESET_ALL} {'(Tendencia fuerte)' if last_row['adx'] > ADX_THRESHOLD else '(Tendencia débil)'}")
-    print(f"• DI+ / DI-: {Fore.GREEN}{last_row['di_plus']:.2f}{Style.RESET_ALL} / {Fore.RED}{last_row['di_minus']:.2f}{Style.RESET_ALL}")
-    print(f"• SMA{FAST_MA}: {last_row['sma_fast']:.2f}")
-    print(f"• SMA{SLOW_MA}: {last_row['sma_slow']:.2f}")
-    print(f"• Bandas de Bollinger: {last_row['bollinger_low']:.2f} - {last_row['bollinger_mid']:.2f} - {last_row['bollinger_high']:.2f}")
+    if 'trend' in last_row:
+        print(f"• Tendencia: {Fore.GREEN if last_row['trend'] == 'BULLISH' else Fore.RED if last_row['trend'] == 'BEARISH' else Fore.YELLOW}{last_row['trend']}{Style.RESET_ALL}")
+    if 'rsi' in last_row:
+        print(f"• RSI ({RSI_PERIOD}): {Fore.GREEN if last_row['rsi'] < 50 else Fore.RED}{last_row['rsi']:.2f}{Style.RESET_ALL} {'(Sobreventa)' if last_row['rsi'] < 30 else '(Sobrecompra)' if last_row['rsi'] > 70 else ''}")
+    if 'macd' in last_row:
+        print(f"• MACD: {Fore.GREEN if last_row['macd'] > last_row['macd_signal'] else Fore.RED}{last_row['macd']:.6f}{Style.RESET_ALL} (Señal: {last_row['macd_signal']:.6f})")
+        print(f"• Histograma MACD: {Fore.GREEN if last_row['macd_histogram'] > 0 else Fore.RED}{last_row['macd_histogram']:.6f}{Style.RESET_ALL}")
+    if 'adx' in last_row:
+        print(f"• ADX ({ADX_PERIOD}): {Fore.GREEN if last_row['adx'] > ADX_THRESHOLD else Fore.YELLOW}{last_row['adx']:.2f}{Style.RESET_ALL} {'(Tendencia fuerte)' if last_row['adx'] > ADX_THRESHOLD else '(Tendencia débil)'}")
+        print(f"• DI+ / DI-: {Fore.GREEN}{last_row['di_plus']:.2f}{Style.RESET_ALL} / {Fore.RED}{last_row['di_minus']:.2f}{Style.RESET_ALL}")
+    if 'sma_fast' in last_row:
+        print(f"• SMA{FAST_MA}: {last_row['sma_fast']:.2f}")
+    if 'sma_slow' in last_row:
+        print(f"• SMA{SLOW_MA}: {last_row['sma_slow']:.2f}")
+    if 'bollinger_mid' in last_row:
+        print(f"• Bandas de Bollinger: {last_row['bollinger_low']:.2f} - {last_row['bollinger_mid']:.2f} - {last_row['bollinger_high']:.2f}")
     
     # Análisis de volumen
     print(f"\n{Fore.YELLOW}{Style.BRIGHT}📊 ANÁLISIS DE VOLUMEN:{Style.RESET_ALL}")
     print(f"• Volumen: {last_row['volume']:.2f}")
-    print(f"• Media 20 periodos: {last_row['volume_sma']:.2f}")
-    print(f"• Ratio Volumen/Media: {Fore.GREEN if last_row['volume_ratio'] > 1 else Fore.RED}{last_row['volume_ratio']:.2f}x{Style.RESET_ALL}")
-    if last_row['volume_ratio'] > VOLUME_THRESHOLD:
-        print(f"{Fore.GREEN}• Volumen significativamente alto (>{VOLUME_THRESHOLD}x promedio){Style.RESET_ALL}")
-    if last_row['volume_decreasing_trend']:
-        print(f"{Fore.RED}• Alerta: Volumen decreciente en últimos 3 periodos (posible agotamiento){Style.RESET_ALL}")
-    
-    # Ichimoku
-    print(f"\n{Fore.YELLOW}{Style.BRIGHT}☁️ ICHIMOKU CLOUD:{Style.RESET_ALL}")
-    cloud_status = "Por ENCIMA" if last_row['above_cloud'] else "Por DEBAJO" if last_row['below_cloud'] else "DENTRO"
-    print(f"• Posición del precio: {Fore.GREEN if last_row['above_cloud'] else Fore.RED if last_row['below_cloud'] else Fore.YELLOW}{cloud_status} de la nube{Style.RESET_ALL}")
-    print(f"• Tenkan-sen (9): {last_row['ichimoku_conversion_line']:.2f}")
-    print(f"• Kijun-sen (26): {last_row['ichimoku_base_line']:.2f}")
-    print(f"• Senkou Span A: {last_row['ichimoku_a']:.2f}")
-    print(f"• Senkou Span B: {last_row['ichimoku_b']:.2f}")
-    print(f"• Kumo futuro: {Fore.GREEN if last_row['future_cloud_bullish'] else Fore.RED}{'ALCISTA (A>B)' if last_row['future_cloud_bullish'] else 'BAJISTA (A<B)'}{Style.RESET_ALL}")
+    if 'volume_ratio' in last_row:
+        print(f"• Media 20 periodos: {last_row['volume_sma']:.2f}")
+        print(f"• Ratio Volumen/Media: {Fore.GREEN if last_row['volume_ratio'] > 1 else Fore.RED}{last_row['volume_ratio']:.2f}x{Style.RESET_ALL}")
+        if last_row['volume_ratio'] > VOLUME_THRESHOLD:
+            print(f"{Fore.GREEN}• Volumen significativamente alto (>{VOLUME_THRESHOLD}x promedio){Style.RESET_ALL}")
+        if last_row['volume_decreasing_trend']:
+            print(f"{Fore.RED}• Alerta: Volumen decreciente en últimos 3 periodos (posible agotamiento){Style.RESET_ALL}")
+    
+    # Ichimoku (no se calcula en perfiles sin reglas de Ichimoku)
+    if 'above_cloud' in last_row:
+        print(f"\n{Fore.YELLOW}{Style.BRIGHT}☁️ ICHIMOKU CLOUD:{Style.RESET_ALL}")
+        cloud_status = "Por ENCIMA" if last_row['above_cloud'] else "Por DEBAJO" if last_row['below_cloud'] else "DENTRO"
+        print(f"• Posición del precio: {Fore.GREEN if last_row['above_cloud'] else Fore.RED if last_row['below_cloud'] else Fore.YELLOW}{cloud_status} de la nube{Style.RESET_ALL}")
+        print(f"• Tenkan-sen (9): {last_row['ichimoku_conversion_line']:.2f}")
+        print(f"• Kijun-sen (26): {last_row['ichimoku_base_line']:.2f}")
+        print(f"• Senkou Span A: {last_row['ichimoku_a']:.2f}")
+        print(f"• Senkou Span B: {last_row['ichimoku_b']:.2f}")
+        print(f"• Kumo futuro: {Fore.GREEN if last_row['future_cloud_bullish'] else Fore.RED}{'ALCISTA (A>B)' if last_row['future_cloud_bullish'] else 'BAJISTA (A<B)'}{Style.RESET_ALL}")
     
     # Soportes y resistencias
     if key_levels:
@@ -413,9 +376,9 @@ def generate_terminal_analysis(symbol, df, signals, explanations, key_levels=Non
             print(f"{Fore.RED}No se identificaron resistencias importantes")
         #  Mostrar soportes y resistencias dinámicas
         print(f"\n{Fore.YELLOW}Soportes y resistencias dinámicas:{Style.RESET_ALL}")
-        if last_row['last_broke_resistance'] is not None and not np.isnan(last_row['last_broke_resistance']):
+        if pd.notna(last_row['last_broke_resistance']):
             print(f"{Fore.GREEN}• Última resistencia superada (nuevo soporte): {last_row['last_broke_resistance']:.2f}{Style.RESET_ALL}")
-        if last_row['last_broke_support'] is not None and not np.isnan(last_row['last_broke_support']):
+        if pd.notna(last_row['last_broke_support']):
             print(f"{Fore.RED}• Último soporte roto (nueva resistencia): {last_row['last_broke_support']:.2f}{Style.RESET_ALL}")
     
     # Señales y explicaciones
@@ -458,52 +421,380 @@ def generate_terminal_analysis(symbol, df, signals, explanations, key_levels=Non
     #     }
     #     BACKTEST_RESULTS.append(signal_record)
 
-def main():
-    print(f"{Fore.CYAN}{Style.BRIGHT}Iniciando bot de trading de criptomonedas - Análisis Avanzado (15min)...{Style.RESET_ALL}")
-    
-    exchange = init_exchange()    
-    
-    try:  
-        for symbol in SYMBOLS:
-            print(f"\n{Fore.CYAN}Analizando {symbol} (15min)...{Style.RESET_ALL}")
-            
-            # Obtener datos
-            df = get_historical_data(exchange, symbol, TIMEFRAME)
-            if df is None:
-                continue
-            
-            # Aplicar indicadores técnicos
-            df = apply_technical_indicators(df)
-            
-            # Identificar niveles clave de soporte y resistencia
+# Obtener los datos de un símbolo (etapa de red del escaneo)
+def fetch_symbol_data(exchange, symbol):
+    if INDICATOR_ENGINE == 'streaming':
+        # Indicadores incrementales sobre velas cerradas
+        df = get_streaming_indicators(exchange, symbol, TIMEFRAME)
+    else:
+        df = get_historical_data(exchange, symbol, TIMEFRAME)
+    if df is not None and MULTI_TIMEFRAMES:
+        update_higher_timeframes(exchange, symbol, df)
+    if df is not None and ANALYSIS_CACHE_ENABLED and INDICATOR_ENGINE != 'streaming':
+        # Con caché se analizan sólo las velas cerradas: el resultado vale hasta que cierre la
+        # siguiente (la vela abierta cambia en cada consulta y no se podría reutilizar)
+        df = closed_candles(df, TIMEFRAME, now_ms())
+    return df
+
+# Armar los timeframes mayores con las velas base ya descargadas (sin pedir otros timeframes).
+# La primera vez de cada símbolo se completa el historial base que necesitan desde el almacén local.
+def update_higher_timeframes(exchange, symbol, df):
+    try:
+        if CANDLE_STORE_ENABLED and not candle_resampler.has_symbol(symbol):
+            with stage_timings.stage('fetch', symbol):
+                now = now_ms()
+                start = now - candle_resampler.base_rows() * timeframe_to_ms(TIMEFRAME)
+                history = candle_store.get_range(exchange, symbol, TIMEFRAME, start, now, now=now)
+            candle_resampler.update(symbol, to_candles(history), now)
+        with stage_timings.stage('resample', symbol):
+            candle_resampler.update(symbol, to_candles(df))
+    except Exception as e:
+        logger.error(f"Error al armar los timeframes mayores de {symbol}: {e}")
+
+# Columnas a calcular en el análisis en vivo
+def analysis_columns(rules):
+    columns = required_columns(rules)
+    if CHART_ENABLED:
+        columns |= set(CHART_COLUMNS)
+    return columns
+
+# Analizar un símbolo (etapa de CPU del escaneo, puede correr en otro proceso)
+def analyze_symbol(symbol, df, indicators_ready=False):
+    rules = enabled_rules()
+    # Aplicar sólo los indicadores técnicos que usan las reglas activas (y el gráfico)
+    if not indicators_ready:
+        with stage_timings.stage('indicators', symbol):
+            df = apply_technical_indicators(df, columns=analysis_columns(rules))
+    
+    # Identificar niveles clave de soporte y resistencia
+    key_levels = None
+    if 'key_levels' in rules:
+        with stage_timings.stage('key_levels', symbol):
             key_levels = identify_key_levels(df)
-            
-            # Analizar señales
-            signals, explanations = analyze_signals(df, key_levels)
-            
-            if signals:
-                # Generar análisis para terminal
-                generate_terminal_analysis(symbol, df, signals, explanations, key_levels)
+    
+    # Analizar señales
+    with stage_timings.stage('signals', symbol):
+        signals, explanations = analyze_signals(df, key_levels)
+    return df, key_levels, signals, explanations
+
+# Analizar todos los símbolos juntos (INDICATOR_ENGINE = 'matrix'). Los indicadores y las
+# reglas de señales se calculan en matrices (símbolos × velas); sólo los símbolos con alguna
+# regla cumplida en la última vela, o con niveles clave, pasan por analyze_signals para armar
+# las explicaciones. Devuelve {símbolo: resultado de analyze_symbol o la excepción}.
+def analyze_symbols_matrix(frames):
+    rules = enabled_rules()
+    params = resolve_params()
+    columns = analysis_columns(rules)
+    results = {}
+    for symbols, arrays in stack_frames(frames):
+        try:
+            with stage_timings.stage('indicators', f"{len(symbols)} símbolos"):
+                compute_matrix_indicators(arrays, params, columns)
+                long_count, short_count = matrix_signal_counts(arrays, params, rules)
+                indicator_frames = matrix_frames(symbols, frames, arrays, columns)
+        except Exception as e:
+            results.update((symbol, e) for symbol in symbols)
+            continue
+        for row, symbol in enumerate(symbols):
+            try:
+                df = indicator_frames[symbol]
+                key_levels = None
+                if 'key_levels' in rules:
+                    with stage_timings.stage('key_levels', symbol):
+                        key_levels = identify_key_levels(df)
+                signals, explanations = [], []
+                if long_count[row, -1] or short_count[row, -1] or (key_levels and any(key_levels)):
+                    with stage_timings.stage('signals', symbol):
+                        signals, explanations = analyze_signals(df, key_levels, params, rules)
+                results[symbol] = df, key_levels, signals, explanations
+            except Exception as e:
+                results[symbol] = e
+    return results
+
+# Dirección con más señales (None si hay empate)
+def signal_bias(signals):
+    long_count, short_count = signals.count("LONG"), signals.count("SHORT")
+    return "LONG" if long_count > short_count else "SHORT" if short_count > long_count else None
+
+# Analizar los timeframes mayores de un símbolo con las velas armadas por candle_resampler.
+# Con caché se analizan sólo sus velas cerradas y cada resultado se reutiliza hasta que
+# cierra una vela de ese timeframe. Los
+# timeframes con menos velas que las que necesitan los indicadores, o cuyo análisis falla,
+# quedan fuera de la confluencia sin afectar al resto del ciclo.
+def analyze_higher_timeframes(symbol):
+    results = {}
+    min_rows = min_indicator_rows(resolve_params())
+    for timeframe in MULTI_TIMEFRAMES:
+        df = candle_resampler.frame(symbol, timeframe, closed_only=ANALYSIS_CACHE_ENABLED)
+        if df is None or len(df) < min_rows:
+            continue
+        try:
+            last_closed = last_closed_in(df, timeframe, now_ms())
+            key = None
+            if ANALYSIS_CACHE_ENABLED and last_closed is not None:
+                key = symbol, timeframe, last_closed, STRATEGY_PARAMS_HASH
+            result = analysis_cache.get(key) if key else None
+            if result is None:
+                result = compact_analysis(analyze_symbol(f"{symbol} {timeframe}", df))
+                if key:
+                    analysis_cache.put(key, result)
+            results[timeframe] = result
+        except Exception as e:
+            logger.error(f"Error al analizar {symbol} en {timeframe}: {e}")
+    return results
+
+# Explicaciones de confluencia (o divergencia) entre las señales de TIMEFRAME y las de los
+# timeframes mayores; sin señales en un timeframe mayor se usa su tendencia
+def timeframe_confluence(signals, higher):
+    direction = "LONG" if "LONG" in signals else "SHORT"
+    explanations = []
+    for timeframe, (df, key_levels, timeframe_signals, timeframe_explanations) in higher.items():
+        bias = signal_bias(timeframe_signals)
+        trend = df['trend'].iloc[-1] if 'trend' in df else None
+        if bias == direction:
+            explanations.append(f"Confluencia {timeframe}: {timeframe_signals.count(bias)} señales {bias} en el timeframe mayor")
+        elif bias is not None:
+            explanations.append(f"Divergencia {timeframe}: el timeframe mayor da señales {bias}")
+        elif trend in ('BULLISH', 'BEARISH'):
+            agrees = (trend == 'BULLISH') == (direction == "LONG")
+            explanations.append(f"{'Confluencia' if agrees else 'Divergencia'} {timeframe}: tendencia {'alcista' if trend == 'BULLISH' else 'bajista'} en el timeframe mayor")
+    return explanations
+
+# Agregar a un resultado con señales la confluencia de los timeframes mayores (sin modificar
+# el resultado guardado en la caché)
+def add_timeframe_confluence(symbol, result):
+    df, key_levels, signals, explanations = result
+    if not signals:
+        return result
+    return df, key_levels, signals, explanations + timeframe_confluence(signals, analyze_higher_timeframes(symbol))
+
+# Resultados de análisis reutilizables mientras no cierre una vela nueva
+analysis_cache = AnalysisCache()
+# Últimas alertas enviadas, para avisar sólo señales nuevas o distintas
+alert_tracker = AlertTracker()
+# Aciertos de la caché, leídos al exportar las métricas
+CallbackMetric('analysis_cache_hits_total', 'Análisis reutilizados de la caché', 'counter', lambda: analysis_cache.hits)
+CallbackMetric('analysis_cache_misses_total', 'Análisis no encontrados en la caché', 'counter', lambda: analysis_cache.misses)
+CallbackMetric('analysis_cache_entries', 'Análisis guardados en la caché', 'gauge', lambda: len(analysis_cache))
+STRATEGY_PARAMS_HASH = params_hash()
+
+# Clave de caché: (símbolo, timeframe, última vela cerrada, parámetros). Con la caché activa
+# fetch_symbol_data sólo entrega velas cerradas, así que la clave cubre todo lo analizado.
+def analysis_cache_key(symbol, df):
+    last_closed = last_closed_in(df, TIMEFRAME, now_ms())
+    if last_closed is None:
+        return None
+    return symbol, TIMEFRAME, last_closed, STRATEGY_PARAMS_HASH
+
+# Guardar en caché sólo la última vela del DataFrame, que es la que usa el reporte
+def compact_analysis(result):
+    df, key_levels, signals, explanations = result
+    return df.iloc[-1:], key_levels, signals, explanations
 
-                #Uncomment to get Graph
-                #generate_plt(symbol,df)
+# Señales sin reporte de terminal (OUTPUT_MODE = 'headless'): la alerta de Telegram y un
+# registro estructurado con los campos de la señal
+def log_signals(symbol, df, signals, explanations, send_alert=True):
+    direction = "LONG" if "LONG" in signals else "SHORT" if "SHORT" in signals else None
+    price = float(df['close'].iloc[-1])
+    if direction and send_alert:
+        send_telegram_alert(symbol, direction, price, explanations)
+    logger.info(f"Señales {direction} en {symbol}", extra={
+        'symbol': symbol,
+        'timeframe': TIMEFRAME,
+        'candle': df.index[-1].isoformat(),
+        'price': price,
+        'signal': direction,
+        'signals': list(signals),
+        'explanations': list(explanations),
+        'alert': send_alert,
+    })
+
+# Mostrar el resultado del análisis de un símbolo (con `alerts` en False no se envían alertas)
+def report_analysis(symbol, result, cached=False, alerts=True):
+    df, key_levels, signals, explanations = result
+    if cached and not HEADLESS:
+        print(f"{Fore.BLUE}Sin velas cerradas nuevas para {symbol}, se reutiliza el último análisis{Style.RESET_ALL}")
+    if signals:
+        # Alertar sólo si la señal es nueva o cambió desde la última alerta. Las explicaciones
+        # llevan valores en vivo (RSI, ADX, volumen) y no forman parte de la firma.
+        direction = "LONG" if "LONG" in signals else "SHORT"
+        signature = (df.index[-1], direction, tuple(sorted(signals)))
+        send_alert = alerts and alert_tracker.should_alert((symbol, TIMEFRAME), signature)
+        # Generar análisis para terminal
+        with stage_timings.stage('terminal', symbol):
+            if HEADLESS:
+                log_signals(symbol, df, signals, explanations, send_alert=send_alert)
             else:
-                print(f"{Fore.YELLOW}No hay señales claras para {symbol} en este momento{Style.RESET_ALL}")
-        
-        
+                generate_terminal_analysis(symbol, df, signals, explanations, key_levels, send_alert=send_alert)
+
+        # Gráfico en segundo plano (los resultados en caché sólo guardan la última vela)
+        if CHART_ENABLED and not cached:
+            chart_renderer.submit(symbol, df)
+    elif not HEADLESS:
+        print(f"{Fore.YELLOW}No hay señales claras para {symbol} en este momento{Style.RESET_ALL}")
+
+# Resumen serializable del análisis de un símbolo
+def summarize_analysis(symbol, result, cached=False):
+    df, key_levels, signals, explanations = result
+    supports, resistances = key_levels if key_levels else ([], [])
+    return {
+        'symbol': symbol,
+        'timestamp': df.index[-1].isoformat(),
+        'price': float(df['close'].iloc[-1]),
+        # Dirección de la alerta, igual que en generate_terminal_analysis
+        'signal': "LONG" if "LONG" in signals else "SHORT" if "SHORT" in signals else None,
+        'signals': list(signals),
+        'explanations': list(explanations),
+        'supports': [[float(price), int(touches)] for price, touches in supports],
+        'resistances': [[float(price), int(touches)] for price, touches in resistances],
+        'cached': cached,
+    }
+
+# Analizar los símbolos y devolver un resumen por cada símbolo analizado.
+# on_analyzed(symbol) se llama cuando el análisis y el reporte de un símbolo terminan bien.
+def main(exchange=None, symbols=SYMBOLS, fetch=None, on_analyzed=None):
+    summaries = []
+    if not HEADLESS:
+        print(f"{Fore.CYAN}{Style.BRIGHT}Iniciando bot de trading de criptomonedas - Análisis Avanzado (15min)...{Style.RESET_ALL}")
+    
+    if exchange is None:
+        exchange = get_exchange()
+    
+    profile_mode = stage_timings.begin_cycle()
+    started = time.perf_counter()
+    # El ciclo debería terminar antes de que cierre la vela siguiente
+    deadline = next_close(now_ms(), TIMEFRAME)
+    try:  
+        # Descargas en paralelo; los resultados llegan en el orden de SYMBOLS
+        fetch = fetch or partial(fetch_symbol_data, exchange)
+        analyze = partial(analyze_symbol, indicators_ready=INDICATOR_ENGINE == 'streaming')
+        cache_options = {}
+        if ANALYSIS_CACHE_ENABLED:
+            cache_options = {'cache': analysis_cache, 'cache_key': analysis_cache_key, 'cache_value': compact_analysis}
+        # cProfile sólo ve este hilo: el ciclo perfilado con cProfile se escanea en secuencia
+        concurrency = 1 if profile_mode == 'cprofile' else SCAN_CONCURRENCY
+        with profile_cycle(profile_mode):
+            if INDICATOR_ENGINE == 'matrix':
+                # Descargas en paralelo y un único análisis de todos los símbolos
+                scans = scan_symbols_batch(symbols, fetch, analyze_symbols_matrix, concurrency, **cache_options)
+            else:
+                scans = scan_symbols(symbols, fetch, analyze, concurrency, **cache_options)
+            for scan in scans:
+                if scan['result'] is None:
+                    continue
+                symbol = scan['symbol']
+                result = scan['result']
+                if MULTI_TIMEFRAMES:
+                    result = add_timeframe_confluence(symbol, result)
+                if not HEADLESS:
+                    print(f"\n{Fore.CYAN}Analizando {symbol} (15min)...{Style.RESET_ALL}")
+                report_analysis(symbol, result, cached=scan['cached'])
+                summary = summarize_analysis(symbol, result, cached=scan['cached'])
+                summaries.append(summary)
+                if on_analyzed:
+                    on_analyzed(symbol)
+                symbols_analyzed.labels(str(scan['cached']).lower()).inc()
+                if summary['signal'] and not scan['cached']:
+                    signals_emitted.labels(summary['signal']).inc()
+
+        # Un único mensaje de Telegram por chat con las alertas de este ciclo
+        end_alert_cycle()
+        # Publicar el resultado del ciclo para la API de sólo lectura
+        signal_snapshot.update(summaries)
             
     except KeyboardInterrupt:
         print(f"\n{Fore.YELLOW}Bot detenido manualmente{Style.RESET_ALL}")
     except Exception as e:
-        print(f"\n{Fore.RED}Error en el bot: {e}{Style.RESET_ALL}")
+        if HEADLESS:
+            logger.exception(f"Error en el bot: {e}")
+        else:
+            print(f"\n{Fore.RED}Error en el bot: {e}{Style.RESET_ALL}")
+    stage_timings.end_cycle()
+    cycle_duration.observe(time.perf_counter() - started)
+    overrun = max(0, now_ms() - deadline) / 1000
+    cycle_overrun.observe(overrun)
+    if overrun > 0:
+        cycles_late.inc()
+    return summaries
+
+# Analizar sólo al cierre de cada vela y sólo los símbolos con una vela cerrada nueva
+def run_on_candle_close():
+    exchange = init_exchange()
+    tracker = ClosedCandleTracker()
+
+    # Última vela cerrada descargada de cada símbolo, pendiente de análisis
+    fetched = {}
+
+    # Descargar y descartar los símbolos cuya última vela cerrada ya fue analizada. Se analizan
+    # sólo las velas cerradas: la vela recién abierta tiene segundos y sus valores no significan nada.
+    def fetch_new_candle(symbol):
+        df = fetch_symbol_data(exchange, symbol)
+        if df is None:
+            return None
+        now = now_ms()
+        last_closed = last_closed_in(df, TIMEFRAME, now)
+        if not tracker.is_new(symbol, last_closed):
+            return None
+        fetched[symbol] = last_closed
+        return closed_candles(df, TIMEFRAME, now)
+
+    # La vela cuenta como analizada sólo si el análisis terminó (si falla se reintenta)
+    def mark_analyzed(symbol):
+        tracker.update(symbol, fetched.pop(symbol, None))
+
+    def on_close(timeframes):
+        now = now_ms()
+        pending = [symbol for symbol in SYMBOLS if not tracker.is_current(symbol, TIMEFRAME, now)]
+        if pending:
+            main(exchange, pending, fetch_new_candle, mark_analyzed)
+        # Listo cuando todos los símbolos tienen analizada la última vela cerrada
+        return all(tracker.is_current(symbol, TIMEFRAME, now) for symbol in SYMBOLS)
+
+    # Primer análisis inmediato con las velas ya cerradas
+    on_close([TIMEFRAME])
+    scheduler = CandleCloseScheduler([TIMEFRAME])
+    while True:
+        wakeup, _ = scheduler.next_wakeup()
+        if not HEADLESS:
+            next_time = datetime.fromtimestamp(wakeup / 1000).strftime('%H:%M:%S')
+            print(f"\n{Fore.BLUE}Próximo análisis al cierre de vela: {next_time}{Style.RESET_ALL}")
+        scheduler.run(on_close, cycles=1)
+
+# Reproducir las velas del almacén local como si llegaran en vivo (pruebas sin exchange).
+# Las señales se muestran o registran pero no se envían alertas de Telegram.
+def run_replay(feed=None):
+    if feed is None:
+        frames = {symbol: to_dataframe(candle_store.load(EXCHANGE_ID, symbol, TIMEFRAME)) for symbol in SYMBOLS}
+        feed = ReplayFeed(frames, TIMEFRAME)
+    for symbol, timeframe, df in feed.events():
+        if not HEADLESS:
+            print(f"\n{Fore.CYAN}Analizando {symbol} ({timeframe}) - vela {df.index[-1]}{Style.RESET_ALL}")
+        try:
+            report_analysis(symbol, analyze_symbol(symbol, df, indicators_ready=False), alerts=False)
+        except Exception as e:
+            logger.error(f"Error al analizar {symbol}: {e}")
 
 if __name__ == "__main__":
+    # `kill -USR1 <pid>` perfila el próximo ciclo
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: stage_timings.request_profile())
+    if SCHEDULER_MODE == 'candle_close':
+        try:
+            run_on_candle_close()
+        except KeyboardInterrupt:
+            print(f"\n{Fore.YELLOW}Bot detenido manualmente{Style.RESET_ALL}")
+    elif SCHEDULER_MODE == 'replay':
+        run_replay()
+    else:
         WAIT_TIME = 30
         while True:
             main()
+            if HEADLESS:
+                time.sleep(WAIT_TIME)
+                continue
             wait_message = f"Esperando {WAIT_TIME} segundos antes del próximo análisis..."
             print(f"\n{Fore.BLUE}{wait_message}{Style.RESET_ALL}")
             for i in range(WAIT_TIME, 0, -1):
                 print(f"\r{Fore.BLUE}Próximo análisis en: {i} segundos...{Style.RESET_ALL}", end="")
                 time.sleep(1)
-            print("\r" + " " * len("Próximo análisis en: 30 segundos..."), end="\r")
\ No newline at end of file
+            print("\r" + " " * len("Próximo análisis en: 30 segundos..."), end="\r")
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from logger_config import logger
+from metrics import fetch_ohlcv
+from timeframes import timeframe_to_ms, now_ms
+from initial_config import CANDLE_STORE_DIR
+
+# Cada vela se guarda como 6 float64: timestamp (ms), open, high, low, close, volume
+FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+ROW_WIDTH = len(FIELDS)
+FETCH_LIMIT = 1000
+
+
+# Almacén local de velas OHLCV cerradas, un archivo binario por (exchange, símbolo, timeframe).
+# Los archivos se leen con np.memmap, por lo que abrir años de velas es instantáneo, y las
+# velas nuevas se agregan al final sin reescribir el archivo.
+class CandleStore:
+    def __init__(self, base_dir=CANDLE_STORE_DIR):
+        self.base_dir = base_dir
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+
+    def _path(self, exchange_id, symbol, timeframe):
+        safe_symbol = symbol.replace('/', '_').replace(':', '_')
+        return os.path.join(self.base_dir, exchange_id, safe_symbol, f"{timeframe}.f64")
+
+    def _lock(self, path):
+        with self.locks_guard:
+            return self.locks.setdefault(path, threading.Lock())
+
+    # Velas guardadas como array (n, 6) de sólo lectura mapeado en memoria
+    def load(self, exchange_id, symbol, timeframe):
+        path = self._path(exchange_id, symbol, timeframe)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty((0, ROW_WIDTH))
+        return np.memmap(path, dtype=np.float64, mode='r').reshape(-1, ROW_WIDTH)
+
+    # Agregar velas posteriores a la última guardada
+    def append(self, exchange_id, symbol, timeframe, candles):
+        candles = np.asarray(candles, dtype=np.float64).reshape(-1, ROW_WIDTH)
+        if len(candles) == 0:
+            return
+        path = self._path(exchange_id, symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            f.write(np.ascontiguousarray(candles).tobytes())
+
+    # Reescribir todas las velas (usado al rellenar huecos o agregar historial anterior)
+    def replace(self, exchange_id, symbol, timeframe, candles):
+        candles = np.asarray(candles, dtype=np.float64).reshape(-1, ROW_WIDTH)
+        path = self._path(exchange_id, symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(candles).tobytes())
+        os.replace(tmp_path, path)
+
+    # Huecos conocidos que el exchange no pudo completar (mantenimientos, etc.)
+    def _known_gaps(self, exchange_id, symbol, timeframe):
+        path = self._path(exchange_id, symbol, timeframe) + '.gaps.json'
+        if not os.path.exists(path):
+            return set()
+        with open(path) as f:
+            return {tuple(gap) for gap in json.load(f)}
+
+    def _save_known_gaps(self, exchange_id, symbol, timeframe, gaps):
+        path = self._path(exchange_id, symbol, timeframe) + '.gaps.json'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(sorted(gaps), f)
+
+    # Traer del exchange las velas cerradas más nuevas que la última guardada.
+    # Devuelve la vela abierta más reciente (o None) para que el bot en vivo la pueda usar.
+    def sync(self, exchange, symbol, timeframe, limit=500, now=None):
+        now = now_ms() if now is None else now
+        duration = timeframe_to_ms(timeframe)
+        path = self._path(exchange.id, symbol, timeframe)
+
+        with self._lock(path):
+            stored = self.load(exchange.id, symbol, timeframe)
+            if len(stored):
+                candles = _fetch_range(exchange, symbol, timeframe, int(stored[-1, 0]) + duration, now)
+            else:
+                candles = fetch_ohlcv(exchange, symbol, timeframe, limit=limit)
+            candles = np.asarray(candles, dtype=np.float64).reshape(-1, ROW_WIDTH)
+
+            closed = candles[candles[:, 0] + duration <= now]
+            open_candle = candles[-1] if len(candles) and candles[-1, 0] + duration > now else None
+            if len(stored):
+                closed = closed[closed[:, 0] > stored[-1, 0]]
+            self.append(exchange.id, symbol, timeframe, closed)
+            return open_candle
+
+    # Velas para el bot en vivo: las últimas cerradas guardadas más la vela abierta actual,
+    # igual que devolvía fetch_ohlcv(limit=limit)
+    def get_candles(self, exchange, symbol, timeframe, limit=500, now=None):
+        open_candle = self.sync(exchange, symbol, timeframe, limit=limit, now=now)
+        stored = self.load(exchange.id, symbol, timeframe)
+        if open_candle is not None:
+            candles = np.vstack([stored[-(limit - 1):] if limit > 1 else stored[:0], open_candle])
+        else:
+            candles = np.array(stored[-limit:])
+        return to_dataframe(candles)
+
+    # Velas cerradas en [start, end] (timestamps en ms) para el backtesting.
+    # Completa desde el exchange el historial anterior, posterior y los huecos que falten.
+    def get_range(self, exchange, symbol, timeframe, start, end, now=None):
+        now = now_ms() if now is None else now
+        duration = timeframe_to_ms(timeframe)
+        end = min(end, now - duration)
+        path = self._path(exchange.id, symbol, timeframe)
+
+        with self._lock(path):
+            stored = np.array(self.load(exchange.id, symbol, timeframe))
+            known_gaps = self._known_gaps(exchange.id, symbol, timeframe)
+            fetched = []
+
+            if len(stored) == 0:
+                fetched.append(_fetch_range(exchange, symbol, timeframe, start, end))
+            else:
+                # Historial anterior a lo guardado
+                if start < stored[0, 0]:
+                    fetched.append(_fetch_range(exchange, symbol, timeframe, start, int(stored[0, 0]) - 1))
+                # Historial posterior a lo guardado
+                if end > stored[-1, 0]:
+                    fetched.append(_fetch_range(exchange, symbol, timeframe, int(stored[-1, 0]) + duration, end))
+                # Huecos dentro del rango pedido
+                for gap in find_gaps(stored[:, 0], duration, start, end):
+                    if gap not in known_gaps:
+                        fetched.append(_fetch_range(exchange, symbol, timeframe, gap[0], gap[1]))
+
+            fetched = [np.asarray(c, dtype=np.float64).reshape(-1, ROW_WIDTH) for c in fetched if len(c)]
+            if fetched:
+                merged = np.vstack([stored] + fetched)
+                merged = merged[merged[:, 0] + duration <= now]
+                merged = merged[np.unique(merged[:, 0], return_index=True)[1]]
+                self.replace(exchange.id, symbol, timeframe, merged)
+                stored = merged
+
+            # Registrar huecos que el exchange no pudo completar para no pedirlos otra vez
+            remaining = set(find_gaps(stored[:, 0], duration, start, end)) if len(stored) else set()
+            if remaining - known_gaps:
+                logger.warning(f"Huecos sin datos en {symbol} {timeframe}: {len(remaining - known_gaps)}")
+                self._save_known_gaps(exchange.id, symbol, timeframe, known_gaps | remaining)
+
+        in_range = (stored[:, 0] >= start) & (stored[:, 0] <= end) if len(stored) else np.zeros(0, dtype=bool)
+        return to_dataframe(stored[in_range])
+
+
+# Rangos [inicio, fin] de velas faltantes entre timestamps consecutivos dentro de [start, end]
+def find_gaps(timestamps, duration, start=None, end=None):
+    timestamps = np.asarray(timestamps)
+    if len(timestamps) < 2:
+        return []
+    missing = np.flatnonzero(np.diff(timestamps) > duration)
+    gaps = []
+    for i in missing:
+        gap_start = int(timestamps[i]) + duration
+        gap_end = int(timestamps[i + 1]) - duration
+        if (start is None or gap_end >= start) and (end is None or gap_start <= end):
+            gaps.append((gap_start, gap_end))
+    return gaps
+
+
+# Descargar velas paginando desde `since` hasta `until` (inclusive)
+def _fetch_range(exchange, symbol, timeframe, since, until, limit=FETCH_LIMIT):
+    candles = []
+    while since <= until:
+        batch = fetch_ohlcv(exchange, symbol, timeframe, since=since, limit=limit)
+        if not batch:
+            break
+        candles.extend(candle for candle in batch if candle[0] <= until)
+        # Página incompleta: no hay más velas disponibles por ahora
+        if batch[-1][0] < since or len(batch) < limit:
+            break
+        since = batch[-1][0] + 1
+    return candles
+
+
+# Convertir un array (n, 6) al DataFrame que usa el resto del bot
+def to_dataframe(candles):
+    candles = np.asarray(candles, dtype=np.float64).reshape(-1, ROW_WIDTH)
+    df = pd.DataFrame(candles[:, 1:], columns=FIELDS[1:])
+    df['timestamp'] = pd.to_datetime(candles[:, 0].astype(np.int64), unit='ms')
+    df.set_index('timestamp', inplace=True)
+    return df
+
+
+# Convertir un DataFrame OHLCV indexado por timestamp al array (n, 6)
+def to_candles(df):
+    timestamps = df.index.as_unit('ms').asi8.astype(np.float64)
+    return np.column_stack([timestamps, df[FIELDS[1:]].to_numpy(dtype=np.float64)])
+
+
+# Almacén compartido por el bot y el backtesting
+candle_store = CandleStore()
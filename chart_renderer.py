@@ -0,0 +1,210 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from logger_config import logger
+from initial_config import FAST_MA, SLOW_MA, CHART_DIR, CHART_MAX_POINTS, CHART_PROCESSES, CHART_MAX_PENDING, CHART_TASKS_PER_CHILD
+
+# Columnas que usa el gráfico (sólo éstas se envían al proceso que dibuja)
+CHART_COLUMNS = ['close', 'sma_fast', 'sma_slow', 'bollinger_high', 'bollinger_mid', 'bollinger_low',
+                 'ichimoku_conversion_line', 'ichimoku_base_line', 'ichimoku_a', 'ichimoku_b',
+                 'rsi', 'macd', 'macd_signal', 'macd_histogram', 'volume', 'volume_sma']
+
+
+# Largest-Triangle-Three-Buckets: elige `threshold` puntos que conservan la forma de la serie.
+# Devuelve los índices elegidos (siempre incluye el primero y el último).
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    edges = np.minimum((np.arange(threshold - 1) * every).astype(np.int64) + 1, n - 1)
+    edges[-1] = n - 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Promedio del bucket siguiente (el último punto para el último bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_start = end
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Área del triángulo entre el punto elegido anterior, cada candidato y el promedio siguiente
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+        selected[i + 1] = a
+    return selected
+
+
+# Reducir cada tramo entre índices elegidos a un valor: el máximo (volumen) o el de mayor
+# magnitud conservando el signo (histograma MACD), para no perder picos al reducir
+def _segment_reduce(values, selected, signed=False):
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    if len(selected) == len(values):
+        return values
+    if signed:
+        peaks = np.maximum.reduceat(values, selected)
+        troughs = np.minimum.reduceat(values, selected)
+        return np.where(np.abs(troughs) > np.abs(peaks), troughs, peaks)
+    return np.maximum.reduceat(values, selected)
+
+
+# Velas reducidas a lo sumo a max_points puntos elegidos con LTTB sobre el cierre
+def downsample(df, max_points=CHART_MAX_POINTS):
+    import matplotlib.dates as mdates
+    x = mdates.date2num(df.index.to_pydatetime())
+    selected = lttb(x, df['close'].to_numpy(dtype=float), max_points)
+    sampled = {column: df[column].to_numpy(dtype=float)[selected] for column in CHART_COLUMNS if column in df.columns}
+    sampled['macd_histogram'] = _segment_reduce(df['macd_histogram'], selected, signed=True)
+    sampled['volume'] = _segment_reduce(df['volume'], selected)
+    # Nube adelantada 26 velas, como en el gráfico original
+    for column in ('ichimoku_a', 'ichimoku_b'):
+        sampled[f'{column}_shifted'] = df[column].shift(26).ffill().to_numpy(dtype=float)[selected]
+    sampled['volume_up'] = (df['volume'] > df['volume'].shift(1)).to_numpy()[selected]
+    return x[selected], sampled
+
+
+# Barras de MACD y volumen como una única colección de líneas verticales
+# (una barra por vela con ax.bar es lo más lento del gráfico)
+def _draw_bars(ax, x, values, colors, label, alpha):
+    linewidth = min(4.0, max(0.5, 700 / max(len(x), 1)))
+    ax.vlines(x, 0, values, colors=colors, linewidth=linewidth, alpha=alpha, label=label)
+
+
+# Dibujar el gráfico de análisis técnico con la API orientada a objetos de Matplotlib
+# (sin estado global de pyplot) y guardarlo en `path`. Devuelve la ruta de la imagen.
+# Matplotlib se importa recién al dibujar: importar este módulo (el bot, el servidor) no lo carga.
+def render_chart(symbol, df, signals=None, path=None, max_points=CHART_MAX_POINTS):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.dates as mdates
+    if path is None:
+        os.makedirs(CHART_DIR, exist_ok=True)
+        path = os.path.join(CHART_DIR, f"signal_{symbol.replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+    x, data = downsample(df, max_points)
+
+    fig = Figure(figsize=(14, 10))
+    FigureCanvasAgg(fig)
+    ax1, ax2, ax3, ax4 = fig.subplots(4, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1, 1, 1]})
+
+    # Precio, medias móviles, Bollinger e Ichimoku
+    ax1.set_title(f'Análisis Técnico de {symbol}', fontsize=14)
+    ax1.plot(x, data['close'], label='Precio', color='black', linewidth=1.5)
+    ax1.plot(x, data['sma_fast'], label=f'SMA {FAST_MA}', color='blue', linewidth=1)
+    ax1.plot(x, data['sma_slow'], label=f'SMA {SLOW_MA}', color='red', linewidth=1)
+    ax1.plot(x, data['bollinger_high'], 'g--', linewidth=0.8, alpha=0.7)
+    ax1.plot(x, data['bollinger_mid'], 'g-', linewidth=0.8, alpha=0.7)
+    ax1.plot(x, data['bollinger_low'], 'g--', linewidth=0.8, alpha=0.7)
+    ax1.fill_between(x, data['bollinger_high'], data['bollinger_low'], color='gray', alpha=0.1, label='Bollinger Bands')
+    ax1.plot(x, data['ichimoku_conversion_line'], color='blue', linewidth=0.8, label='Tenkan-sen')
+    ax1.plot(x, data['ichimoku_base_line'], color='red', linewidth=0.8, label='Kijun-sen')
+    if len(df) > 26:
+        cloud_a, cloud_b = data['ichimoku_a_shifted'], data['ichimoku_b_shifted']
+        ax1.fill_between(x, cloud_a, cloud_b, where=cloud_a >= cloud_b, color='green', alpha=0.1)
+        ax1.fill_between(x, cloud_a, cloud_b, where=cloud_a < cloud_b, color='red', alpha=0.1)
+
+    # Señales del backtesting: un scatter por tipo en lugar de uno por señal
+    if signals:
+        signals = pd.DataFrame(signals)
+        for signal_type, marker, color in (('LONG', '^', 'green'), ('SHORT', 'v', 'red')):
+            selected = signals[signals['signal'] == signal_type]
+            if len(selected):
+                ax1.scatter(mdates.date2num(pd.to_datetime(selected['date']).dt.to_pydatetime()), selected['entry_price'],
+                            marker=marker, color=color, s=100, label=f'Señal {signal_type}')
+
+    ax1.legend(loc='upper left')
+    ax1.grid(True, alpha=0.3)
+    ax1.set_ylabel('Precio', fontsize=12)
+
+    # RSI
+    rsi = data['rsi']
+    ax2.plot(x, rsi, label='RSI', color='purple', linewidth=1)
+    ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5)
+    ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5)
+    with np.errstate(invalid='ignore'):
+        ax2.fill_between(x, rsi, 70, where=rsi >= 70, color='r', alpha=0.3)
+        ax2.fill_between(x, rsi, 30, where=rsi <= 30, color='g', alpha=0.3)
+    ax2.set_ylabel('RSI', fontsize=12)
+    ax2.grid(True, alpha=0.3)
+    ax2.legend(loc='upper left')
+    ax2.set_ylim(0, 100)
+
+    # MACD
+    histogram = data['macd_histogram']
+    ax3.plot(x, data['macd'], label='MACD', color='blue', linewidth=1)
+    ax3.plot(x, data['macd_signal'], label='Señal', color='red', linewidth=1)
+    _draw_bars(ax3, x, histogram, np.where(histogram >= 0, 'green', 'red'), 'Histograma', 0.5)
+    ax3.axhline(y=0, color='k', linestyle='-', alpha=0.3)
+    ax3.grid(True, alpha=0.3)
+    ax3.set_ylabel('MACD', fontsize=12)
+    ax3.legend(loc='upper left')
+
+    # Volumen
+    _draw_bars(ax4, x, data['volume'], np.where(data['volume_up'], 'green', 'red'), 'Volumen', 0.7)
+    ax4.plot(x, data['volume_sma'], label='Media Volumen', color='blue', linewidth=1)
+    ax4.set_ylabel('Volumen', fontsize=12)
+    ax4.grid(True, alpha=0.3)
+    ax4.legend(loc='upper left')
+
+    # Formato de fecha en el eje x
+    ax4.xaxis_date()
+    ax4.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+# Servicio de gráficos en segundo plano: los renders corren en un pool de procesos y el
+# ciclo de análisis sólo encola el pedido. Cada proceso se recicla tras
+# tasks_per_child renders para que la memoria no crezca con el tiempo.
+class ChartRenderer:
+    def __init__(self, processes=CHART_PROCESSES, max_pending=CHART_MAX_PENDING, tasks_per_child=CHART_TASKS_PER_CHILD):
+        self.processes = processes
+        self.max_pending = max_pending
+        self.tasks_per_child = tasks_per_child
+        self.pool = None
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'),
+                                            max_tasks_per_child=self.tasks_per_child)
+        return self.pool
+
+    # Encolar un gráfico. Devuelve un Future con la ruta de la imagen, o None si hay
+    # demasiados gráficos pendientes (el pedido se descarta en lugar de frenar el análisis).
+    def submit(self, symbol, df, signals=None, path=None):
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                logger.warning(f"Gráfico de {symbol} descartado: {len(self.pending)} gráficos pendientes")
+                return None
+            columns = [column for column in CHART_COLUMNS if column in df.columns]
+            future = self._get_pool().submit(render_chart, symbol, df[columns], signals, path)
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+        if future.exception() is not None:
+            logger.error(f"Error al generar gráfico: {future.exception()}")
+
+    def shutdown(self, wait=True):
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait)
+            self.pool = None
+
+
+# Servicio compartido por el bot
+chart_renderer = ChartRenderer()
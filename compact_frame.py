@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from initial_config import INDICATOR_DTYPE
+
+# Tendencia como categoría: un código int8 por vela en lugar de un string
+TREND_CATEGORIES = ['BEARISH', 'NEUTRAL', 'BULLISH']
+TREND_DTYPE = pd.CategoricalDtype(TREND_CATEGORIES)
+# Columnas del exchange que conservan float64 en el modo float32
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+# BULLISH si el cierre está sobre la media lenta, BEARISH si está debajo, NEUTRAL si
+# son iguales o la media todavía no existe (NaN). Códigos de TREND_CATEGORIES (int8).
+def trend_codes(close, sma_slow):
+    close = np.asarray(close, dtype=float)
+    sma_slow = np.asarray(sma_slow, dtype=float)
+    return np.where(close > sma_slow, 2, np.where(close < sma_slow, 0, 1)).astype(np.int8)
+
+
+def trend_column(close, sma_slow):
+    return pd.Categorical.from_codes(trend_codes(close, sma_slow), dtype=TREND_DTYPE)
+
+
+# Precio de la última ruptura desde la vela en que ocurrió hasta el final (NaN antes).
+# También acepta matrices (símbolos × velas): la última ruptura de cada fila.
+def last_break_column(breaks, prices):
+    breaks = np.asarray(breaks, dtype=bool)
+    column = np.full(breaks.shape, np.nan)
+    if not breaks.shape[-1]:
+        return column
+    positions = np.arange(breaks.shape[-1])
+    last = np.where(breaks, positions, -1).max(axis=-1, keepdims=True)
+    price = np.take_along_axis(np.asarray(prices, dtype=float), np.maximum(last, 0), axis=-1)
+    return np.where((last >= 0) & (positions >= last), price, column)
+
+
+# Pasar los indicadores a `dtype` (por ejemplo float32 para usar la mitad de memoria).
+# Los precios y el volumen del exchange se mantienen en float64.
+def compact_frame(df, dtype=INDICATOR_DTYPE):
+    if dtype in (None, 'float64', np.float64):
+        return df
+    columns = [column for column in df.columns if column not in PRICE_COLUMNS and df[column].dtype == np.float64]
+    if columns:
+        df[columns] = df[columns].astype(dtype)
+    return df
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from timeframes import timeframe_to_ms
+
+# Regímenes de volatilidad y volumen (bajo, normal, alto) y probabilidad de cambiar de régimen en cada vela
+VOLATILITY_REGIMES = np.array([0.002, 0.004, 0.009])
+VOLUME_REGIMES = np.array([0.5, 1.0, 3.0])
+REGIME_SWITCH_PROBABILITY = 0.01
+
+
+# Velas OHLCV sintéticas y deterministas (misma semilla = mismas velas).
+# Caminata aleatoria del precio con regímenes de volatilidad y volumen que cambian
+# al azar, para que los indicadores y las señales se comporten como con datos reales.
+def synthetic_ohlcv(rows, seed=0, timeframe='15m', start='2024-01-01', base_price=100.0, base_volume=1000.0):
+    rng = np.random.default_rng(seed)
+
+    # Régimen de cada vela: cambia con probabilidad REGIME_SWITCH_PROBABILITY
+    switches = rng.random(rows) < REGIME_SWITCH_PROBABILITY
+    last_switch = np.maximum.accumulate(np.where(switches, np.arange(rows), 0))
+    regime = rng.integers(0, len(VOLATILITY_REGIMES), rows)[last_switch]
+    # Régimen normal hasta el primer cambio
+    regime[last_switch == 0] = 1
+
+    volatility = VOLATILITY_REGIMES[regime]
+    returns = rng.standard_normal(rows) * volatility
+    close = np.round(base_price * np.exp(np.cumsum(returns)), 2)
+    open_ = np.r_[base_price, close[:-1]]
+    high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.standard_normal(rows)) * volatility / 2), 2)
+    low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.standard_normal(rows)) * volatility / 2), 2)
+    # Más volumen en los regímenes volátiles y en las velas con movimientos grandes
+    volume = base_volume * VOLUME_REGIMES[regime] * rng.lognormal(0, 0.4, rows) * (1 + np.abs(returns) / volatility)
+
+    index = pd.date_range(start, periods=rows, freq=pd.Timedelta(milliseconds=timeframe_to_ms(timeframe)), name='timestamp')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+# Reemplazo sin red de ccxt.binance para pruebas y benchmarks.
+# Sirve velas de DataFrames OHLCV por símbolo con la misma forma que fetch_ohlcv de ccxt.
+class FakeExchange:
+    id = 'fake'
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = 0
+        self.arrays = {}
+        for symbol, df in frames.items():
+            timestamps = df.index.as_unit('ms').asi8
+            values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+            self.arrays[symbol] = (timestamps, values)
+
+    # Velas [timestamp, open, high, low, close, volume]: las `limit` primeras desde `since`
+    # o, sin `since`, las `limit` más recientes
+    def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=500, params=None):
+        self.calls += 1
+        timestamps, values = self.arrays[symbol]
+        if since is None:
+            start = max(0, len(timestamps) - limit)
+        else:
+            start = int(np.searchsorted(timestamps, since, side='left'))
+        end = min(len(timestamps), start + limit)
+        return [[int(timestamps[i])] + values[i].tolist() for i in range(start, end)]
@@ -0,0 +1,91 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from colorama import Fore, Style
+
+# Módulo medido por defecto: el punto de entrada serverless (vercel.json)
+IMPORT_REPORT_MODULE = 'api.server'
+IMPORT_REPORT_REPEAT = 5
+IMPORT_REPORT_TOP = 15
+# Tiempo máximo para importar el módulo en un intérprete nuevo (ms, mediana de las repeticiones)
+IMPORT_BUDGET_MS = 500
+# Librerías pesadas que el servidor sólo importa al usarlas (análisis, exchange, gráficos)
+LAZY_MODULES = ['ccxt', 'matplotlib', 'pandas', 'ta', 'numpy']
+
+# Línea de -X importtime: "import time: <propio us> | <acumulado us> | <sangría><módulo>"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+# Importar `module` en un intérprete nuevo con -X importtime.
+# Devuelve {módulo: (propio, acumulado)} en segundos, en el orden en que terminaron de cargarse.
+def import_times(module, cwd=None):
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=cwd)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.returncode
+        raise RuntimeError(f"No se pudo importar {module}: {error}")
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)) / 1e6, int(match.group(2)) / 1e6)
+    return times
+
+
+# Medir `repeat` arranques en frío. Devuelve la mediana del tiempo total y el detalle de la
+# medición más cercana a la mediana.
+def measure_import(module, repeat=IMPORT_REPORT_REPEAT):
+    runs = [import_times(module) for _ in range(repeat)]
+    totals = [times[module][1] for times in runs]
+    median = statistics.median(totals)
+    times = min(runs, key=lambda times: abs(times[module][1] - median))
+    return median, times
+
+
+# Librerías de `lazy` cargadas durante la importación
+def loaded_lazy_modules(times, lazy=LAZY_MODULES):
+    return [name for name in lazy if name in times]
+
+
+def print_report(module, total, times, top=IMPORT_REPORT_TOP):
+    print(f"{Fore.CYAN}{Style.BRIGHT}Importación de {module}: {total * 1000:.1f} ms{Style.RESET_ALL}")
+    print(f"\n{Fore.YELLOW}Módulos con más tiempo acumulado:{Style.RESET_ALL}")
+    ranked = sorted(((name, cumulative) for name, (own, cumulative) in times.items() if name != module), key=lambda item: -item[1])
+    for name, cumulative in ranked[:top]:
+        print(f"  {cumulative * 1000:>9.1f} ms  {name}")
+    print(f"\n{Fore.YELLOW}Módulos con más tiempo propio:{Style.RESET_ALL}")
+    for name, (own, cumulative) in sorted(times.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"  {own * 1000:>9.1f} ms  {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tiempo de importación en frío (-X importtime) con presupuesto')
+    parser.add_argument('module', nargs='?', default=IMPORT_REPORT_MODULE)
+    parser.add_argument('--repeat', type=int, default=IMPORT_REPORT_REPEAT)
+    parser.add_argument('--top', type=int, default=IMPORT_REPORT_TOP, help='módulos a listar')
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help='tiempo máximo en ms')
+    parser.add_argument('--lazy', nargs='*', default=LAZY_MODULES, help='librerías que no deben cargarse al importar')
+    args = parser.parse_args(argv)
+
+    total, times = measure_import(args.module, args.repeat)
+    print_report(args.module, total, times, args.top)
+
+    failures = []
+    if total * 1000 > args.budget:
+        failures.append(f"{total * 1000:.1f} ms supera el presupuesto de {args.budget:.0f} ms")
+    loaded = loaded_lazy_modules(times, args.lazy)
+    if loaded:
+        failures.append(f"se importan al arrancar: {', '.join(loaded)}")
+    if failures:
+        print(f"\n{Fore.RED}{Style.BRIGHT}Regresión: {'; '.join(failures)}{Style.RESET_ALL}")
+        return 1
+    print(f"\n{Fore.GREEN}Dentro del presupuesto de {args.budget:.0f} ms{Style.RESET_ALL}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import ta
+from pivots import pivot_columns
+from compact_frame import trend_column, last_break_column
+from initial_config import PIVOT_WINDOW, SIGNAL_PROFILE, SIGNAL_PROFILES, SIGNAL_RULES
+
+# Columnas del exchange (no las calcula ningún indicador)
+BASE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# Columnas que consume cada regla de analyze_signals, en el orden en que se evalúan
+RULES = {
+    'ma_cross': ['sma_fast', 'sma_slow'],
+    'rsi': ['rsi'],
+    'macd': ['macd', 'macd_signal'],
+    'adx': ['adx', 'di_plus', 'di_minus'],
+    'bollinger': ['bollinger_low', 'bollinger_high'],
+    'volume': ['volume_ratio'],
+    'volume_exhaustion': ['volume_decreasing_trend', 'trend'],
+    'ichimoku': ['above_cloud', 'below_cloud', 'ichimoku_conversion_line', 'ichimoku_base_line'],
+    'kumo': ['future_cloud_bullish', 'future_cloud_bearish'],
+    'key_levels': ['is_support', 'is_resistance', 'last_broke_resistance', 'last_broke_support', 'trend', 'macd_histogram'],
+}
+
+
+# Indicador registrado: columnas (o attrs) que produce, columnas que necesita y
+# parámetros de la estrategia que usa. compute(df, params) agrega sus columnas a df.
+class Indicator:
+    def __init__(self, name, outputs, inputs, params, compute):
+        self.name = name
+        self.outputs = outputs
+        self.inputs = inputs
+        self.params = params
+        self.compute = compute
+
+
+# Indicadores en el orden en que se agregan las columnas (cada uno después de sus entradas)
+INDICATORS = {}
+
+
+def indicator(name, outputs, inputs=('close',), params=()):
+    def register(compute):
+        INDICATORS[name] = Indicator(name, list(outputs), list(inputs), list(params), compute)
+        return compute
+    return register
+
+
+@indicator('sma_fast', ['sma_fast'], params=['fast_ma'])
+def _sma_fast(df, params):
+    df['sma_fast'] = ta.trend.sma_indicator(df['close'], window=params['fast_ma'])
+
+
+@indicator('sma_slow', ['sma_slow'], params=['slow_ma'])
+def _sma_slow(df, params):
+    df['sma_slow'] = ta.trend.sma_indicator(df['close'], window=params['slow_ma'])
+
+
+@indicator('rsi', ['rsi'], params=['rsi_period'])
+def _rsi(df, params):
+    df['rsi'] = ta.momentum.rsi(df['close'], window=params['rsi_period'])
+
+
+@indicator('macd', ['macd', 'macd_signal', 'macd_histogram'], params=['macd_fast', 'macd_slow', 'macd_signal'])
+def _macd(df, params):
+    macd = ta.trend.MACD(df['close'], window_fast=params['macd_fast'], window_slow=params['macd_slow'], window_sign=params['macd_signal'])
+    df['macd'] = macd.macd()
+    df['macd_signal'] = macd.macd_signal()
+    df['macd_histogram'] = macd.macd_diff()
+
+
+# ADX - Average Directional Index para medir fuerza de tendencia
+@indicator('adx', ['adx', 'di_plus', 'di_minus'], inputs=['high', 'low', 'close'], params=['adx_period'])
+def _adx(df, params):
+    adx = ta.trend.ADXIndicator(df['high'], df['low'], df['close'], window=params['adx_period'])
+    df['adx'] = adx.adx()
+    df['di_plus'] = adx.adx_pos()  # Indicador Direccional Positivo
+    df['di_minus'] = adx.adx_neg()  # Indicador Direccional Negativo
+
+
+@indicator('bollinger', ['bollinger_high', 'bollinger_low', 'bollinger_mid'])
+def _bollinger(df, params):
+    bollinger = ta.volatility.BollingerBands(df['close'], window=20, window_dev=2)
+    df['bollinger_high'] = bollinger.bollinger_hband()
+    df['bollinger_low'] = bollinger.bollinger_lband()
+    df['bollinger_mid'] = bollinger.bollinger_mavg()
+
+
+@indicator('volume', ['volume_sma', 'volume_ratio', 'volume_increasing', 'volume_decreasing_trend'], inputs=['volume'])
+def _volume(df, params):
+    if isinstance(df['volume'], pd.Series):
+        df['volume_sma'] = ta.trend.sma_indicator(df['volume'], window=20)
+        df['volume_ratio'] = df['volume'] / df['volume_sma']
+        df['volume_increasing'] = df['volume'] > df['volume'].shift(1)
+        # Detectar tendencia de volumen decreciente (3 periodos consecutivos)
+        df['volume_decreasing_trend'] = (
+            (df['volume'] < df['volume'].shift(1)) &
+            (df['volume'].shift(1) < df['volume'].shift(2)) &
+            (df['volume'].shift(2) < df['volume'].shift(3))
+        )
+    else:
+        # If volume is a scalar, set default values
+        df['volume_sma'] = np.nan
+        df['volume_ratio'] = np.nan
+        df['volume_increasing'] = False
+        df['volume_decreasing_trend'] = False
+
+
+@indicator('ichimoku', ['ichimoku_conversion_line', 'ichimoku_base_line', 'ichimoku_a', 'ichimoku_b'], inputs=['high', 'low'])
+def _ichimoku(df, params):
+    ichimoku = ta.trend.IchimokuIndicator(
+        high=df['high'],
+        low=df['low'],
+        window1=9,   # Tenkan-sen (Conversion Line)
+        window2=26,  # Kijun-sen (Base Line)
+        window3=52   # Senkou Span B (Leading Span B)
+    )
+    df['ichimoku_conversion_line'] = ichimoku.ichimoku_conversion_line()
+    df['ichimoku_base_line'] = ichimoku.ichimoku_base_line()
+    df['ichimoku_a'] = ichimoku.ichimoku_a()  # Senkou Span A (Leading Span A)
+    df['ichimoku_b'] = ichimoku.ichimoku_b()  # Senkou Span B (Leading Span B)
+
+
+@indicator('cloud', ['above_cloud', 'below_cloud', 'in_cloud', 'future_cloud_bullish', 'future_cloud_bearish'],
+           inputs=['close', 'ichimoku_a', 'ichimoku_b'])
+def _cloud(df, params):
+    # Calcular si el precio está por encima o por debajo de la nube
+    df['above_cloud'] = (df['close'] > df['ichimoku_a'].shift(26)) & (df['close'] > df['ichimoku_b'].shift(26))
+    df['below_cloud'] = (df['close'] < df['ichimoku_a'].shift(26)) & (df['close'] < df['ichimoku_b'].shift(26))
+    df['in_cloud'] = ~(df['above_cloud'] | df['below_cloud'])
+    # Calcular el estado del Kumo futuro (nube adelantada)
+    df['future_cloud_bullish'] = df['ichimoku_a'] > df['ichimoku_b']
+    df['future_cloud_bearish'] = df['ichimoku_a'] < df['ichimoku_b']
+
+
+# Mínimos y máximos locales (picos para resistencias, valles para soportes)
+@indicator('pivots', ['is_resistance', 'is_support'], inputs=['high', 'low'])
+def _pivots(df, params):
+    df['is_resistance'], df['is_support'] = pivot_columns(df, PIVOT_WINDOW)
+
+
+# Niveles de soporte y resistencia basados en cuartiles de precio.
+# Un único valor por serie: se guarda en attrs en lugar de repetirlo en cada vela
+@indicator('quartile_levels', ['support_level', 'resistance_level'], inputs=['high', 'low'])
+def _quartile_levels(df, params):
+    price_range = df['high'].max() - df['low'].min()
+    df.attrs['support_level'] = float(df['low'].min() + price_range * 0.25)
+    df.attrs['resistance_level'] = float(df['low'].min() + price_range * 0.75)
+
+
+# Última resistencia superada y último soporte roto
+@indicator('breaks', ['broke_resistance', 'broke_support'], inputs=['close', 'high', 'low', 'is_resistance', 'is_support'])
+def _breaks(df, params):
+    df['broke_resistance'] = (df['close'] > df['close'].shift(1)) & df['is_resistance'].shift(1) & (df['close'] > df['high'].shift(1))
+    df['broke_support'] = (df['close'] < df['close'].shift(1)) & df['is_support'].shift(1) & (df['close'] < df['low'].shift(1))
+
+
+# Precio de la última ruptura desde que ocurrió (NaN antes)
+@indicator('last_breaks', ['last_broke_resistance', 'last_broke_support'], inputs=['high', 'low', 'broke_resistance', 'broke_support'])
+def _last_breaks(df, params):
+    df['last_broke_resistance'] = last_break_column(df['broke_resistance'], df['high'])
+    df['last_broke_support'] = last_break_column(df['broke_support'], df['low'])
+
+
+# Tendencia (categoría con códigos int8)
+@indicator('trend', ['trend'], inputs=['close', 'sma_slow'])
+def _trend(df, params):
+    df['trend'] = trend_column(df['close'], df['sma_slow'])
+
+
+# Productor de cada columna
+PRODUCERS = {output: item for item in INDICATORS.values() for output in item.outputs}
+# Todas las columnas calculables (lo que agregaba apply_technical_indicators)
+ALL_COLUMNS = [output for item in INDICATORS.values() for output in item.outputs]
+
+
+# Reglas activas: las indicadas o las del perfil (SIGNAL_RULES tiene prioridad sobre SIGNAL_PROFILE)
+def enabled_rules(rules=None, profile=None):
+    if rules is None:
+        rules = SIGNAL_RULES if profile is None else None
+    if rules is None:
+        profile = profile or SIGNAL_PROFILE
+        if profile not in SIGNAL_PROFILES:
+            raise ValueError(f"Perfil de señales desconocido: {profile}")
+        rules = SIGNAL_PROFILES[profile]
+    unknown = set(rules) - set(RULES)
+    if unknown:
+        raise ValueError(f"Reglas de señales desconocidas: {', '.join(sorted(unknown))}")
+    return frozenset(rules)
+
+
+# Columnas que necesitan las reglas
+def required_columns(rules):
+    return {column for rule in rules for column in RULES[rule]}
+
+
+# Indicadores a calcular para obtener `columns`, en orden de dependencias.
+# Cada indicador aparece una sola vez aunque varias columnas pedidas dependan de él.
+def resolve(columns):
+    unknown = set(columns) - set(PRODUCERS) - set(BASE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Columnas sin indicador registrado: {', '.join(sorted(unknown))}")
+    needed = set(columns)
+    selected = []
+    for item in reversed(list(INDICATORS.values())):
+        if needed & set(item.outputs):
+            selected.append(item)
+            needed.update(item.inputs)
+    return list(reversed(selected))
+
+
+# Velas mínimas para calcular los indicadores: la ventana más larga (el ADX usa dos períodos
+# y el Senkou Span B de Ichimoku 52 velas). Con menos velas algunos indicadores de ta fallan.
+def min_indicator_rows(params):
+    return max(params['fast_ma'], params['slow_ma'], params['rsi_period'], params['macd_slow'] + params['macd_signal'],
+               2 * params['adx_period'], 20, 52, PIVOT_WINDOW) + 1
+
+
+# Calcular sobre df sólo los indicadores necesarios para `columns` (todos si es None)
+def compute_indicators(df, params, columns=None):
+    for item in resolve(ALL_COLUMNS if columns is None else columns):
+        item.compute(df, params)
+    return df
@@ -1,4 +1,8 @@
+import os
+import tempfile
+
 # Configuración del trading
+EXCHANGE_ID = 'binance'  # Exchange de ccxt; también nombra la carpeta de sus velas en CANDLE_STORE_DIR
 SYMBOLS = ['BTC/USDT', 'ETH/USDT']
 TIMEFRAME = '15m'
 FAST_MA = 9
@@ -11,4 +15,119 @@ MACD_SLOW = 26
 MACD_SIGNAL = 9
 ADX_PERIOD = 14
 ADX_THRESHOLD = 25  # Umbral para considerar una tendencia fuerte
-VOLUME_THRESHOLD = 1.5  # Multiplicador para considerar aumento de volumen significativo
\ No newline at end of file
+VOLUME_THRESHOLD = 1.5  # Multiplicador para considerar aumento de volumen significativo
+# Motor de indicadores: 'batch' recalcula todo en cada ciclo, 'streaming' actualiza
+# incrementalmente sólo con las velas cerradas nuevas (la vela abierta no se analiza) y
+# 'matrix' recalcula todo en cada ciclo pero para todos los símbolos juntos en matrices
+# (símbolos × velas), conveniente al escanear muchos símbolos
+INDICATOR_ENGINE = 'batch'
+STREAMING_FETCH_LIMIT = 5  # Velas a pedir al exchange en cada ciclo en modo streaming
+INDICATOR_DTYPE = 'float64'  # 'float32' guarda los indicadores en la mitad de memoria (los precios siguen en float64)
+# Reglas de analyze_signals activas. Sólo se calculan los indicadores que usan estas reglas
+# (por ejemplo 'fast' no calcula Ichimoku ni los pivotes de soportes y resistencias).
+SIGNAL_PROFILES = {
+    'full': ['ma_cross', 'rsi', 'macd', 'adx', 'bollinger', 'volume', 'volume_exhaustion', 'ichimoku', 'kumo', 'key_levels'],
+    'fast': ['ma_cross', 'rsi', 'macd', 'adx', 'bollinger', 'volume'],
+}
+SIGNAL_PROFILE = 'full'
+SIGNAL_RULES = None  # Lista de reglas que reemplaza al perfil (None = usar SIGNAL_PROFILE)
+PIVOT_WINDOW = 20  # Ventana centrada para detectar máximos/mínimos locales (soportes y resistencias)
+KEY_LEVELS_LOOKBACK = 100  # Velas analizadas para buscar soportes y resistencias clave
+KEY_LEVELS_TOLERANCE = 0.005  # Distancia relativa para considerar que el precio tocó un nivel
+KEY_LEVELS_CLUSTER = False  # Agrupar niveles cercanos en un único nivel
+# Análisis multi-timeframe: timeframes mayores armados localmente con las velas de TIMEFRAME
+# (no se piden más velas al exchange). Sus señales se agregan como confluencia a las explicaciones.
+MULTI_TIMEFRAMES = []  # Por ejemplo ['1h', '4h', '1d'] (vacío = sólo TIMEFRAME)
+MULTI_TIMEFRAME_ROWS = 200  # Velas guardadas por cada timeframe mayor
+
+# Almacén local de velas: sólo se piden al exchange las velas nuevas o faltantes
+CANDLE_STORE_ENABLED = True
+CANDLE_STORE_DIR = 'data/candles'
+
+# Escaneo concurrente de símbolos
+SCAN_CONCURRENCY = 8  # Descargas simultáneas (1 = secuencial)
+SCAN_PROCESSES = 0  # Procesos para el cálculo de indicadores y señales (0 = en los hilos de descarga)
+
+# Planificación de los análisis: 'polling' cada WAIT_TIME segundos, 'candle_close' sólo al
+# cierre de cada vela y 'replay' reproduce las velas del almacén local como si llegaran en vivo
+SCHEDULER_MODE = 'candle_close'
+SCHEDULER_SETTLE_DELAY = 2  # Segundos tras el cierre para que el exchange publique la vela
+SCHEDULER_RETRY_DELAY = 5  # Segundos entre reintentos si la vela cerrada todavía no está disponible
+SCHEDULER_MAX_RETRIES = 6
+
+# Envío de alertas a Telegram en segundo plano
+TELEGRAM_ASYNC = True  # False = envío bloqueante dentro del análisis
+TELEGRAM_API_URL = 'https://api.telegram.org'
+TELEGRAM_RATE_LIMIT = 1  # Mensajes por segundo a un mismo chat
+TELEGRAM_BURST = 3  # Mensajes seguidos permitidos antes de aplicar el límite
+TELEGRAM_GLOBAL_RATE_LIMIT = 30  # Mensajes por segundo en total
+TELEGRAM_BATCH_WINDOW = 2.0  # Segundos para agrupar alertas en un único mensaje por chat
+TELEGRAM_MAX_RETRIES = 5
+
+# Caché de análisis por (símbolo, timeframe, última vela cerrada, parámetros). Con la caché
+# activa sólo se analizan las velas cerradas (el motor 'streaming' ya lo hace siempre).
+ANALYSIS_CACHE_ENABLED = True
+ANALYSIS_CACHE_SIZE = 256  # Resultados guardados como máximo
+
+# Cola de análisis pedidos por el webhook
+JOB_QUEUE_SIZE = 16  # Análisis distintos en espera antes de rechazar pedidos
+JOB_HISTORY = 100  # Análisis terminados consultables en /jobs/<id>
+
+# Plataformas serverless (Vercel, AWS Lambda): el proceso se congela en cuanto se envía la
+# respuesta, así que los análisis del webhook se ejecutan dentro del pedido (no en segundo plano)
+SERVERLESS = bool(os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+SERVERLESS_FLUSH_TIMEOUT = 10  # Segundos para entregar las alertas pendientes antes de responder
+
+# Analizar en segundo plano dentro del servidor para mantener actualizada la API de señales
+SERVER_BACKGROUND_SCAN = False
+# Archivo donde cada proceso publica el último snapshot de señales; la API lee el que escriba
+# bot.py aunque corra en otro proceso (None = snapshot sólo en la memoria de cada proceso).
+# Se puede cambiar con la variable de entorno SNAPSHOT_FILE (vacía = None); en serverless sólo
+# se puede escribir en el directorio temporal.
+SNAPSHOT_FILE = os.environ.get('SNAPSHOT_FILE', os.path.join(tempfile.gettempdir(), 'signal_snapshot.json')
+                               if SERVERLESS else 'data/signal_snapshot.json') or None
+
+# Gráficos de análisis
+CHART_ENABLED = False  # Generar un gráfico por cada símbolo con señales (en segundo plano)
+CHART_DIR = 'charts'
+CHART_MAX_POINTS = 2000  # Puntos por serie; las series más largas se reducen con LTTB
+CHART_PROCESSES = 1
+CHART_MAX_PENDING = 8  # Gráficos en cola antes de descartar pedidos nuevos
+CHART_TASKS_PER_CHILD = 50  # Gráficos por proceso antes de reemplazarlo (libera memoria)
+
+# Instrumentación: tiempo real y de CPU por etapa y símbolo en cada ciclo, con un resumen en el log
+STAGE_TIMING_ENABLED = False
+STAGE_TIMING_SAMPLES = 1000  # Mediciones por etapa para los percentiles
+# Perfil de un ciclo completo, guardado en PROFILE_DIR. En Linux/macOS, `kill -USR1 <pid>`
+# pide perfilar el próximo ciclo del bot.
+PROFILE_MODE = 'sampling'  # 'sampling' (todos los hilos, formato collapsed) o 'cprofile' (escaneo secuencial, .prof)
+PROFILE_FIRST_CYCLE = False
+PROFILE_DIR = 'profiles'
+PROFILE_SAMPLE_INTERVAL = 0.005  # Segundos entre muestras del perfil por muestreo
+
+# Registro: los mensajes pasan por una cola y un hilo en segundo plano los escribe (QueueListener)
+LOG_FILE = 'bot_trading.log'
+LOG_LEVEL = 'INFO'
+LOG_FORMAT = 'json'  # Formato del archivo: 'json' (un objeto por línea) o 'text'
+# Salida del bot: 'terminal' imprime el reporte con colores de cada símbolo; 'headless' no arma
+# ni imprime reportes (servidores, backtesting) y sólo envía las alertas y registra las señales
+OUTPUT_MODE = 'terminal'
+
+# Simulación de operaciones del backtesting (trade_simulator): entrada al cierre de la vela con señal
+SIM_STOP_LOSS = 0.01  # Distancia relativa del stop-loss (None = sin stop)
+SIM_TAKE_PROFIT = 0.02  # Distancia relativa del take-profit (None = sin objetivo)
+SIM_MAX_HOLDING = 10  # Velas como máximo en una operación (stop por tiempo)
+SIM_FEE = 0.001  # Comisión por lado (0.1%)
+SIM_SLIPPAGE = 0.0005  # Deslizamiento por ejecución, en contra de la operación
+SIM_POSITION_SIZE = 1.0  # Fracción del capital en cada operación
+SIM_ONE_POSITION = True  # Ignorar señales mientras hay una operación abierta
+SIM_CHUNK_SIZE = 65536  # Entradas por bloque al buscar las salidas (limita la memoria)
+
+# Backtesting vectorizado de un símbolo en paralelo por bloques de tiempo (parallel_backtest)
+BACKTEST_PROCESSES = 0  # Procesos para los indicadores recursivos (0 = en este proceso)
+BACKTEST_CHUNK_WARMUP = 1000  # Velas previas a cada bloque para que los indicadores recursivos converjan
+BACKTEST_CHUNK_CHECK = 50  # Velas del bloque anterior que deben coincidir para aceptar un bloque
+
+# Backtestings guardados (backtest_store): resultados y última vela procesada por ejecución
+BACKTEST_STORE_PATH = 'data/backtests.sqlite'
+BACKTEST_CHECKPOINT_CANDLES = 100000  # Velas procesadas entre cada guardado del progreso
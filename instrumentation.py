@@ -0,0 +1,217 @@
+import cProfile
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from logger_config import logger
+from initial_config import STAGE_TIMING_ENABLED, STAGE_TIMING_SAMPLES, PROFILE_MODE, PROFILE_FIRST_CYCLE, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL
+
+# Etapas de un ciclo en el orden en que se muestran
+STAGES = ['fetch', 'resample', 'indicators', 'key_levels', 'signals', 'terminal', 'telegram']
+# Contexto vacío reutilizado cuando la instrumentación está desactivada
+NULL_STAGE = contextlib.nullcontext()
+
+
+# Medición de una etapa: tiempo real y de CPU del hilo. Las etapas anidadas (por ejemplo
+# el envío a Telegram dentro del análisis de terminal) se descuentan de la etapa que las
+# contiene, así cada tiempo es sólo el de su etapa.
+class _Stage:
+    __slots__ = ('timings', 'name', 'symbol', 'wall', 'cpu', 'child_wall', 'child_cpu')
+
+    def __init__(self, timings, name, symbol):
+        self.timings = timings
+        self.name = name
+        self.symbol = symbol
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+    def __enter__(self):
+        stack = self.timings._stack()
+        stack.append(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        stack = self.timings._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.timings.record(self.name, self.symbol, wall - self.child_wall, cpu - self.child_cpu)
+        return False
+
+
+# Tiempos por etapa y símbolo de cada ciclo de análisis, con percentiles de las últimas
+# `samples` mediciones de cada etapa. Desactivada, stage() devuelve un contexto vacío.
+# Con SCAN_PROCESSES > 0 el análisis corre en otros procesos y sus etapas no se registran.
+class StageTimings:
+    def __init__(self, enabled=STAGE_TIMING_ENABLED, samples=STAGE_TIMING_SAMPLES):
+        self.enabled = enabled
+        self.samples = samples
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.history = {}
+        self.cycle = {}
+        self.cycles = 0
+        self.cycle_started = None
+        self.profile_request = PROFILE_MODE if PROFILE_FIRST_CYCLE else None
+
+    def stage(self, name, symbol=None):
+        if not self.enabled:
+            return NULL_STAGE
+        return _Stage(self, name, symbol)
+
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def record(self, name, symbol, wall, cpu):
+        with self.lock:
+            if name not in self.history:
+                self.history[name] = deque(maxlen=self.samples)
+            self.history[name].append(wall)
+            totals = self.cycle.setdefault(name, {}).setdefault(symbol, [0.0, 0.0])
+            totals[0] += wall
+            totals[1] += cpu
+
+    # Perfilar el próximo ciclo ('cprofile' o 'sampling'); se puede llamar desde otro hilo o una señal
+    def request_profile(self, mode=PROFILE_MODE):
+        self.profile_request = mode
+
+    # Empezar un ciclo. Devuelve el modo de perfil pedido para este ciclo (o None).
+    def begin_cycle(self):
+        with self.lock:
+            self.cycle = {}
+            self.cycles += 1
+        self.cycle_started = (time.perf_counter(), time.process_time())
+        mode, self.profile_request = self.profile_request, None
+        return mode
+
+    # Cerrar el ciclo: registra el detalle por símbolo y una línea de resumen en el log
+    def end_cycle(self):
+        if not self.enabled or self.cycle_started is None:
+            return None
+        wall = time.perf_counter() - self.cycle_started[0]
+        cpu = time.process_time() - self.cycle_started[1]
+        with self.lock:
+            cycle = {name: dict(symbols) for name, symbols in self.cycle.items()}
+        summary = {'cycle': self.cycles, 'wall': wall, 'cpu': cpu, 'stages': {}}
+        for name in sorted(cycle, key=_stage_order):
+            symbols = cycle[name]
+            summary['stages'][name] = {
+                'wall': sum(totals[0] for totals in symbols.values()),
+                'cpu': sum(totals[1] for totals in symbols.values()),
+                'symbols': symbols,
+                **self.percentiles(name),
+            }
+            for symbol, (stage_wall, stage_cpu) in symbols.items():
+                logger.debug(f"Ciclo {self.cycles} - {name} {symbol or ''}: {stage_wall * 1000:.1f} ms (CPU {stage_cpu * 1000:.1f} ms)")
+        logger.info(format_summary(summary))
+        return summary
+
+    # Percentiles de las últimas mediciones de una etapa
+    def percentiles(self, name):
+        import numpy as np
+        with self.lock:
+            samples = np.array(self.history.get(name, ()))
+        if not len(samples):
+            return {'p50': None, 'p95': None, 'p99': None}
+        return {f'p{percentile}': float(np.percentile(samples, percentile)) for percentile in (50, 95, 99)}
+
+
+def _stage_order(name):
+    return STAGES.index(name) if name in STAGES else len(STAGES)
+
+
+# Línea de resumen de un ciclo: total y, por etapa, tiempo sumado de todos los símbolos y p95
+def format_summary(summary):
+    parts = [f"Ciclo {summary['cycle']}: {summary['wall']:.2f} s (CPU {summary['cpu']:.2f} s)"]
+    for name, stage in summary['stages'].items():
+        parts.append(f"{name} {stage['wall']:.2f} s (CPU {stage['cpu']:.2f} s, p95 {stage['p95'] * 1000:.0f} ms)")
+    return ' | '.join(parts)
+
+
+# Perfilador por muestreo: cada `interval` segundos toma la pila de todos los hilos
+# (cProfile sólo ve el hilo que lo activa). Guarda las pilas en formato "collapsed"
+# (una línea por pila con su cantidad de muestras) para flamegraph.pl o speedscope.
+class SamplingProfiler:
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# Perfilar el bloque con `mode` ('cprofile' o 'sampling', None = sin perfil) y guardar el
+# resultado en PROFILE_DIR. cProfile sólo registra el hilo actual: el ciclo perfilado con
+# 'cprofile' debe correr en este hilo (escaneo secuencial).
+@contextlib.contextmanager
+def profile_cycle(mode, directory=PROFILE_DIR):
+    if mode is None:
+        yield None
+        return
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if mode == 'cprofile':
+        path = os.path.join(directory, f'cycle_{stamp}.prof')
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield path
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+    elif mode == 'sampling':
+        path = os.path.join(directory, f'cycle_{stamp}.collapsed')
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            yield path
+        finally:
+            profiler.stop()
+            profiler.dump(path)
+    else:
+        raise ValueError(f"Modo de perfil desconocido: {mode}")
+    logger.info(f"Perfil del ciclo guardado en {path}")
+
+
+# Instrumentación compartida por el bot, el escaneo y el envío de alertas
+stage_timings = StageTimings()
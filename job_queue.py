@@ -0,0 +1,129 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from logger_config import logger
+from initial_config import JOB_QUEUE_SIZE, JOB_HISTORY
+
+
+class QueueFullError(Exception):
+    pass
+
+
+# Trabajo en la cola: estado, pedidos que lo comparten y resultado
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, key, payload):
+        self.id = str(next(Job._ids))
+        self.key = key
+        self.payload = payload
+        self.status = 'queued'
+        self.requesters = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'payload': self.payload,
+            'requests': len(self.requesters),
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+# Cola acotada de trabajos ejecutados por un hilo en segundo plano.
+# Los pedidos con la misma clave mientras hay un trabajo en espera o en curso se suman
+# a ese trabajo (single-flight) en lugar de ejecutarlo otra vez. Si hay max_pending
+# trabajos distintos en espera, submit lanza QueueFullError para que el llamador rechace el pedido.
+# Con inline=True (serverless, donde el proceso se congela al responder y un hilo en segundo
+# plano puede no terminar nunca) submit ejecuta el trabajo antes de devolverlo.
+class JobQueue:
+    def __init__(self, run, on_done=None, max_pending=JOB_QUEUE_SIZE, history=JOB_HISTORY, inline=False):
+        self.run = run
+        self.on_done = on_done
+        self.history = history
+        self.inline = inline
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.jobs = OrderedDict()
+        self.active = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    # Encolar (o sumarse a) un trabajo. Devuelve (trabajo, True si se sumó a uno existente).
+    def submit(self, key, payload, requester=None):
+        with self.lock:
+            job = self.active.get(key)
+            if job is not None:
+                job.requesters.append(requester)
+                return job, True
+            job = Job(key, payload)
+            job.requesters.append(requester)
+            if not self.inline:
+                try:
+                    self.pending.put_nowait(job)
+                except queue.Full:
+                    raise QueueFullError(f"Cola de trabajos llena ({self.pending.maxsize} en espera)")
+            self.active[key] = job
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.history:
+                self.jobs.popitem(last=False)
+            if not self.inline:
+                self._start_worker()
+        if self.inline:
+            self._execute(job)
+        return job, False
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed')}
+
+    # El hilo se crea con el primer trabajo (evita hilos en procesos que nunca reciben pedidos)
+    def _start_worker(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._work, name='job-queue', daemon=True)
+            self.thread.start()
+
+    def _work(self):
+        while True:
+            job = self.pending.get()
+            try:
+                self._execute(job)
+            finally:
+                self.pending.task_done()
+
+    def _execute(self, job):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = self.run(job.payload)
+            job.status = 'done'
+        except Exception as e:
+            logger.error(f"Error en el trabajo {job.id}: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            # A partir de aquí un pedido nuevo con la misma clave crea otro trabajo
+            with self.lock:
+                if self.active.get(job.key) is job:
+                    del self.active[job.key]
+        if self.on_done is not None:
+            try:
+                self.on_done(job)
+            except Exception as e:
+                logger.error(f"Error al notificar el trabajo {job.id}: {e}")
@@ -0,0 +1,73 @@
+import numpy as np
+from initial_config import KEY_LEVELS_TOLERANCE
+
+
+# Error exacto de redondeo de a + b (TwoSum): a + b == s + error
+def _two_sum(a, b):
+    s = a + b
+    b_virtual = s - a
+    a_virtual = s - b_virtual
+    return s, (a - a_virtual) + (b - b_virtual)
+
+
+# Contar, para cada nivel, cuántos precios cumplen abs(precio - nivel) < nivel * tolerance.
+# sorted_prices debe estar ordenado; cada nivel se resuelve con dos búsquedas binarias.
+# Como precio - nivel es exacto para precios cercanos, se corrigen los extremos según
+# el redondeo de nivel ± margen para contar exactamente lo mismo que la comparación directa.
+def count_touches(sorted_prices, levels, tolerance=KEY_LEVELS_TOLERANCE):
+    levels = np.asarray(levels, dtype=float)
+    margin = levels * tolerance
+
+    upper, upper_error = _two_sum(levels, margin)
+    lower, lower_error = _two_sum(levels, -margin)
+
+    # precio < nivel + margen: si upper quedó redondeado hacia abajo, upper también cuenta
+    upper_left = np.searchsorted(sorted_prices, upper, side='left')
+    upper_right = np.searchsorted(sorted_prices, upper, side='right')
+    end = np.where(upper_error > 0, upper_right, upper_left)
+
+    # precio > nivel - margen: si lower quedó redondeado hacia arriba, lower también cuenta
+    lower_left = np.searchsorted(sorted_prices, lower, side='left')
+    lower_right = np.searchsorted(sorted_prices, lower, side='right')
+    start = np.where(lower_error < 0, lower_left, lower_right)
+
+    return np.maximum(end - start, 0)
+
+
+# Agrupar niveles cercanos (a menos de `tolerance` entre vecinos) en un único nivel.
+# Cada grupo queda representado por su nivel con más toques (el primero en empates).
+def cluster_levels(levels, tolerance=KEY_LEVELS_TOLERANCE):
+    if len(levels) < 2:
+        return list(levels)
+
+    order = sorted(range(len(levels)), key=lambda i: levels[i][0])
+    clusters = [[order[0]]]
+    for i in order[1:]:
+        previous = levels[clusters[-1][-1]][0]
+        if levels[i][0] - previous < previous * tolerance:
+            clusters[-1].append(i)
+        else:
+            clusters.append([i])
+
+    # Mantener el orden original de aparición de cada representante
+    representatives = [max(cluster, key=lambda i: (levels[i][1], -i)) for cluster in clusters]
+    return [levels[i] for i in sorted(representatives)]
+
+
+# Encontrar niveles en los pivotes marcados de `prices` y contar sus toques en la ventana.
+# Ordena los precios una sola vez, por lo que escala a miles de velas de historial.
+# Devuelve [(precio, toques)] en orden de aparición, sólo niveles con al menos min_touches.
+def find_levels(prices, is_pivot, margin=5, tolerance=KEY_LEVELS_TOLERANCE, min_touches=2, cluster=False):
+    prices = np.asarray(prices, dtype=float)
+    is_pivot = np.asarray(is_pivot, dtype=bool)
+    candidates = np.flatnonzero(is_pivot[margin:len(prices) - margin]) + margin
+    if len(candidates) == 0:
+        return []
+
+    level_prices = prices[candidates]
+    touches = count_touches(np.sort(prices), level_prices, tolerance)
+    keep = touches >= min_touches
+    levels = [(price, int(count)) for price, count in zip(level_prices[keep], touches[keep])]
+    if cluster:
+        levels = cluster_levels(levels, tolerance)
+    return levels
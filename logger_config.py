@@ -1,13 +1,66 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from initial_config import LOG_FILE, LOG_LEVEL, LOG_FORMAT, OUTPUT_MODE
 
-# Configuración del sistema de registro
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("bot_trading.log"),
-        logging.StreamHandler()
-    ]
-)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Atributos propios de LogRecord; los demás (pasados con extra=) son campos del registro JSON
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+
+# Un objeto JSON por línea con la hora (UTC), el nivel, el mensaje y los campos de extra=
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# Encola una copia del registro con el mensaje ya armado y el traceback como texto
+# (QueueHandler lo agregaría al mensaje y el JSON no tendría el campo 'exception')
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Configuración del sistema de registro: quien registra sólo encola el mensaje y el hilo del
+# QueueListener lo formatea y escribe en el archivo y la consola. En modo headless la consola
+# también recibe JSON (para los logs del servidor).
+def _configure():
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(JsonFormatter() if OUTPUT_MODE == 'headless' else logging.Formatter(TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, file_handler, console_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(_QueueHandler(records))
+    listener.start()
+    # Escribir los mensajes pendientes al salir
+    atexit.register(listener.stop)
+    return listener
+
+
+log_listener = _configure()
 # Definir logger como variable global
-logger = logging.getLogger("crypto_trading_bot") 
\ No newline at end of file
+logger = logging.getLogger("crypto_trading_bot")
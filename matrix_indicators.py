@@ -0,0 +1,370 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from pivots import find_pivots
+from compact_frame import TREND_DTYPE, compact_frame, trend_codes, last_break_column
+from indicator_registry import BASE_COLUMNS, ALL_COLUMNS, enabled_rules, resolve
+from vectorized_signals import rule_masks, count_rules
+from streaming_indicators import BOLLINGER_WINDOW, BOLLINGER_DEV, VOLUME_WINDOW, ICHIMOKU_WINDOWS
+from strategy_params import resolve_params
+from initial_config import PIVOT_WINDOW
+
+# Motor de indicadores por lotes: todos los símbolos juntos en matrices (símbolos × velas).
+# Cada indicador corre sobre el eje del tiempo para todos los símbolos a la vez, así el costo
+# en Python depende de la cantidad de velas y no de la cantidad de símbolos. Los resultados
+# son idénticos a los de apply_technical_indicators: las medias, desviaciones y EWM repiten
+# las recurrencias de pandas (igual que streaming_indicators) y el ADX las de ta.
+
+# Salidas con un valor por símbolo (en attrs del DataFrame) en lugar de una matriz
+PER_SYMBOL_OUTPUTS = ('support_level', 'resistance_level')
+
+# Implementación matricial de cada indicador de indicator_registry
+MATRIX_INDICATORS = {}
+
+
+def matrix_indicator(name):
+    def register(compute):
+        MATRIX_INDICATORS[name] = compute
+        return compute
+    return register
+
+
+# Agrupar los DataFrames OHLCV por cantidad de velas y apilar cada grupo en matrices
+# contiguas (símbolos × velas). Devuelve [(símbolos, {columna: matriz})].
+def stack_frames(frames):
+    groups = {}
+    for symbol, df in frames.items():
+        groups.setdefault(len(df), []).append(symbol)
+    return [
+        (symbols, {column: np.stack([frames[symbol][column].to_numpy(dtype=float) for symbol in symbols]) for column in BASE_COLUMNS})
+        for symbols in groups.values()
+    ]
+
+
+# Desplazar `periods` velas hacia adelante sobre el último eje (como Series.shift)
+def _shift(values, periods=1, fill=np.nan):
+    out = np.full(values.shape, fill, dtype=np.result_type(values.dtype, np.asarray(fill).dtype))
+    if periods < values.shape[-1]:
+        out[..., periods:] = values[..., :-periods]
+    return out
+
+
+# rolling(window).mean() con la suma compensada (Kahan) de pandas, una vela a la vez
+# para todas las filas
+def _rolling_mean(values, window):
+    rows, n = values.shape
+    out = np.full(values.shape, np.nan)
+    total = np.zeros(rows)
+    compensation_add = np.zeros(rows)
+    compensation_remove = np.zeros(rows)
+    same_values = np.zeros(rows, dtype=np.int64)
+    prev_value = values[:, 0] if n else None
+    for t in range(n):
+        value = values[:, t]
+        if t >= window:
+            y = -values[:, t - window] - compensation_remove
+            s = total + y
+            compensation_remove = s - total - y
+            total = s
+        y = value - compensation_add
+        s = total + y
+        compensation_add = s - total - y
+        total = s
+        same_values = np.where(value == prev_value, same_values + 1, 1)
+        prev_value = value
+        if t >= window - 1:
+            out[:, t] = np.where(same_values >= window, value, total / window)
+    return out
+
+
+# Tolerancia de pandas para detectar cancelación catastrófica en la varianza móvil
+_INV_COND_TOL = np.finfo(np.float64).eps * 1e3
+
+
+# Sumar o quitar (sign=-1) un valor de la varianza de Welford con suma compensada.
+# Devuelve también qué filas quedaron numéricamente inestables.
+def _welford(value, sign, nobs, mean, ssqdm, compensation):
+    prev_ssqdm = ssqdm
+    prev_mean = mean - compensation
+    y = value - compensation
+    delta = y - mean
+    compensation = delta + mean - y
+    mean = mean + sign * delta / nobs
+    ssqdm = ssqdm + sign * (value - prev_mean) * (value - mean)
+    return mean, ssqdm, compensation, prev_ssqdm * _INV_COND_TOL > ssqdm
+
+
+# rolling(window).std(ddof=0) con el algoritmo de pandas: Welford compensado que se
+# recalcula desde cero sobre la ventana cuando detecta cancelación catastrófica
+def _rolling_std(values, window):
+    rows, n = values.shape
+    out = np.full(values.shape, np.nan)
+    mean = np.zeros(rows)
+    ssqdm = np.zeros(rows)
+    compensation_add = np.zeros(rows)
+    compensation_remove = np.zeros(rows)
+    for t in range(n):
+        unstable = np.zeros(rows, dtype=bool)
+        if t >= window:
+            mean, ssqdm, compensation_remove, removed = _welford(values[:, t - window], -1, window - 1, mean, ssqdm, compensation_remove)
+            unstable |= removed
+        nobs = min(t + 1, window)
+        mean, ssqdm, compensation_add, added = _welford(values[:, t], 1, nobs, mean, ssqdm, compensation_add)
+        unstable |= added
+        if unstable.any():
+            recompute = np.flatnonzero(unstable)
+            start = t + 1 - nobs
+            state = [np.zeros(len(recompute)) for _ in range(3)]
+            for k in range(nobs):
+                state[:3] = _welford(values[recompute, start + k], 1, k + 1, *state)[:3]
+            mean[recompute], ssqdm[recompute], compensation_add[recompute] = state
+            compensation_remove[recompute] = 0.0
+        if nobs == window:
+            variance = ssqdm / nobs
+            out[:, t] = np.where(variance < 0, 0.0, np.sqrt(np.where(variance < 0, 0.0, variance)))
+    return out
+
+
+# ewm(alpha, adjust=False).mean() con min_periods. `alpha` puede ser un valor por fila
+# para calcular varias medias exponenciales en la misma pasada.
+def _ewm_mean(values, alpha, min_periods):
+    rows, n = values.shape
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=float), (rows,))
+    old_wt_factor = 1. - alpha
+    out = np.empty(values.shape)
+    weighted = np.full(rows, np.nan)
+    for t in range(n):
+        value = values[:, t]
+        observed = value == value
+        started = weighted == weighted
+        update = observed & started & (weighted != value)
+        smoothed = (old_wt_factor * weighted + alpha * value) / (old_wt_factor + alpha)
+        weighted = np.where(update, smoothed, np.where(observed & ~started, value, weighted))
+        out[:, t] = weighted
+    nobs = np.cumsum(values == values, axis=1)
+    out[nobs < np.broadcast_to(np.asarray(min_periods), (rows,))[:, None]] = np.nan
+    return out
+
+
+def _span_alpha(span):
+    return 1. / (1. + (span - 1) / 2)
+
+
+# rolling(window, min_periods).max()/min(). Con min_periods=0 las primeras velas usan la
+# ventana parcial disponible.
+def _rolling_extreme(values, window, kind, min_periods=None):
+    is_max = kind == 'max'
+    if min_periods == 0:
+        padding = np.full((values.shape[0], window - 1), -np.inf if is_max else np.inf)
+        windows = sliding_window_view(np.concatenate([padding, values], axis=1), window, axis=-1)
+        return windows.max(axis=-1) if is_max else windows.min(axis=-1)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        windows = sliding_window_view(values, window, axis=-1)
+        out[:, window - 1:] = windows.max(axis=-1) if is_max else windows.min(axis=-1)
+    return out
+
+
+@matrix_indicator('sma_fast')
+def _sma_fast(arrays, params):
+    arrays['sma_fast'] = _rolling_mean(arrays['close'], params['fast_ma'])
+
+
+@matrix_indicator('sma_slow')
+def _sma_slow(arrays, params):
+    arrays['sma_slow'] = _rolling_mean(arrays['close'], params['slow_ma'])
+
+
+# RSI de ta: medias exponenciales de subidas y bajadas en una sola pasada
+@matrix_indicator('rsi')
+def _rsi(arrays, params):
+    close = arrays['close']
+    diff = close - _shift(close)
+    up = np.where(diff > 0, diff, 0.0)
+    down = -np.where(diff < 0, diff, 0.0)
+    rows = len(close)
+    ema = _ewm_mean(np.concatenate([up, down]), 1 / params['rsi_period'], params['rsi_period'])
+    emaup, emadn = ema[:rows], ema[rows:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        arrays['rsi'] = np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+
+
+@matrix_indicator('macd')
+def _macd(arrays, params):
+    close = arrays['close']
+    rows = len(close)
+    fast, slow, signal = params['macd_fast'], params['macd_slow'], params['macd_signal']
+    alphas = np.repeat([_span_alpha(fast), _span_alpha(slow)], rows)
+    min_periods = np.repeat([fast, slow], rows)
+    ema = _ewm_mean(np.concatenate([close, close]), alphas, min_periods)
+    macd = ema[:rows] - ema[rows:]
+    macd_signal = _ewm_mean(macd, _span_alpha(signal), signal)
+    arrays['macd'] = macd
+    arrays['macd_signal'] = macd_signal
+    arrays['macd_histogram'] = macd - macd_signal
+
+
+# ADX/DI+/DI- con la misma inicialización y suavizado de Wilder que ta.trend.ADXIndicator
+# (incluido el último valor suavizado, que ta deja en 0)
+@matrix_indicator('adx')
+def _adx(arrays, params):
+    high, low, close = arrays['high'], arrays['low'], arrays['close']
+    window = params['adx_period']
+    rows, n = close.shape
+    size = n - (window - 1)
+
+    prev_close = _shift(close)
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    diff_up = high - _shift(high)
+    diff_down = _shift(low) - low
+    pos = np.abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up)
+    neg = np.abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down)
+
+    # Sumas suavizadas de rango verdadero y movimientos direccionales, en una sola pasada
+    movements = np.stack([true_range, pos, neg])
+    smoothed = np.zeros((3, rows, size))
+    smoothed[..., 0] = movements[..., 1:window + 1].sum(axis=-1)
+    for i in range(1, size - 1):
+        previous = smoothed[..., i - 1]
+        smoothed[..., i] = previous - (previous / float(window)) + movements[..., window + i]
+    trs, dip, din = smoothed
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_plus = np.where(trs != 0, 100 * (dip / trs), 0)
+        di_minus = np.where(trs != 0, 100 * (din / trs), 0)
+        total = di_plus + di_minus
+        directional_index = np.where(total != 0, 100 * np.abs((di_plus - di_minus) / total), 0)
+
+    adx = np.zeros((rows, size))
+    adx[:, window] = directional_index[:, :window].mean(axis=1)
+    for i in range(window + 1, size):
+        adx[:, i] = ((adx[:, i - 1] * (window - 1)) + directional_index[:, i - 1]) / float(window)
+    arrays['adx'] = np.concatenate([np.zeros((rows, window - 1)), adx], axis=1)
+
+    arrays['di_plus'] = np.zeros((rows, n))
+    arrays['di_minus'] = np.zeros((rows, n))
+    arrays['di_plus'][:, window + 1:] = di_plus[:, 1:size - 1]
+    arrays['di_minus'][:, window + 1:] = di_minus[:, 1:size - 1]
+
+
+@matrix_indicator('bollinger')
+def _bollinger(arrays, params):
+    close = arrays['close']
+    mid = _rolling_mean(close, BOLLINGER_WINDOW)
+    std = _rolling_std(close, BOLLINGER_WINDOW)
+    arrays['bollinger_high'] = mid + BOLLINGER_DEV * std
+    arrays['bollinger_low'] = mid - BOLLINGER_DEV * std
+    arrays['bollinger_mid'] = mid
+
+
+@matrix_indicator('volume')
+def _volume(arrays, params):
+    volume = arrays['volume']
+    volume_sma = _rolling_mean(volume, VOLUME_WINDOW)
+    arrays['volume_sma'] = volume_sma
+    with np.errstate(divide='ignore', invalid='ignore'):
+        arrays['volume_ratio'] = volume / volume_sma
+    prev1, prev2, prev3 = (_shift(volume, periods) for periods in (1, 2, 3))
+    arrays['volume_increasing'] = volume > prev1
+    # Tendencia de volumen decreciente (3 periodos consecutivos)
+    arrays['volume_decreasing_trend'] = (volume < prev1) & (prev1 < prev2) & (prev2 < prev3)
+
+
+@matrix_indicator('ichimoku')
+def _ichimoku(arrays, params):
+    high, low = arrays['high'], arrays['low']
+    conversion_window, base_window, span_b_window = ICHIMOKU_WINDOWS
+    conversion = 0.5 * (_rolling_extreme(high, conversion_window, 'max') + _rolling_extreme(low, conversion_window, 'min'))
+    base = 0.5 * (_rolling_extreme(high, base_window, 'max') + _rolling_extreme(low, base_window, 'min'))
+    arrays['ichimoku_conversion_line'] = conversion
+    arrays['ichimoku_base_line'] = base
+    arrays['ichimoku_a'] = 0.5 * (conversion + base)
+    arrays['ichimoku_b'] = 0.5 * (_rolling_extreme(high, span_b_window, 'max', min_periods=0) +
+                                  _rolling_extreme(low, span_b_window, 'min', min_periods=0))
+
+
+@matrix_indicator('cloud')
+def _cloud(arrays, params):
+    close = arrays['close']
+    past_a = _shift(arrays['ichimoku_a'], ICHIMOKU_WINDOWS[1])
+    past_b = _shift(arrays['ichimoku_b'], ICHIMOKU_WINDOWS[1])
+    arrays['above_cloud'] = (close > past_a) & (close > past_b)
+    arrays['below_cloud'] = (close < past_a) & (close < past_b)
+    arrays['in_cloud'] = ~(arrays['above_cloud'] | arrays['below_cloud'])
+    arrays['future_cloud_bullish'] = arrays['ichimoku_a'] > arrays['ichimoku_b']
+    arrays['future_cloud_bearish'] = arrays['ichimoku_a'] < arrays['ichimoku_b']
+
+
+@matrix_indicator('pivots')
+def _pivots(arrays, params):
+    arrays['is_resistance'] = find_pivots(arrays['high'], PIVOT_WINDOW, 'high')
+    arrays['is_support'] = find_pivots(arrays['low'], PIVOT_WINDOW, 'low')
+
+
+# Un valor por símbolo
+@matrix_indicator('quartile_levels')
+def _quartile_levels(arrays, params):
+    lowest = arrays['low'].min(axis=1)
+    price_range = arrays['high'].max(axis=1) - lowest
+    arrays['support_level'] = lowest + price_range * 0.25
+    arrays['resistance_level'] = lowest + price_range * 0.75
+
+
+@matrix_indicator('breaks')
+def _breaks(arrays, params):
+    close, high, low = arrays['close'], arrays['high'], arrays['low']
+    prev_close = _shift(close)
+    arrays['broke_resistance'] = (close > prev_close) & _shift(arrays['is_resistance'], fill=False) & (close > _shift(high))
+    arrays['broke_support'] = (close < prev_close) & _shift(arrays['is_support'], fill=False) & (close < _shift(low))
+
+
+@matrix_indicator('last_breaks')
+def _last_breaks(arrays, params):
+    arrays['last_broke_resistance'] = last_break_column(arrays['broke_resistance'], arrays['high'])
+    arrays['last_broke_support'] = last_break_column(arrays['broke_support'], arrays['low'])
+
+
+# Tendencia como códigos de TREND_CATEGORIES
+@matrix_indicator('trend')
+def _trend(arrays, params):
+    arrays['trend'] = trend_codes(arrays['close'], arrays['sma_slow'])
+
+
+# Calcular sobre las matrices de `arrays` sólo los indicadores necesarios para `columns`
+# (todos si es None), en el mismo orden que indicator_registry.compute_indicators
+def compute_matrix_indicators(arrays, params=None, columns=None):
+    params = resolve_params(params)
+    for item in resolve(ALL_COLUMNS if columns is None else columns):
+        MATRIX_INDICATORS[item.name](arrays, params)
+    return arrays
+
+
+# Reglas long y short de analyze_signals cumplidas en cada vela de cada símbolo
+# (símbolos × velas). No incluye los niveles clave, que se buscan por símbolo.
+def matrix_signal_counts(arrays, params=None, rules=None):
+    params = resolve_params(params)
+    rules = enabled_rules(rules)
+
+    def col(name, dtype=float):
+        return arrays[name].astype(dtype, copy=False)
+
+    return count_rules(*rule_masks(col, params, rules), arrays['close'].shape)
+
+
+# DataFrame de cada símbolo igual al que devuelve apply_technical_indicators sobre frames[símbolo]
+def matrix_frames(symbols, frames, arrays, columns=None):
+    outputs = [output for item in resolve(ALL_COLUMNS if columns is None else columns)
+               for output in item.outputs if output not in PER_SYMBOL_OUTPUTS]
+    result = {}
+    for row, symbol in enumerate(symbols):
+        source = frames[symbol]
+        data = {column: arrays[column][row] for column in outputs}
+        if 'trend' in data:
+            data['trend'] = pd.Categorical.from_codes(data['trend'], dtype=TREND_DTYPE)
+        df = pd.concat([source, pd.DataFrame(data, index=source.index)], axis=1)
+        df.attrs = dict(source.attrs)
+        for output in PER_SYMBOL_OUTPUTS:
+            if output in arrays:
+                df.attrs[output] = float(arrays[output][row])
+        result[symbol] = compact_frame(df)
+    return result
@@ -0,0 +1,247 @@
+import threading
+import time
+from threading import get_ident
+from bisect import bisect_left
+
+# Límites de los histogramas de duración (segundos)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Cabeceras de ccxt/Binance con el peso de API usado en el último minuto
+WEIGHT_HEADERS = ('x-mbx-used-weight-1m', 'X-MBX-USED-WEIGHT-1M', 'x-mbx-used-weight', 'X-MBX-USED-WEIGHT')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Valor de un contador o gauge para una combinación de etiquetas.
+# Cada hilo suma en su propia celda (sólo ese hilo la escribe), así inc() no toma locks
+# ni pierde incrementos; las celdas se suman al exportar.
+class _Value:
+    __slots__ = ('cells', 'value')
+
+    def __init__(self):
+        self.cells = {}
+        self.value = None
+
+    def inc(self, amount=1):
+        ident = get_ident()
+        cells = self.cells
+        cells[ident] = cells.get(ident, 0) + amount
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        if self.value is not None:
+            return self.value
+        return sum(list(self.cells.values()))
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'cells')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.cells = {}
+
+    def observe(self, value):
+        cell = self.cells.get(get_ident())
+        if cell is None:
+            cell = self.cells[get_ident()] = [[0] * (len(self.buckets) + 1), 0.0]
+        cell[0][bisect_left(self.buckets, value)] += 1
+        cell[1] += value
+
+    def get(self):
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for cell_counts, cell_sum in list(self.cells.values()):
+            counts = [a + b for a, b in zip(counts, cell_counts)]
+            total += cell_sum
+        return counts, total
+
+
+# Métrica con etiquetas opcionales. labels(*valores) devuelve el valor de esa combinación;
+# conviene guardarlo en el llamador si se actualiza muy seguido.
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        return _Value()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for values, child in list(self.children.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, values)} {_number(child.get())}')
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DURATION_BUCKETS, registry=None):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for values, child in list(self.children.items()):
+            counts, total = child.get()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, values, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, values)} {cumulative}')
+        return lines
+
+
+# Métrica leída al momento de exportar (sin costo en el camino caliente).
+# read() devuelve un número o {tupla de etiquetas: número}.
+class CallbackMetric(_Metric):
+    def __init__(self, name, help, type, read, labelnames=(), registry=None):
+        self.type = type
+        self.read = read
+        super().__init__(name, help, labelnames, registry)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            if value is not None:
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+# Métricas del proceso, exportadas en formato de texto de Prometheus
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    # Registrar una métrica (reemplaza a otra con el mismo nombre)
+    def register(self, metric):
+        with self.lock:
+            self.metrics[metric.name] = metric
+
+    def get(self, name):
+        return self.metrics.get(name)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Ciclos de análisis
+cycle_duration = Histogram('bot_cycle_duration_seconds', 'Duración de cada ciclo de análisis')
+cycle_overrun = Histogram('bot_cycle_overrun_seconds', 'Tiempo que cada ciclo se pasó del cierre de la vela siguiente',
+                          buckets=(0, 1, 5, 15, 30, 60, 120, 300, 900))
+cycles_late = Counter('bot_cycles_late_total', 'Ciclos que terminaron después del cierre de la vela siguiente')
+symbols_analyzed = Counter('bot_symbols_analyzed_total', 'Símbolos analizados', ['cached'])
+signals_emitted = Counter('bot_signals_total', 'Señales emitidas por dirección', ['direction'])
+
+# Exchange
+exchange_requests = Counter('exchange_requests_total', 'Pedidos al exchange', ['exchange'])
+exchange_errors = Counter('exchange_errors_total', 'Pedidos al exchange con error', ['exchange'])
+exchange_weight = Gauge('exchange_used_weight', 'Peso de API usado en el último minuto según el exchange', ['exchange'])
+fetch_duration = Histogram('exchange_fetch_duration_seconds', 'Latencia de descarga de velas por símbolo', ['symbol'])
+
+# Alertas de Telegram
+alerts = Counter('telegram_alerts_total', 'Alertas de Telegram por resultado', ['status'])
+alert_messages = Counter('telegram_messages_total', 'Mensajes enviados a Telegram (una o varias alertas agrupadas)')
+alert_retries = Counter('telegram_retries_total', 'Reintentos de envío a Telegram')
+alert_rate_limited = Counter('telegram_rate_limited_total', 'Respuestas 429 de Telegram')
+
+# API de señales
+snapshot_write_errors = Counter('snapshot_write_errors_total', 'Snapshots de señales que no se pudieron guardar en SNAPSHOT_FILE')
+
+# Backtesting
+backtest_runs = Counter('backtest_runs_total', 'Backtestings ejecutados', ['mode'])
+backtest_duration = Histogram('backtest_duration_seconds', 'Duración de cada backtesting', ['mode'])
+backtest_signals = Counter('backtest_signals_total', 'Señales del backtesting por dirección', ['direction'])
+
+
+# Registrar un pedido de velas al exchange iniciado en `started` (perf_counter).
+# Sin `error`, también su latencia y el peso de API informado en las cabeceras.
+def record_exchange_request(exchange, symbol, started, error=False):
+    exchange_id = getattr(exchange, 'id', 'unknown')
+    exchange_requests.labels(exchange_id).inc()
+    if error:
+        exchange_errors.labels(exchange_id).inc()
+        return
+    fetch_duration.labels(symbol).observe(time.perf_counter() - started)
+    headers = getattr(exchange, 'last_response_headers', None) or {}
+    for header in WEIGHT_HEADERS:
+        if header in headers:
+            try:
+                exchange_weight.labels(exchange_id).set(int(headers[header]))
+            except (TypeError, ValueError):
+                pass
+            break
+
+
+# Pedido de velas con métricas: igual que exchange.fetch_ohlcv
+def fetch_ohlcv(exchange, symbol, timeframe, **kwargs):
+    started = time.perf_counter()
+    try:
+        candles = exchange.fetch_ohlcv(symbol, timeframe, **kwargs)
+    except Exception:
+        record_exchange_request(exchange, symbol, started, error=True)
+        raise
+    record_exchange_request(exchange, symbol, started)
+    return candles
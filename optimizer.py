@@ -0,0 +1,193 @@
+import itertools
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import ta
+from colorama import Fore, Style
+from bot import SYMBOLS, TIMEFRAME, apply_technical_indicators, init_exchange
+from backtest import BACKTEST_START_DATE, BACKTEST_END_DATE, fetch_backtest_data, evaluate_signal_outcomes, backtest_stats
+from vectorized_signals import compute_signal_counts, key_level_counts
+from strategy_params import DEFAULT_PARAMS, resolve_params
+from compact_frame import trend_column
+
+OPTIMIZER_SEARCH = 'grid'  # 'grid' prueba todas las combinaciones, 'random' una muestra al azar
+OPTIMIZER_SAMPLES = 500  # Combinaciones a probar en la búsqueda aleatoria
+OPTIMIZER_SEED = 0
+OPTIMIZER_PROCESSES = None  # None = un proceso por núcleo, 0 = sin procesos adicionales
+OPTIMIZER_MIN_SIGNALS = 10  # Señales mínimas para que una combinación entre en el ranking
+OPTIMIZER_TOP = 10
+
+# Valores a probar para cada parámetro (los que no aparecen quedan con su valor de initial_config.py)
+OPTIMIZER_SPACE = {
+    'fast_ma': [5, 7, 9, 12],
+    'slow_ma': [21, 30, 50],
+    'rsi_period': [9, 14, 21],
+    'rsi_overbought': [65, 70, 75],
+    'rsi_oversold': [25, 30, 35],
+    'adx_threshold': [20, 25, 30],
+    'volume_threshold': [1.5, 2.0],
+}
+
+# Grupos de columnas que dependen de los parámetros; el resto de indicadores
+# (Bollinger, volumen, Ichimoku, pivotes) es común a todas las combinaciones
+INDICATOR_GROUPS = {
+    'sma_fast': ('fast_ma',),
+    'sma_slow': ('slow_ma',),
+    'rsi': ('rsi_period',),
+    'macd': ('macd_fast', 'macd_slow', 'macd_signal'),
+    'adx': ('adx_period',),
+}
+
+# Estado de cada proceso: indicadores comunes, niveles clave y columnas ya calculadas
+_worker = {}
+
+
+# Combinaciones válidas (la media rápida debe ser más corta que la lenta)
+def _is_valid(params):
+    return params['fast_ma'] < params['slow_ma'] and params['macd_fast'] < params['macd_slow']
+
+
+# Todas las combinaciones del espacio de búsqueda
+def parameter_grid(space=OPTIMIZER_SPACE):
+    names = list(space)
+    combinations = (dict(zip(names, values)) for values in itertools.product(*space.values()))
+    return [params for params in combinations if _is_valid(resolve_params(params))]
+
+
+# Muestra aleatoria sin repetición del espacio de búsqueda, sin generar la grilla completa
+def random_combinations(space=OPTIMIZER_SPACE, samples=OPTIMIZER_SAMPLES, seed=OPTIMIZER_SEED):
+    names = list(space)
+    sizes = [len(values) for values in space.values()]
+    total = int(np.prod(sizes))
+    combinations = []
+    for index in random.Random(seed).sample(range(total), min(samples, total)):
+        params = {}
+        # Decodificar el índice como un número en base mixta (un dígito por parámetro)
+        for name, size in zip(reversed(names), reversed(sizes)):
+            index, digit = divmod(index, size)
+            params[name] = space[name][digit]
+        params = {name: params[name] for name in names}
+        if _is_valid(resolve_params(params)):
+            combinations.append(params)
+    return combinations
+
+
+# Calcular las columnas de un grupo igual que apply_technical_indicators
+def _compute_group(df, group, params):
+    if group == 'sma_fast':
+        return {'sma_fast': ta.trend.sma_indicator(df['close'], window=params['fast_ma'])}
+    if group == 'sma_slow':
+        sma_slow = ta.trend.sma_indicator(df['close'], window=params['slow_ma'])
+        return {'sma_slow': sma_slow, 'trend': trend_column(df['close'], sma_slow)}
+    if group == 'rsi':
+        return {'rsi': ta.momentum.rsi(df['close'], window=params['rsi_period'])}
+    if group == 'macd':
+        macd = ta.trend.MACD(df['close'], window_fast=params['macd_fast'], window_slow=params['macd_slow'], window_sign=params['macd_signal'])
+        return {'macd': macd.macd(), 'macd_signal': macd.macd_signal(), 'macd_histogram': macd.macd_diff()}
+    adx = ta.trend.ADXIndicator(df['high'], df['low'], df['close'], window=params['adx_period'])
+    return {'adx': adx.adx(), 'di_plus': adx.adx_pos(), 'di_minus': adx.adx_neg()}
+
+
+def _init_worker(df):
+    frame = apply_technical_indicators(df.copy())
+    _worker['frame'] = frame
+    _worker['levels_near'] = key_level_counts(frame)
+    _worker['columns'] = {}
+
+
+# Indicadores para una combinación reutilizando las columnas ya calculadas en este proceso
+def _indicator_frame(params):
+    frame = _worker['frame']
+    cache = _worker['columns']
+    columns = {}
+    for group, names in INDICATOR_GROUPS.items():
+        values = tuple(params[name] for name in names)
+        if values == tuple(DEFAULT_PARAMS[name] for name in names):
+            continue
+        if (group, values) not in cache:
+            cache[(group, values)] = _compute_group(frame, group, params)
+        columns.update(cache[(group, values)])
+    return frame.assign(**columns) if columns else frame
+
+
+# Evaluar una combinación con el backtesting vectorizado
+def evaluate_params(params):
+    params = resolve_params(params)
+    frame = _indicator_frame(params)
+    counts = compute_signal_counts(frame, params=params, levels_near=_worker['levels_near'])
+    results_df = evaluate_signal_outcomes(frame, counts)
+    if results_df.empty:
+        stats = {'total_signals': 0, 'long_signals': 0, 'short_signals': 0, 'success_rate': 0,
+                 'long_success_rate': 0, 'short_success_rate': 0, 'avg_profit': 0}
+    else:
+        stats = backtest_stats(results_df)
+    return {**params, **stats}
+
+
+def _evaluate_chunk(chunk):
+    return [evaluate_params(params) for params in chunk]
+
+
+# Agrupar las combinaciones que comparten columnas de indicadores para que cada
+# proceso calcule cada columna una sola vez
+def _chunks_by_indicators(combinations):
+    chunks = {}
+    for params in combinations:
+        resolved = resolve_params(params)
+        key = tuple(resolved[name] for names in INDICATOR_GROUPS.values() for name in names)
+        chunks.setdefault(key, []).append(params)
+    return list(chunks.values())
+
+
+# Ordenar por tasa de éxito y potencial de beneficio promedio
+def rank_results(results, min_signals=OPTIMIZER_MIN_SIGNALS):
+    # Sin resultados (ninguna combinación evaluada) no hay columnas que filtrar
+    if results.empty:
+        return results
+    ranked = results[results['total_signals'] >= min_signals]
+    return ranked.sort_values(['success_rate', 'avg_profit'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+# Probar todas las combinaciones sobre las velas de `df` repartiéndolas en un pool de procesos
+def run_optimizer(df, combinations, processes=OPTIMIZER_PROCESSES, min_signals=OPTIMIZER_MIN_SIGNALS):
+    chunks = _chunks_by_indicators(combinations)
+    if processes == 0:
+        _init_worker(df)
+        results = [row for chunk in chunks for row in _evaluate_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(df,)) as pool:
+            results = [row for rows in pool.map(_evaluate_chunk, chunks) for row in rows]
+    return rank_results(pd.DataFrame(results), min_signals)
+
+
+def print_optimizer_results(symbol, ranked, tested, elapsed, top=OPTIMIZER_TOP):
+    print("\n" + "="*80)
+    print(f"{Fore.CYAN}{Style.BRIGHT}MEJORES PARÁMETROS PARA {symbol}{Style.RESET_ALL}")
+    print("="*80)
+    print(f"Combinaciones probadas: {tested} en {elapsed:.1f}s")
+    if ranked.empty:
+        print(f"{Fore.YELLOW}Ninguna combinación generó al menos {OPTIMIZER_MIN_SIGNALS} señales{Style.RESET_ALL}")
+        return
+    for position, row in enumerate(ranked.head(top).to_dict('records'), start=1):
+        params = ', '.join(f"{name}={row[name]}" for name in OPTIMIZER_SPACE)
+        print(f"{position:>2}. {Fore.GREEN}{row['success_rate']:.2f}%{Style.RESET_ALL} éxito, "
+              f"{row['avg_profit']:.2f}% potencial, {row['total_signals']} señales - {params}")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    exchange = init_exchange()
+    if OPTIMIZER_SEARCH == 'random':
+        combinations = random_combinations()
+    else:
+        combinations = parameter_grid()
+    print(f"{Fore.CYAN}Optimizando {len(combinations)} combinaciones - Período: {BACKTEST_START_DATE} hasta {BACKTEST_END_DATE}{Style.RESET_ALL}")
+    for symbol in SYMBOLS:
+        df = fetch_backtest_data(exchange, symbol, TIMEFRAME, BACKTEST_START_DATE, BACKTEST_END_DATE)
+        start = time.perf_counter()
+        ranked = run_optimizer(df, combinations)
+        print_optimizer_results(symbol, ranked, len(combinations), time.perf_counter() - start)
@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from candle_store import ROW_WIDTH, to_candles, to_dataframe
+from compact_frame import compact_frame
+from indicator_registry import ALL_COLUMNS, INDICATORS, resolve
+from strategy_params import resolve_params
+from logger_config import logger
+from initial_config import BACKTEST_PROCESSES, BACKTEST_CHUNK_WARMUP, BACKTEST_CHUNK_CHECK
+
+# Indicadores recursivos (EWM y suavizado de Wilder): dependen de todo el historial, pero
+# calculados desde unas cientos de velas antes convergen bit a bit al valor secuencial.
+# Son los caros (ADX recorre las velas en Python) y se calculan por bloques en paralelo.
+# Las ventanas móviles (medias, Bollinger, Ichimoku, pivotes) no convergen bit a bit si
+# empiezan en otra vela (suma compensada acumulada) y son rápidas: se calculan completas.
+CHUNKED_INDICATORS = ['rsi', 'macd', 'adx']
+
+
+# Bloques [inicio, fin) de filas, uno por proceso y de al menos 4 veces el calentamiento
+def time_chunks(rows, processes, warmup):
+    count = max(1, min(processes, rows // max(1, 4 * warmup)))
+    edges = np.linspace(0, rows, count + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+# Calcular en un proceso los indicadores `names` de las filas [start, end) desde `warmup`
+# velas antes. Las velas y los resultados se comparten como archivos mapeados en memoria
+# (sin copiar los arrays entre procesos). Devuelve los valores de las `check` filas previas
+# a `start` para comparar con el bloque anterior.
+def _compute_chunk(candles_path, output_path, rows, names, columns, params, start, end, warmup, check):
+    candles = np.memmap(candles_path, dtype=np.float64, mode='r').reshape(-1, ROW_WIDTH)
+    first = max(0, start - warmup)
+    df = to_dataframe(candles[first:end])
+    for name in names:
+        INDICATORS[name].compute(df, params)
+    output = np.memmap(output_path, dtype=np.float64, mode='r+', shape=(len(columns), rows))
+    for position, column in enumerate(columns):
+        output[position, start:end] = df[column].to_numpy(dtype=np.float64)[start - first:]
+    output.flush()
+    overlap = max(first, start - check)
+    return np.array([df[column].to_numpy(dtype=np.float64)[overlap - first:start - first] for column in columns])
+
+
+# Mismo resultado que apply_technical_indicators, calculando los indicadores recursivos por
+# bloques de tiempo en `processes` procesos. Cada bloque se acepta si sus `check` velas previas
+# coinciden exactamente con el final del bloque anterior; si no, se recalculan en secuencia.
+def parallel_indicators(df, params=None, processes=BACKTEST_PROCESSES, warmup=BACKTEST_CHUNK_WARMUP, check=BACKTEST_CHUNK_CHECK):
+    params = resolve_params(params)
+    df = df.copy()
+    indicators = resolve(ALL_COLUMNS)
+    names = [item.name for item in indicators if item.name in CHUNKED_INDICATORS]
+    columns = [column for name in names for column in INDICATORS[name].outputs]
+    chunks = time_chunks(len(df), processes, warmup)
+
+    values = None
+    if len(chunks) > 1:
+        values = _parallel_columns(df, params, names, columns, chunks, processes, warmup, check)
+
+    for item in indicators:
+        if item.name in names and values is not None:
+            for column in item.outputs:
+                df[column] = values[columns.index(column)]
+        else:
+            item.compute(df, params)
+    return compact_frame(df)
+
+
+def _parallel_columns(df, params, names, columns, chunks, processes, warmup, check):
+    rows = len(df)
+    with tempfile.TemporaryDirectory(prefix='backtest_') as directory:
+        candles_path = os.path.join(directory, 'candles.f64')
+        output_path = os.path.join(directory, 'indicators.f64')
+        to_candles(df).tofile(candles_path)
+        output = np.memmap(output_path, dtype=np.float64, mode='w+', shape=(len(columns), rows))
+        output.flush()
+
+        # 'spawn' igual que el pool del escaneo
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            futures = [pool.submit(_compute_chunk, candles_path, output_path, rows, names, columns, params,
+                                   start, end, warmup, check) for start, end in chunks]
+            overlaps = [future.result() for future in futures]
+
+        values = np.array(output)
+        del output
+    # Filas donde termina el bloque anterior, calculadas por ambos bloques
+    for (start, end), overlap in zip(chunks[1:], overlaps[1:]):
+        previous = values[:, start - overlap.shape[1]:start]
+        if not np.array_equal(previous, overlap, equal_nan=True):
+            logger.warning(f"Los indicadores recursivos no convergieron antes de la vela {start}; "
+                           f"se calculan en secuencia (aumentar BACKTEST_CHUNK_WARMUP)")
+            return None
+    return values
+
+
+# Indicadores de las filas [start - warmup, len(df)) de un bloque retomado del backtesting
+# incremental, iguales bit a bit a los de una ejecución completa: las ventanas móviles se
+# calculan sobre todo el prefijo y los recursivos desde `warmup` velas antes de `start`,
+# aceptados si sus `check` velas previas a `start` coinciden con los calculados desde el
+# doble de velas antes; si no, se calculan también sobre todo el prefijo.
+def resumed_indicators(df, start, params=None, warmup=BACKTEST_CHUNK_WARMUP, check=BACKTEST_CHUNK_CHECK):
+    params = resolve_params(params)
+    first = max(0, start - warmup)
+    indicators = resolve(ALL_COLUMNS)
+    names = [item.name for item in indicators if item.name in CHUNKED_INDICATORS]
+
+    full = df.copy()
+    for item in indicators:
+        if item.name not in names:
+            item.compute(full, params)
+
+    recursive = _recursive_columns(df, params, names, first, start, warmup, check)
+    if recursive is None:
+        logger.warning(f"Los indicadores recursivos no convergieron antes de la vela {start}; "
+                       f"se calculan desde el inicio (aumentar BACKTEST_CHUNK_WARMUP)")
+        recursive = full
+        for name in names:
+            INDICATORS[name].compute(recursive, params)
+
+    block = full.iloc[first:].copy()
+    for name in names:
+        for column in INDICATORS[name].outputs:
+            block[column] = recursive[column].to_numpy()[len(recursive) - len(block):]
+    return compact_frame(block)
+
+
+# Indicadores recursivos `names` calculados desde la fila `first`, o None si las `check` velas
+# previas a `start` no coinciden con las calculadas desde `warmup` velas antes de `first`
+def _recursive_columns(df, params, names, first, start, warmup, check):
+    recursive = df.iloc[first:].copy()
+    for name in names:
+        INDICATORS[name].compute(recursive, params)
+    if first == 0:
+        return recursive
+
+    earlier_first = max(0, first - warmup)
+    earlier = df.iloc[earlier_first:start].copy()
+    for name in names:
+        INDICATORS[name].compute(earlier, params)
+    overlap = max(first, start - check)
+    for name in names:
+        for column in INDICATORS[name].outputs:
+            current = recursive[column].to_numpy(dtype=np.float64)[overlap - first:start - first]
+            previous = earlier[column].to_numpy(dtype=np.float64)[overlap - earlier_first:]
+            if not np.array_equal(current, previous, equal_nan=True):
+                return None
+    return recursive
@@ -0,0 +1,67 @@
+import time
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from initial_config import PIVOT_WINDOW
+
+
+# Detectar máximos (kind='high') o mínimos (kind='low') locales con una ventana centrada.
+# Equivale a rolling(window, center=True).apply(lambda x: x[len(x)//2] == max(x)) pero
+# evalúa todas las ventanas de una vez con una vista deslizante de NumPy.
+# La ventana de la vela j cubre [j - window//2, j + (window-1)//2]; las velas sin
+# ventana completa o con valores NaN quedan en False, igual que con rolling().apply.
+# `values` puede ser una serie o una matriz (símbolos × velas) con el tiempo en el último eje.
+def find_pivots(values, window=PIVOT_WINDOW, kind='high'):
+    values = np.asarray(values, dtype=float)
+    pivots = np.zeros(values.shape, dtype=bool)
+    if window < 1 or values.shape[-1] < window:
+        return pivots
+
+    windows = sliding_window_view(values, window, axis=-1)
+    extreme = windows.max(axis=-1) if kind == 'high' else windows.min(axis=-1)
+    left = window // 2
+    count = extreme.shape[-1]
+    pivots[..., left:left + count] = values[..., left:left + count] == extreme
+    return pivots
+
+
+# Columnas is_resistance / is_support para un DataFrame OHLCV
+def pivot_columns(df, window=PIVOT_WINDOW):
+    is_resistance = pd.Series(find_pivots(df['high'].to_numpy(), window, 'high'), index=df.index)
+    is_support = pd.Series(find_pivots(df['low'].to_numpy(), window, 'low'), index=df.index)
+    return is_resistance, is_support
+
+
+# Comparar contra la implementación anterior con rolling().apply
+def benchmark(rows=100_000, window=PIVOT_WINDOW, repeat=3):
+    rng = np.random.default_rng(0)
+    high = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows))))
+
+    def rolling_apply():
+        return high.rolling(window=window, center=True).apply(
+            lambda x: x[len(x)//2] == max(x), raw=True
+        ).fillna(0).astype(bool).to_numpy()
+
+    def vectorized():
+        return find_pivots(high.to_numpy(), window, 'high')
+
+    timings = {}
+    for name, func in (('rolling_apply', rolling_apply), ('sliding_window', vectorized)):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = (best, result)
+
+    identical = np.array_equal(timings['rolling_apply'][1], timings['sliding_window'][1])
+    slow, fast = timings['rolling_apply'][0], timings['sliding_window'][0]
+    print(f"Pivotes sobre {rows} velas (ventana {window})")
+    print(f"  rolling().apply: {slow * 1000:.1f} ms")
+    print(f"  sliding_window:  {fast * 1000:.1f} ms")
+    print(f"  Aceleración: {slow / fast:.0f}x - Resultados idénticos: {identical}")
+    return slow, fast, identical
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,122 @@
+import threading
+import numpy as np
+from candle_store import ROW_WIDTH, to_dataframe
+from timeframes import candle_open, timeframe_to_ms, now_ms
+from initial_config import TIMEFRAME, MULTI_TIMEFRAMES, MULTI_TIMEFRAME_ROWS
+
+
+# Apertura de la vela de `timeframe` que contiene cada timestamp (ms)
+def bucket_open(timestamps, timeframe):
+    return candle_open(timestamps, timeframe)
+
+
+# Agrupar velas (n, 6) ordenadas en velas de `timeframe`: apertura de la primera, máximo,
+# mínimo, cierre de la última y volumen sumado de las velas de cada período
+def resample_candles(candles, timeframe):
+    candles = np.asarray(candles, dtype=np.float64).reshape(-1, ROW_WIDTH)
+    if len(candles) == 0:
+        return candles
+    buckets = bucket_open(candles[:, 0], timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+    return np.column_stack([
+        buckets[starts],
+        candles[starts, 1],
+        np.maximum.reduceat(candles[:, 2], starts),
+        np.minimum.reduceat(candles[:, 3], starts),
+        candles[ends, 4],
+        np.add.reduceat(candles[:, 5], starts),
+    ])
+
+
+# Velas de un timeframe mayor de un símbolo: las cerradas y el período abierto acumulado
+# con las velas base cerradas que ya llegaron (sin la vela base abierta)
+class _Series:
+    __slots__ = ('closed', 'partial', 'last_base')
+
+    def __init__(self):
+        self.closed = np.empty((0, ROW_WIDTH))
+        self.partial = None
+        self.last_base = None
+
+
+# Velas de timeframes mayores armadas con las velas del timeframe base, sin pedirlas al
+# exchange. Cada actualización sólo agrega las velas base cerradas nuevas al período abierto;
+# los períodos cerrados no se recalculan. Guarda hasta `max_rows` velas por timeframe.
+class CandleResampler:
+    def __init__(self, base_timeframe=TIMEFRAME, timeframes=MULTI_TIMEFRAMES, max_rows=MULTI_TIMEFRAME_ROWS):
+        self.base_timeframe = base_timeframe
+        self.base_duration = timeframe_to_ms(base_timeframe)
+        self.timeframes = list(timeframes)
+        for timeframe in self.timeframes:
+            duration = timeframe_to_ms(timeframe)
+            if duration <= self.base_duration or duration % self.base_duration:
+                raise ValueError(f"El timeframe {timeframe} no es múltiplo mayor de {base_timeframe}")
+        self.max_rows = max_rows
+        self.series = {}
+        self.open_candles = {}
+        self.lock = threading.Lock()
+
+    # Velas base necesarias para tener `max_rows` velas de cada timeframe desde el primer ciclo
+    def base_rows(self):
+        if not self.timeframes:
+            return 0
+        return (self.max_rows + 1) * max(timeframe_to_ms(timeframe) for timeframe in self.timeframes) // self.base_duration
+
+    def has_symbol(self, symbol):
+        return symbol in self.open_candles
+
+    # Agregar velas base (n, 6) de un símbolo; la última puede estar abierta en `now`
+    def update(self, symbol, candles, now=None):
+        now = now_ms() if now is None else now
+        candles = np.asarray(candles, dtype=np.float64).reshape(-1, ROW_WIDTH)
+        is_closed = candles[:, 0] + self.base_duration <= now
+        closed = candles[is_closed]
+        with self.lock:
+            self.open_candles[symbol] = candles[-1] if len(candles) and not is_closed[-1] else None
+            for timeframe in self.timeframes:
+                series = self.series.setdefault((symbol, timeframe), _Series())
+                self._fold(series, timeframe, closed)
+
+    def _fold(self, series, timeframe, closed):
+        if series.last_base is not None:
+            closed = closed[closed[:, 0] > series.last_base]
+        if len(closed) == 0:
+            return
+        duration = timeframe_to_ms(timeframe)
+        seeding = series.last_base is None
+        series.last_base = closed[-1, 0]
+        if series.partial is not None:
+            closed = np.vstack([series.partial, closed])
+        candles = resample_candles(closed, timeframe)
+        # El primer período del historial puede estar incompleto
+        if seeding and closed[0, 0] != candles[0, 0]:
+            candles = candles[1:]
+        # Un período cierra cuando llegó su última vela base
+        done = candles[:, 0] + duration <= series.last_base + self.base_duration
+        series.partial = candles[~done][-1] if not done.all() else None
+        if done.any():
+            series.closed = np.vstack([series.closed, candles[done]])[-self.max_rows:]
+
+    # Velas de `timeframe` de un símbolo como DataFrame: las cerradas más el período abierto
+    # (que incluye la vela base abierta), igual que get_historical_data, o sólo las cerradas
+    # con `closed_only`. None si no hay velas.
+    def frame(self, symbol, timeframe, closed_only=False):
+        with self.lock:
+            series = self.series.get((symbol, timeframe))
+            if series is None:
+                return None
+            closed = series.closed
+            current = [] if series.partial is None or closed_only else [series.partial]
+            open_candle = None if closed_only else self.open_candles.get(symbol)
+            if open_candle is not None:
+                # La vela base abierta se suma al período abierto (o abre el siguiente)
+                current.append(open_candle)
+        candles = np.vstack([closed, resample_candles(current, timeframe)]) if current else closed
+        if len(candles) == 0:
+            return None
+        return to_dataframe(candles)
+
+
+# Timeframes mayores del bot (MULTI_TIMEFRAMES) armados con las velas de TIMEFRAME
+candle_resampler = CandleResampler()
@@ -0,0 +1,137 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from logger_config import logger
+from initial_config import SCAN_CONCURRENCY, SCAN_PROCESSES
+
+# Pool de procesos compartido entre ciclos (crear procesos en cada ciclo es caro)
+_process_pool = None
+
+
+def get_process_pool(processes=SCAN_PROCESSES):
+    global _process_pool
+    if _process_pool is None:
+        # 'spawn' evita heredar locks de los hilos de descarga al hacer fork
+        _process_pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+# Escanear varios símbolos en paralelo.
+# fetch(symbol) descarga datos en un pool de hilos (hasta `concurrency` a la vez) y
+# analyze(symbol, data) corre en un pool de procesos si `processes` > 0, o en el mismo hilo.
+# Los resultados se entregan en el orden de `symbols` a medida que están listos, y un error
+# en un símbolo no afecta a los demás: su resultado trae 'error' en lugar de 'result'.
+# Con `cache` (AnalysisCache) y cache_key(symbol, data), los datos ya analizados reutilizan
+# el resultado guardado sin llamar a analyze ('cached' en True); cache_value(result) elige
+# qué parte del resultado se guarda.
+def scan_symbols(symbols, fetch, analyze, concurrency=SCAN_CONCURRENCY, processes=SCAN_PROCESSES,
+                 cache=None, cache_key=None, cache_value=None):
+    if concurrency <= 1:
+        for symbol in symbols:
+            yield _run_sequential(symbol, fetch, analyze, cache, cache_key, cache_value)
+        return
+
+    process_pool = get_process_pool(processes) if processes > 0 else None
+
+    def fetch_and_analyze(symbol):
+        data = fetch(symbol)
+        if data is None:
+            return None, None, None
+        key, cached = _lookup(cache, cache_key, symbol, data)
+        if cached is not None:
+            return key, cached, True
+        if process_pool is not None:
+            # El análisis pesado corre en otro proceso; el hilo queda libre para otra descarga
+            return key, process_pool.submit(analyze, symbol, data), False
+        return key, analyze(symbol, data), False
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='scan') as threads:
+        futures = [(symbol, threads.submit(fetch_and_analyze, symbol)) for symbol in symbols]
+        for symbol, future in futures:
+            try:
+                key, result, cached = future.result()
+                if process_pool is not None and result is not None and not cached:
+                    result = result.result()
+                if not cached:
+                    _store(cache, key, result, cache_value)
+                yield {'symbol': symbol, 'result': result, 'error': None, 'cached': bool(cached)}
+            except Exception as e:
+                logger.error(f"Error al analizar {symbol}: {e}")
+                yield {'symbol': symbol, 'result': None, 'error': e, 'cached': False}
+
+
+# Escanear descargando en paralelo igual que scan_symbols, pero analizando todos los símbolos
+# descargados juntos: analyze_all({símbolo: datos}) devuelve {símbolo: resultado}, donde un
+# resultado que es una excepción marca el error de ese símbolo. Entrega los mismos elementos
+# que scan_symbols en el orden de `symbols`, una vez analizados todos.
+def scan_symbols_batch(symbols, fetch, analyze_all, concurrency=SCAN_CONCURRENCY,
+                       cache=None, cache_key=None, cache_value=None):
+    items = {}
+    pending = {}
+    for item in scan_symbols(symbols, fetch, _keep_data, concurrency, processes=0):
+        symbol, data = item['symbol'], item['result']
+        if data is None:
+            items[symbol] = item
+            continue
+        key, cached = _lookup(cache, cache_key, symbol, data)
+        if cached is not None:
+            items[symbol] = {'symbol': symbol, 'result': cached, 'error': None, 'cached': True}
+        else:
+            pending[symbol] = key, data
+
+    results = {}
+    if pending:
+        try:
+            results = analyze_all({symbol: data for symbol, (key, data) in pending.items()})
+        except Exception as e:
+            results = {symbol: e for symbol in pending}
+    for symbol, (key, data) in pending.items():
+        result = results.get(symbol)
+        if isinstance(result, Exception):
+            logger.error(f"Error al analizar {symbol}: {result}")
+            items[symbol] = {'symbol': symbol, 'result': None, 'error': result, 'cached': False}
+            continue
+        _store(cache, key, result, cache_value)
+        items[symbol] = {'symbol': symbol, 'result': result, 'error': None, 'cached': False}
+
+    for symbol in symbols:
+        yield items[symbol]
+
+
+# Análisis de scan_symbols_batch durante la descarga: sólo conserva los datos
+def _keep_data(symbol, data):
+    return data
+
+
+def _lookup(cache, cache_key, symbol, data):
+    if cache is None or cache_key is None:
+        return None, None
+    key = cache_key(symbol, data)
+    return key, cache.get(key) if key is not None else None
+
+
+def _store(cache, key, result, cache_value):
+    if cache is not None and key is not None and result is not None:
+        cache.put(key, cache_value(result) if cache_value else result)
+
+
+def _run_sequential(symbol, fetch, analyze, cache=None, cache_key=None, cache_value=None):
+    try:
+        data = fetch(symbol)
+        if data is None:
+            return {'symbol': symbol, 'result': None, 'error': None, 'cached': False}
+        key, cached = _lookup(cache, cache_key, symbol, data)
+        if cached is not None:
+            return {'symbol': symbol, 'result': cached, 'error': None, 'cached': True}
+        result = analyze(symbol, data)
+        _store(cache, key, result, cache_value)
+        return {'symbol': symbol, 'result': result, 'error': None, 'cached': False}
+    except Exception as e:
+        logger.error(f"Error al analizar {symbol}: {e}")
+        return {'symbol': symbol, 'result': None, 'error': e, 'cached': False}
@@ -0,0 +1,128 @@
+import time
+from abc import ABC, abstractmethod
+import pandas as pd
+from logger_config import logger
+from timeframes import timeframe_to_ms, now_ms, candle_open, last_closed_open
+from initial_config import SCHEDULER_SETTLE_DELAY, SCHEDULER_RETRY_DELAY, SCHEDULER_MAX_RETRIES
+
+
+# Timestamp (ms) del próximo cierre de vela posterior a `timestamp_ms`
+def next_close(timestamp_ms, timeframe):
+    return candle_open(timestamp_ms, timeframe) + timeframe_to_ms(timeframe)
+
+
+# Apertura de la última vela cerrada presente en `df` en el instante `timestamp_ms`
+# (el DataFrame puede incluir la vela abierta como última fila)
+def last_closed_in(df, timeframe, timestamp_ms):
+    limit = pd.to_datetime(last_closed_open(timestamp_ms, timeframe), unit='ms')
+    closed = df.index[df.index <= limit]
+    if len(closed) == 0:
+        return None
+    return closed[-1].value // 10**6
+
+
+# Velas de `df` ya cerradas en el instante `timestamp_ms` (sin la vela abierta)
+def closed_candles(df, timeframe, timestamp_ms):
+    limit = pd.to_datetime(last_closed_open(timestamp_ms, timeframe), unit='ms')
+    return df[df.index <= limit]
+
+
+# Última vela cerrada ya analizada por cada clave (símbolo o (símbolo, timeframe))
+class ClosedCandleTracker:
+    def __init__(self):
+        self.last = {}
+
+    # True si la vela es posterior a la última registrada
+    def is_new(self, key, timestamp_ms):
+        return timestamp_ms is not None and timestamp_ms > self.last.get(key, -1)
+
+    # Registrar la vela y devolver True si es posterior a la última vista
+    def update(self, key, timestamp_ms):
+        if not self.is_new(key, timestamp_ms):
+            return False
+        self.last[key] = timestamp_ms
+        return True
+
+    def is_current(self, key, timeframe, timestamp_ms):
+        return self.last.get(key, -1) >= last_closed_open(timestamp_ms, timeframe)
+
+
+# Despierta sólo en los cierres de vela de los timeframes indicados (más una pequeña espera
+# para que el exchange publique la vela cerrada) en lugar de consultar cada pocos segundos
+class CandleCloseScheduler:
+    def __init__(self, timeframes, settle_delay=SCHEDULER_SETTLE_DELAY, retry_delay=SCHEDULER_RETRY_DELAY,
+                 max_retries=SCHEDULER_MAX_RETRIES, clock=now_ms, sleep=time.sleep):
+        self.timeframes = list(timeframes)
+        self.settle_delay_ms = int(settle_delay * 1000)
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.clock = clock
+        self.sleep = sleep
+
+    # Próximo instante de ejecución y timeframes cuya vela cierra en ese instante
+    def next_wakeup(self, timestamp_ms=None):
+        timestamp_ms = self.clock() if timestamp_ms is None else timestamp_ms
+        closes = {timeframe: next_close(timestamp_ms - self.settle_delay_ms, timeframe) for timeframe in self.timeframes}
+        close = min(closes.values())
+        return close + self.settle_delay_ms, [timeframe for timeframe, value in closes.items() if value == close]
+
+    # Dormir hasta el próximo cierre y devolver los timeframes que cerraron
+    def wait(self):
+        wakeup, timeframes = self.next_wakeup()
+        remaining = wakeup - self.clock()
+        if remaining > 0:
+            self.sleep(remaining / 1000)
+        return timeframes
+
+    # Ejecutar on_close(timeframes) en cada cierre. Si devuelve False (alguna vela cerrada
+    # todavía no estaba publicada) se reintenta hasta max_retries veces antes del próximo cierre.
+    def run(self, on_close, cycles=None):
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            timeframes = self.wait()
+            done = on_close(timeframes)
+            retries = 0
+            while not done and retries < self.max_retries:
+                retries += 1
+                self.sleep(self.retry_delay)
+                done = on_close(timeframes)
+            if not done:
+                logger.warning(f"Velas cerradas sin publicar tras {retries} reintentos ({', '.join(timeframes)})")
+            cycle += 1
+
+
+# Fuente de velas cerradas para el modo por eventos. Cada evento es
+# (símbolo, timeframe, DataFrame con las últimas velas cerradas hasta la nueva).
+# Un feed en vivo (por ejemplo websockets) sólo necesita implementar events().
+class CandleFeed(ABC):
+    @abstractmethod
+    def events(self):
+        pass
+
+
+# Feed local que reproduce velas ya guardadas como si llegaran en vivo, para pruebas.
+# `frames` es {símbolo: DataFrame OHLCV}; los eventos salen en orden de cierre.
+# speed > 0 espera entre cierres (tiempo real / speed); None no espera.
+class ReplayFeed(CandleFeed):
+    def __init__(self, frames, timeframe, history=500, warmup=100, speed=None, sleep=time.sleep):
+        self.frames = frames
+        self.timeframe = timeframe
+        self.history = history
+        self.warmup = warmup
+        self.speed = speed
+        self.sleep = sleep
+
+    def events(self):
+        timeline = sorted(
+            (timestamp, symbol, position)
+            for symbol, df in self.frames.items()
+            for position, timestamp in enumerate(df.index)
+            if position + 1 >= self.warmup
+        )
+        previous = None
+        for timestamp, symbol, position in timeline:
+            if self.speed and previous is not None and timestamp > previous:
+                self.sleep((timestamp - previous).total_seconds() / self.speed)
+            previous = timestamp
+            df = self.frames[symbol]
+            yield symbol, self.timeframe, df.iloc[max(0, position + 1 - self.history):position + 1].copy()
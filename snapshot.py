@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from logger_config import logger
+from metrics import snapshot_write_errors
+from initial_config import SNAPSHOT_FILE
+
+# Respuestas serializadas guardadas por snapshot (una por combinación de filtros)
+MAX_CACHED_RESPONSES = 256
+# Campos del resumen que no forman parte del estado publicado
+VOLATILE_FIELDS = ('cached',)
+
+
+# Estado inmutable del último análisis de cada símbolo.
+# Nunca se modifica: cada ciclo crea uno nuevo y lo reemplaza de una sola vez, así los
+# lectores ven siempre un estado completo sin tomar locks.
+class Snapshot:
+    def __init__(self, version, symbols, updated=None):
+        self.version = version
+        self.symbols = symbols
+        self.updated = time.time() if updated is None else updated
+        encoded = json.dumps(symbols, sort_keys=True).encode()
+        self.etag = f'"{version}-{hashlib.sha1(encoded).hexdigest()[:16]}"'
+        self.responses = {}
+
+    # Cuerpo JSON de una respuesta, serializado una sola vez por snapshot
+    def body(self, key, build):
+        body = self.responses.get(key)
+        if body is None:
+            body = json.dumps(build(self)).encode()
+            if len(self.responses) < MAX_CACHED_RESPONSES:
+                self.responses[key] = body
+        return body
+
+
+# Contenedor del snapshot actual, actualizado por el ciclo de análisis.
+# Con `path` cada snapshot nuevo también se escribe en ese archivo JSON y get() lee el que
+# publique otro proceso (por ejemplo bot.py corriendo aparte del servidor de la API).
+class SnapshotStore:
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.current = Snapshot(0, {}, updated=None)
+        self.lock = threading.Lock()
+        self.path = path
+        self.file_mtime = None
+
+    # Incorporar los resúmenes de un ciclo (los símbolos no analizados conservan su último resumen)
+    def update(self, summaries):
+        with self.lock:
+            self._reload()
+            symbols = dict(self.current.symbols)
+            for summary in summaries:
+                symbols[summary['symbol']] = {name: value for name, value in summary.items() if name not in VOLATILE_FIELDS}
+            if symbols == self.current.symbols:
+                return self.current
+            self.current = Snapshot(self.current.version + 1, symbols)
+            self._save(self.current)
+            return self.current
+
+    def get(self):
+        if self.path and self._mtime() != self.file_mtime:
+            with self.lock:
+                self._reload()
+        return self.current
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    # Adoptar el snapshot del archivo si cambió desde la última lectura y es más nuevo que el actual
+    # (o si este proceso todavía no tiene ninguno)
+    def _reload(self):
+        if not self.path:
+            return
+        mtime = self._mtime()
+        if mtime is None or mtime == self.file_mtime:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer el snapshot de {self.path}: {e}")
+            return
+        self.file_mtime = mtime
+        if not self.current.symbols or data['updated'] > self.current.updated:
+            self.current = Snapshot(data['version'], data['symbols'], data['updated'])
+
+    # Escribir el snapshot completo y reemplazar el archivo de una sola vez
+    def _save(self, snapshot):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': snapshot.version, 'updated': snapshot.updated, 'symbols': snapshot.symbols}, f)
+            os.replace(tmp_path, self.path)
+            self.file_mtime = self._mtime()
+        except OSError as e:
+            # Sin el archivo los demás procesos no ven este snapshot: queda en /metrics
+            snapshot_write_errors.inc()
+            logger.error(f"No se pudo guardar el snapshot en {self.path}: {e}")
+
+
+# Aceptar 'BTC/USDT', 'BTC-USDT', 'BTC_USDT' o 'btcusdt' en las URLs
+def normalize_symbol(symbol, known_symbols):
+    wanted = symbol.upper().replace('-', '/').replace('_', '/')
+    for known in known_symbols:
+        if known == wanted or known.replace('/', '') == wanted:
+            return known
+    return None
+
+
+# Resúmenes que cumplen los filtros de /signals
+def filter_signals(snapshot, signal=None, symbols=None, min_signals=0):
+    selected = []
+    for symbol, summary in snapshot.symbols.items():
+        if symbols and symbol not in symbols:
+            continue
+        if signal and summary['signal'] != signal:
+            continue
+        if summary['signal'] and summary['signals'].count(summary['signal']) < min_signals:
+            continue
+        if not summary['signal'] and min_signals > 0:
+            continue
+        selected.append(summary)
+    return selected
+
+
+# Niveles a menos de `max_distance` (relativo) del precio actual
+def filter_levels(summary, max_distance=None):
+    def near(levels):
+        if max_distance is None:
+            return levels
+        return [level for level in levels if abs(level[0] - summary['price']) <= summary['price'] * max_distance]
+
+    return {
+        'symbol': summary['symbol'],
+        'timestamp': summary['timestamp'],
+        'price': summary['price'],
+        'supports': near(summary['supports']),
+        'resistances': near(summary['resistances']),
+    }
+
+
+# Snapshot compartido por el bot y la API
+signal_snapshot = SnapshotStore()
@@ -0,0 +1,28 @@
+from initial_config import FAST_MA, SLOW_MA, RSI_PERIOD, RSI_OVERBOUGHT, RSI_OVERSOLD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, ADX_PERIOD, ADX_THRESHOLD, VOLUME_THRESHOLD
+
+# Parámetros de la estrategia con los valores de initial_config.py.
+# Las funciones de indicadores y señales aceptan un dict `params` con cualquier
+# subconjunto de estas claves para poder probar otros valores sin tocar la configuración.
+DEFAULT_PARAMS = {
+    'fast_ma': FAST_MA,
+    'slow_ma': SLOW_MA,
+    'rsi_period': RSI_PERIOD,
+    'rsi_overbought': RSI_OVERBOUGHT,
+    'rsi_oversold': RSI_OVERSOLD,
+    'macd_fast': MACD_FAST,
+    'macd_slow': MACD_SLOW,
+    'macd_signal': MACD_SIGNAL,
+    'adx_period': ADX_PERIOD,
+    'adx_threshold': ADX_THRESHOLD,
+    'volume_threshold': VOLUME_THRESHOLD,
+}
+
+
+# Completar `params` con los valores por defecto
+def resolve_params(params=None):
+    if not params:
+        return DEFAULT_PARAMS
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_PARAMS, **params}
@@ -0,0 +1,399 @@
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+from compact_frame import TREND_DTYPE, compact_frame
+from initial_config import FAST_MA, SLOW_MA, RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, ADX_PERIOD, PIVOT_WINDOW
+
+# Columnas en el mismo orden que produce bot.apply_technical_indicators
+COLUMNS = [
+    'open', 'high', 'low', 'close', 'volume',
+    'sma_fast', 'sma_slow', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'adx', 'di_plus', 'di_minus',
+    'bollinger_high', 'bollinger_low', 'bollinger_mid',
+    'volume_sma', 'volume_ratio', 'volume_increasing', 'volume_decreasing_trend',
+    'ichimoku_conversion_line', 'ichimoku_base_line', 'ichimoku_a', 'ichimoku_b',
+    'above_cloud', 'below_cloud', 'in_cloud', 'future_cloud_bullish', 'future_cloud_bearish',
+    'is_resistance', 'is_support',
+    'broke_resistance', 'broke_support', 'last_broke_resistance', 'last_broke_support',
+    'trend',
+]
+
+BOLLINGER_WINDOW = 20
+BOLLINGER_DEV = 2
+VOLUME_WINDOW = 20
+ICHIMOKU_WINDOWS = (9, 26, 52)
+MAX_ROWS = 500
+
+
+# Media exponencial con la misma recurrencia que pandas ewm(adjust=False)
+class _Ema:
+    def __init__(self, min_periods, span=None, alpha=None):
+        com = (span - 1) / 2 if span is not None else (1 - alpha) / alpha
+        self.alpha = 1. / (1. + com)
+        self.old_wt_factor = 1. - self.alpha
+        self.min_periods = min_periods
+        self.weighted = math.nan
+        self.nobs = 0
+
+    def update(self, value):
+        if value == value:
+            self.nobs += 1
+            if self.weighted == self.weighted:
+                if self.weighted != value:
+                    self.weighted = self.old_wt_factor * self.weighted + self.alpha * value
+                    self.weighted /= (self.old_wt_factor + self.alpha)
+            else:
+                self.weighted = value
+        return self.weighted if self.nobs >= self.min_periods else math.nan
+
+
+# Media móvil con la misma suma compensada (Kahan) que pandas rolling().mean(),
+# actualizada en O(1) quitando la vela que sale y sumando la que entra
+class _RollingMean:
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_values = 0
+        self.prev_value = None
+
+    def update(self, value):
+        if self.prev_value is None:
+            self.prev_value = value
+        self.values.append(value)
+        if len(self.values) > self.window:
+            y = -self.values.popleft() - self.compensation_remove
+            t = self.total + y
+            self.compensation_remove = t - self.total - y
+            self.total = t
+        y = value - self.compensation_add
+        t = self.total + y
+        self.compensation_add = t - self.total - y
+        self.total = t
+        self.same_values = self.same_values + 1 if value == self.prev_value else 1
+        self.prev_value = value
+
+        if len(self.values) < self.window:
+            return math.nan
+        if self.same_values >= self.window:
+            return value
+        return self.total / self.window
+
+
+# Desviación estándar (ddof=0) con el mismo algoritmo de Welford compensado que
+# pandas rolling().std(), actualizada en O(1)
+class _RollingStd:
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_values = 0
+        self.prev_value = None
+
+    def update(self, value):
+        if self.prev_value is None:
+            self.prev_value = value
+        self.values.append(value)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            nobs = len(self.values) - 1
+            prev_mean = self.mean - self.compensation_remove
+            y = old - self.compensation_remove
+            t = y - self.mean
+            self.compensation_remove = t + self.mean - y
+            self.mean -= t / nobs
+            self.ssqdm -= (old - prev_mean) * (old - self.mean)
+        nobs = min(len(self.values), self.window)
+        self.same_values = self.same_values + 1 if value == self.prev_value else 1
+        self.prev_value = value
+        prev_mean = self.mean - self.compensation_add
+        y = value - self.compensation_add
+        t = y - self.mean
+        self.compensation_add = t + self.mean - y
+        self.mean += t / nobs
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+
+        if nobs < self.window:
+            return math.nan
+        if nobs == 1 or self.same_values >= nobs:
+            return 0.0
+        variance = self.ssqdm / nobs
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+
+# Máximo o mínimo de una ventana deslizante con deque monotónica (O(1) amortizado)
+class _RollingExtreme:
+    def __init__(self, window, mode, min_periods=None):
+        self.window = window
+        self.is_max = mode == 'max'
+        self.min_periods = window if min_periods is None else min_periods
+        self.items = deque()
+        self.count = 0
+
+    def update(self, value):
+        if self.is_max:
+            while self.items and self.items[-1][1] <= value:
+                self.items.pop()
+        else:
+            while self.items and self.items[-1][1] >= value:
+                self.items.pop()
+        self.items.append((self.count, value))
+        self.count += 1
+        if self.items[0][0] <= self.count - 1 - self.window:
+            self.items.popleft()
+        if min(self.count, self.window) < max(self.min_periods, 1):
+            return math.nan
+        return self.items[0][1]
+
+
+# ADX/DI+/DI- reproduciendo la inicialización y el suavizado de Wilder de ta.trend.ADXIndicator
+class _Adx:
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.prev_high = self.prev_low = self.prev_close = math.nan
+        self.trs = self.dip = self.din = 0.0
+        self.initial = []
+        self.initial_di = []
+        self.adx = 0.0
+
+    def update(self, high, low, close):
+        w = self.window
+        k = self.count
+        self.count += 1
+        di_plus = di_minus = adx = 0.0
+        if k == 0:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            return adx, di_plus, di_minus
+
+        tr = max(high, self.prev_close) - min(low, self.prev_close)
+        diff_up = high - self.prev_high
+        diff_down = self.prev_low - low
+        pos = abs(((diff_up > diff_down) and (diff_up > 0)) * diff_up)
+        neg = abs(((diff_down > diff_up) and (diff_down > 0)) * diff_down)
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        if k <= w:
+            # Suma inicial de las primeras `window` velas (np.sum igual que ta)
+            self.initial.append((tr, pos, neg))
+            if k == w:
+                self.trs, self.dip, self.din = (float(total) for total in np.sum(self.initial, axis=0))
+        else:
+            self.trs = self.trs - (self.trs / float(w)) + tr
+            self.dip = self.dip - (self.dip / float(w)) + pos
+            self.din = self.din - (self.din / float(w)) + neg
+            if self.trs != 0:
+                di_plus = 100 * (self.dip / self.trs)
+                di_minus = 100 * (self.din / self.trs)
+
+        if k < w:
+            return adx, di_plus, di_minus
+
+        # Índice direccional de la vela actual
+        p = 100 * (self.dip / self.trs) if self.trs != 0 else 0
+        n = 100 * (self.din / self.trs) if self.trs != 0 else 0
+        directional_index = 100 * abs((p - n) / (p + n)) if p + n != 0 else 0
+
+        if k < 2 * w - 1:
+            self.initial_di.append(directional_index)
+        elif k == 2 * w - 1:
+            self.initial_di.append(directional_index)
+            self.adx = float(np.mean(self.initial_di))
+            adx = self.adx
+        else:
+            self.adx = ((self.adx * (w - 1)) + directional_index) / float(w)
+            adx = self.adx
+        return adx, di_plus, di_minus
+
+
+# Motor de indicadores incremental por símbolo.
+# Cada vela cerrada actualiza todos los indicadores en tiempo constante y el resultado
+# coincide con apply_technical_indicators calculado sobre todo el historial recibido.
+class StreamingIndicators:
+    def __init__(self, max_rows=MAX_ROWS):
+        self.rows = deque(maxlen=max_rows)
+        self.position = -1
+        self.last_timestamp = None
+
+        self.sma_fast = _RollingMean(FAST_MA)
+        self.sma_slow = _RollingMean(SLOW_MA)
+        self.rsi_up = _Ema(RSI_PERIOD, alpha=1 / RSI_PERIOD)
+        self.rsi_down = _Ema(RSI_PERIOD, alpha=1 / RSI_PERIOD)
+        self.ema_fast = _Ema(MACD_FAST, span=MACD_FAST)
+        self.ema_slow = _Ema(MACD_SLOW, span=MACD_SLOW)
+        self.ema_signal = _Ema(MACD_SIGNAL, span=MACD_SIGNAL)
+        self.adx = _Adx(ADX_PERIOD)
+        self.bollinger_mean = _RollingMean(BOLLINGER_WINDOW)
+        self.bollinger_std = _RollingStd(BOLLINGER_WINDOW)
+        self.volume_sma = _RollingMean(VOLUME_WINDOW)
+        self.volumes = deque(maxlen=4)
+
+        conversion, base, span_b = ICHIMOKU_WINDOWS
+        self.conversion_high = _RollingExtreme(conversion, 'max')
+        self.conversion_low = _RollingExtreme(conversion, 'min')
+        self.base_high = _RollingExtreme(base, 'max')
+        self.base_low = _RollingExtreme(base, 'min')
+        self.span_b_high = _RollingExtreme(span_b, 'max', min_periods=0)
+        self.span_b_low = _RollingExtreme(span_b, 'min', min_periods=0)
+        # Valores de la nube de hace `base` velas (shift(26) en el cálculo por lotes)
+        self.cloud_history = deque(maxlen=base + 1)
+
+        # Pivotes: ventana centrada, se confirman con (PIVOT_WINDOW - 1) // 2 velas de retraso
+        self.pivot_high = _RollingExtreme(PIVOT_WINDOW, 'max')
+        self.pivot_low = _RollingExtreme(PIVOT_WINDOW, 'min')
+        self.pivot_lag = (PIVOT_WINDOW - 1) // 2
+        self.last_break_resistance = None
+        self.last_break_support = None
+
+        self.lowest = math.inf
+        self.highest = -math.inf
+        self.prev_close = math.nan
+
+    # Inicializar el motor con un DataFrame histórico de velas cerradas
+    def seed(self, df):
+        for timestamp, candle in zip(df.index, df[['open', 'high', 'low', 'close', 'volume']].itertuples(index=False)):
+            self.update(timestamp, *candle)
+        return self
+
+    # Procesar una vela cerrada nueva. Velas repetidas o anteriores se ignoran.
+    def update(self, timestamp, open_, high, low, close, volume):
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return None
+        self.last_timestamp = timestamp
+        self.position += 1
+        open_, high, low, close, volume = float(open_), float(high), float(low), float(close), float(volume)
+
+        row = {'timestamp': timestamp, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+        # Medias móviles
+        row['sma_fast'] = self.sma_fast.update(close)
+        row['sma_slow'] = self.sma_slow.update(close)
+
+        # RSI
+        diff = close - self.prev_close
+        up = self.rsi_up.update(diff if diff > 0 else 0.0)
+        down = self.rsi_down.update(-diff if diff < 0 else 0.0)
+        if down == 0:
+            row['rsi'] = 100.0
+        else:
+            row['rsi'] = 100 - (100 / (1 + up / down)) if down == down else math.nan
+
+        # MACD
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        macd_signal = self.ema_signal.update(macd)
+        row['macd'] = macd
+        row['macd_signal'] = macd_signal
+        row['macd_histogram'] = macd - macd_signal
+
+        # ADX
+        row['adx'], row['di_plus'], row['di_minus'] = self.adx.update(high, low, close)
+
+        # Bollinger
+        mid = self.bollinger_mean.update(close)
+        std = self.bollinger_std.update(close)
+        row['bollinger_high'] = mid + BOLLINGER_DEV * std
+        row['bollinger_low'] = mid - BOLLINGER_DEV * std
+        row['bollinger_mid'] = mid
+
+        # Volumen
+        volume_sma = self.volume_sma.update(volume)
+        self.volumes.append(volume)
+        row['volume_sma'] = volume_sma
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row['volume_ratio'] = float(np.float64(volume) / volume_sma)
+        v = list(self.volumes)[::-1]
+        row['volume_increasing'] = len(v) > 1 and v[0] > v[1]
+        row['volume_decreasing_trend'] = len(v) > 3 and v[0] < v[1] and v[1] < v[2] and v[2] < v[3]
+
+        # Ichimoku
+        conversion = 0.5 * (self.conversion_high.update(high) + self.conversion_low.update(low))
+        base = 0.5 * (self.base_high.update(high) + self.base_low.update(low))
+        span_a = 0.5 * (conversion + base)
+        span_b = 0.5 * (self.span_b_high.update(high) + self.span_b_low.update(low))
+        self.cloud_history.append((span_a, span_b))
+        row['ichimoku_conversion_line'] = conversion
+        row['ichimoku_base_line'] = base
+        row['ichimoku_a'] = span_a
+        row['ichimoku_b'] = span_b
+        if len(self.cloud_history) == self.cloud_history.maxlen:
+            past_a, past_b = self.cloud_history[0]
+        else:
+            past_a = past_b = math.nan
+        row['above_cloud'] = close > past_a and close > past_b
+        row['below_cloud'] = close < past_a and close < past_b
+        row['in_cloud'] = not (row['above_cloud'] or row['below_cloud'])
+        row['future_cloud_bullish'] = span_a > span_b
+        row['future_cloud_bearish'] = span_a < span_b
+
+        # Pivotes (se confirman más adelante, cuando existe la mitad derecha de la ventana)
+        row['is_resistance'] = False
+        row['is_support'] = False
+        row['broke_resistance'] = False
+        row['broke_support'] = False
+
+        self.lowest = min(self.lowest, low)
+        self.highest = max(self.highest, high)
+
+        # Tendencia
+        sma_slow = row['sma_slow']
+        row['trend'] = 'BULLISH' if close > sma_slow else 'BEARISH' if close < sma_slow else 'NEUTRAL'
+
+        row['position'] = self.position
+        self.rows.append(row)
+        self.prev_close = close
+
+        window_high = self.pivot_high.update(high)
+        window_low = self.pivot_low.update(low)
+        self._confirm_pivot(window_high, window_low)
+        return row
+
+    # Confirmar el pivote de la vela central de la ventana y las rupturas que dependen de él
+    def _confirm_pivot(self, window_high, window_low):
+        center = self.position - self.pivot_lag
+        if center < PIVOT_WINDOW // 2 or len(self.rows) <= self.pivot_lag:
+            return
+        pivot_row = self.rows[-1 - self.pivot_lag]
+        pivot_row['is_resistance'] = pivot_row['high'] == window_high
+        pivot_row['is_support'] = pivot_row['low'] == window_low
+
+        # La ruptura de la vela siguiente usa el pivote recién confirmado
+        if self.pivot_lag == 0:
+            return
+        next_row = self.rows[-self.pivot_lag]
+        if next_row['close'] > pivot_row['close'] and pivot_row['is_resistance'] and next_row['close'] > pivot_row['high']:
+            next_row['broke_resistance'] = True
+            self.last_break_resistance = (next_row['position'], next_row['high'])
+        if next_row['close'] < pivot_row['close'] and pivot_row['is_support'] and next_row['close'] < pivot_row['low']:
+            next_row['broke_support'] = True
+            self.last_break_support = (next_row['position'], next_row['low'])
+
+    # DataFrame con las últimas `rows` velas (todas las retenidas si es None)
+    def frame(self, rows=None):
+        selected = list(self.rows)[-rows:] if rows else list(self.rows)
+        df = pd.DataFrame(selected)
+        if df.empty:
+            return pd.DataFrame(columns=COLUMNS)
+        df = df.set_index('timestamp')
+        positions = df.pop('position').to_numpy()
+        # Niveles por cuartiles sobre todo el historial recibido
+        price_range = self.highest - self.lowest
+        df.attrs['support_level'] = self.lowest + price_range * 0.25
+        df.attrs['resistance_level'] = self.lowest + price_range * 0.75
+        df['last_broke_resistance'] = self._last_break_column(positions, self.last_break_resistance)
+        df['last_broke_support'] = self._last_break_column(positions, self.last_break_support)
+        df['trend'] = df['trend'].astype(TREND_DTYPE)
+        return compact_frame(df[COLUMNS])
+
+    @staticmethod
+    def _last_break_column(positions, last_break):
+        column = np.full(len(positions), np.nan)
+        if last_break is not None:
+            position, price = last_break
+            column[positions >= position] = price
+        return column
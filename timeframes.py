@@ -0,0 +1,36 @@
+import time
+
+# Duración de cada unidad de timeframe de ccxt en milisegundos
+UNIT_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+# Las velas semanales de Binance abren el lunes; el 1/1/1970 fue jueves
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60 * 1000
+
+
+# Convertir un timeframe de ccxt ('1m', '15m', '4h', '1d') a milisegundos
+def timeframe_to_ms(timeframe):
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in UNIT_MS or not amount.isdigit():
+        raise ValueError(f"Timeframe no soportado: {timeframe}")
+    return int(amount) * UNIT_MS[unit]
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+# Timestamp de apertura de la vela que contiene `timestamp_ms` (también un array de numpy)
+def candle_open(timestamp_ms, timeframe):
+    duration = timeframe_to_ms(timeframe)
+    offset = WEEK_OFFSET_MS if timeframe.endswith('w') else 0
+    return timestamp_ms - (timestamp_ms - offset) % duration
+
+
+# Timestamp de apertura de la última vela cerrada en el instante `timestamp_ms`
+def last_closed_open(timestamp_ms, timeframe):
+    return candle_open(timestamp_ms, timeframe) - timeframe_to_ms(timeframe)
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from timeframes import timeframe_to_ms
+from initial_config import (TIMEFRAME, SIM_STOP_LOSS, SIM_TAKE_PROFIT, SIM_MAX_HOLDING, SIM_FEE, SIM_SLIPPAGE,
+                            SIM_POSITION_SIZE, SIM_ONE_POSITION, SIM_CHUNK_SIZE)
+
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+
+
+# Primera columna en True de cada fila (`none` si la fila no tiene ninguna)
+def _first_true(hits, none):
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), none)
+
+
+# Salida de cada entrada: la primera vela de las `max_holding` siguientes que toca el stop o el
+# objetivo, o la última (stop por tiempo). Si una vela toca ambos se asume el stop. Las entradas
+# se procesan por bloques de `chunk_size` con ventanas deslizantes de máximos y mínimos.
+# Devuelve el índice de la vela de salida, el precio (sin deslizamiento) y el motivo.
+def first_passage_exits(open_, high, low, close, entries, is_long, stop_loss=SIM_STOP_LOSS, take_profit=SIM_TAKE_PROFIT,
+                        max_holding=SIM_MAX_HOLDING, chunk_size=SIM_CHUNK_SIZE):
+    n = len(close)
+    # Sin velas hacia adelante las comparaciones con NaN dan False
+    padding = np.full(max_holding, np.nan)
+    high_windows = sliding_window_view(np.r_[high[1:], padding], max_holding)
+    low_windows = sliding_window_view(np.r_[low[1:], padding], max_holding)
+
+    entry = close[entries]
+    direction = np.where(is_long, 1.0, -1.0)
+    stop = entry * (1 - direction * stop_loss) if stop_loss else np.full(len(entries), np.nan)
+    target = entry * (1 + direction * take_profit) if take_profit else np.full(len(entries), np.nan)
+
+    first_stop = np.full(len(entries), max_holding)
+    first_target = np.full(len(entries), max_holding)
+    for start in range(0, len(entries), chunk_size):
+        rows = slice(start, start + chunk_size)
+        highs, lows = high_windows[entries[rows]], low_windows[entries[rows]]
+        long_rows = is_long[rows, None]
+        if stop_loss:
+            stop_hits = np.where(long_rows, lows <= stop[rows, None], highs >= stop[rows, None])
+            first_stop[rows] = _first_true(stop_hits, max_holding)
+        if take_profit:
+            target_hits = np.where(long_rows, highs >= target[rows, None], lows <= target[rows, None])
+            first_target[rows] = _first_true(target_hits, max_holding)
+
+    # Última vela disponible para el stop por tiempo (antes si el historial termina)
+    last = np.minimum(max_holding, n - 1 - entries) - 1
+    stopped = (first_stop <= first_target) & (first_stop <= last)
+    targeted = ~stopped & (first_target <= last)
+    offset = np.where(stopped, first_stop, np.where(targeted, first_target, last))
+    exit_index = entries + 1 + offset
+
+    # Con un hueco de apertura más allá del nivel, la orden se ejecuta a la apertura
+    exit_open = open_[exit_index]
+    stop_price = np.where(is_long, np.minimum(stop, exit_open), np.maximum(stop, exit_open))
+    target_price = np.where(is_long, np.maximum(target, exit_open), np.minimum(target, exit_open))
+    exit_price = np.where(stopped, stop_price, np.where(targeted, target_price, close[exit_index]))
+    reason = np.where(stopped, 'stop', np.where(targeted, 'target', np.where(last + 1 < max_holding, 'end', 'time')))
+    return exit_index, exit_price, reason
+
+
+# Entradas que no se superponen: cada una empieza en o después de la salida de la anterior
+def _non_overlapping(entries, exit_index):
+    keep = np.zeros(len(entries), dtype=bool)
+    free_from = -1
+    for position, (entry, exit_) in enumerate(zip(entries.tolist(), exit_index.tolist())):
+        if entry >= free_from:
+            keep[position] = True
+            free_from = exit_
+    return keep
+
+
+# Simular operaciones en las velas `entries` (índices, al cierre) en la dirección de `is_long`,
+# con stop-loss, take-profit y stop por tiempo, comisión por lado y deslizamiento en la entrada
+# y la salida. Con `one_position` se ignoran las señales mientras hay una operación abierta.
+# Devuelve {'trades', 'equity', 'drawdown', 'stats'}; el capital empieza en 1 y cada operación
+# arriesga `position_size` del capital al abrirla.
+def simulate_trades(df, entries, is_long, stop_loss=SIM_STOP_LOSS, take_profit=SIM_TAKE_PROFIT, max_holding=SIM_MAX_HOLDING,
+                    fee=SIM_FEE, slippage=SIM_SLIPPAGE, position_size=SIM_POSITION_SIZE, one_position=SIM_ONE_POSITION,
+                    timeframe=TIMEFRAME):
+    open_, high, low, close = (df[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close'))
+    entries = np.asarray(entries, dtype=np.int64)
+    is_long = np.asarray(is_long, dtype=bool)
+    order = np.argsort(entries, kind='stable')
+    entries, is_long = entries[order], is_long[order]
+    # La última vela no tiene velas siguientes para salir
+    valid = entries < len(close) - 1
+    entries, is_long = entries[valid], is_long[valid]
+
+    exit_index, exit_price, reason = first_passage_exits(open_, high, low, close, entries, is_long, stop_loss, take_profit,
+                                                         max_holding)
+    if one_position:
+        keep = _non_overlapping(entries, exit_index)
+        entries, is_long, exit_index, exit_price, reason = entries[keep], is_long[keep], exit_index[keep], exit_price[keep], reason[keep]
+
+    entry_fill = close[entries] * np.where(is_long, 1 + slippage, 1 - slippage)
+    exit_fill = exit_price * np.where(is_long, 1 - slippage, 1 + slippage)
+    ratio = exit_fill / entry_fill
+    gross = np.where(is_long, ratio - 1, 1 - ratio)
+    # Comisión sobre el valor de la entrada y de la salida, relativa al valor de la entrada
+    net = gross - fee * (1 + ratio)
+
+    trades = pd.DataFrame({
+        'entry_time': df.index[entries],
+        'exit_time': df.index[exit_index],
+        'signal': np.where(is_long, 'LONG', 'SHORT'),
+        'entry_price': entry_fill,
+        'exit_price': exit_fill,
+        'exit_reason': reason,
+        'holding': exit_index - entries,
+        'return_pct': net * 100,
+    })
+
+    # Capital al cierre de cada vela: el resultado de cada operación se aplica en su vela de salida
+    growth = np.zeros(len(close))
+    np.add.at(growth, exit_index, np.log1p(np.maximum(position_size * net, -1 + 1e-12)))
+    equity = pd.Series(np.exp(np.cumsum(growth)), index=df.index, name='equity')
+    drawdown = (equity / equity.cummax() - 1).rename('drawdown')
+    stats = simulation_stats(trades, equity, drawdown, timeframe)
+    return {'trades': trades, 'equity': equity, 'drawdown': drawdown, 'stats': stats}
+
+
+# Estadísticas de una simulación: resultado por operación, drawdown máximo y Sharpe anualizado
+# (rendimientos por vela del capital, mercado abierto todo el año)
+def simulation_stats(trades, equity, drawdown, timeframe=TIMEFRAME):
+    returns = trades['return_pct'].to_numpy() / 100
+    gains, losses = returns[returns > 0].sum(), -returns[returns < 0].sum()
+    candle_returns = equity.pct_change().fillna(0).to_numpy()
+    deviation = candle_returns.std()
+    periods = YEAR_MS / timeframe_to_ms(timeframe)
+    is_long = trades['signal'] == 'LONG'
+    return {
+        'trades': len(trades),
+        'long_trades': int(is_long.sum()),
+        'short_trades': int((~is_long).sum()),
+        'win_rate': float((returns > 0).mean() * 100) if len(returns) else 0.0,
+        'avg_return': float(returns.mean() * 100) if len(returns) else 0.0,
+        'total_return': float((equity.iloc[-1] - 1) * 100) if len(equity) else 0.0,
+        'profit_factor': float(gains / losses) if losses > 0 else float('inf') if gains > 0 else 0.0,
+        'max_drawdown': float(drawdown.min() * 100) if len(drawdown) else 0.0,
+        'sharpe': float(candle_returns.mean() / deviation * np.sqrt(periods)) if deviation > 0 else 0.0,
+        'avg_holding': float(trades['holding'].mean()) if len(trades) else 0.0,
+        'exits': {str(key): int(value) for key, value in trades['exit_reason'].value_counts().items()},
+    }
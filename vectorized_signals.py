@@ -0,0 +1,284 @@
+import numpy as np
+import pandas as pd
+from strategy_params import resolve_params
+from indicator_registry import enabled_rules
+from compact_frame import TREND_CATEGORIES, TREND_DTYPE
+from initial_config import PIVOT_WINDOW, KEY_LEVELS_LOOKBACK, KEY_LEVELS_TOLERANCE
+
+# Velas excluidas en cada extremo de la ventana al buscar pivotes (igual que bot.identify_key_levels)
+KEY_LEVELS_MARGIN = 5
+
+# Tamaño de bloque (en velas) para acotar la memoria al armar las matrices de candidatos
+CHUNK_SIZE = 65536
+
+
+# Cantidad de velas a la derecha que necesita la ventana centrada de pivotes.
+# rolling(window, center=True) cubre [j - window//2, j + (window-1)//2], por lo que
+# un pivote en j recién es visible cuando existe la vela j + (window-1)//2.
+def pivot_confirmation_lag(window=PIVOT_WINDOW):
+    return (window - 1) // 2
+
+
+# Última ruptura de nivel visible en cada vela sin mirar al futuro.
+# broke[k] usa is_resistance/is_support de k-1, que sólo se conoce en t >= k-1+lag,
+# por eso en la vela t sólo cuentan las rupturas con k <= t - lag + 1.
+# Las rupturas anteriores a `since` se ignoran; sin rupturas visibles se usa `initial`
+# (la última ruptura previa, por ejemplo la guardada al retomar un backtesting).
+def _last_break_values(broke, prices, lag, since=0, initial=np.nan):
+    n = len(broke)
+    positions = np.where(broke & (np.arange(n) >= since), np.arange(n), -1)
+    last_pos = np.maximum.accumulate(positions) if n else positions
+    visible_at = np.arange(n) - lag + 1
+    values = np.full(n, initial, dtype=float)
+    ok = visible_at >= 0
+    k = np.full(n, -1)
+    k[ok] = last_pos[visible_at[ok]]
+    has_break = k >= 0
+    values[has_break] = prices[k[has_break]]
+    return values
+
+
+# Toques de cada pivote para cada vela en la que el pivote es candidato.
+# Devuelve una matriz (pivotes, velas candidatas) con los toques contados
+# sobre la ventana [t - lookback + 1, t] igual que identify_key_levels.
+def _pivot_touches(pivots, prices, first_offset, lookback, tolerance):
+    n = len(prices)
+    last_offset = lookback - KEY_LEVELS_MARGIN - 1
+    span = np.arange(first_offset - lookback + 1, last_offset + 1)
+    touches = np.zeros((len(pivots), last_offset - first_offset + 1), dtype=np.int32)
+
+    for start in range(0, len(pivots), 8192):
+        block = pivots[start:start + 8192]
+        level = prices[block]
+        k = block[:, None] + span[None, :]
+        inside = (k >= 0) & (k < n)
+        window_prices = prices[np.clip(k, 0, n - 1)]
+        hits = (inside & (np.abs(window_prices - level[:, None]) < level[:, None] * tolerance)).astype(np.int32)
+        cum = np.zeros((len(block), hits.shape[1] + 1), dtype=np.int32)
+        np.cumsum(hits, axis=1, out=cum[:, 1:])
+        # Para t = j + e la ventana cubre d en [e - lookback + 1, e]
+        e = np.arange(first_offset, last_offset + 1)
+        upper = e - span[0] + 1
+        lower = e - lookback + 1 - span[0]
+        touches[start:start + len(block)] = cum[:, upper] - cum[:, lower]
+    return touches
+
+
+# Niveles clave vistos en cada vela (equivalente a identify_key_levels vela a vela)
+# y cantidad de niveles a menos del 1% del precio de cierre.
+def _levels_near_price(is_pivot, prices, dynamic_levels, close, lookback, lag, tolerance):
+    n = len(prices)
+    near_count = np.zeros(n, dtype=np.int32)
+    first_offset = max(KEY_LEVELS_MARGIN, lag)
+    last_offset = lookback - KEY_LEVELS_MARGIN - 1
+    pivots = np.flatnonzero(is_pivot)
+    pivots = pivots[pivots >= KEY_LEVELS_MARGIN]
+
+    if len(pivots) and last_offset >= first_offset:
+        touches = _pivot_touches(pivots, prices, first_offset, lookback, tolerance)
+    else:
+        touches = np.zeros((0, 0), dtype=np.int32)
+
+    for start in range(0, n, CHUNK_SIZE):
+        t = np.arange(start, min(start + CHUNK_SIZE, n))
+        # Pivotes candidatos en la vela t: posiciones [t - last_offset, t - first_offset]
+        lo = np.searchsorted(pivots, t - last_offset, side='left')
+        hi = np.searchsorted(pivots, t - first_offset, side='right')
+        width = int((hi - lo).max()) if len(t) and last_offset >= first_offset else 0
+
+        slots = lo[:, None] + np.arange(width)[None, :]
+        valid = slots < hi[:, None]
+        slots = np.where(valid, slots, 0)
+        level_price = np.zeros(slots.shape)
+        level_touches = np.full(slots.shape, -1, dtype=np.int32)
+        if width:
+            pos = pivots[slots]
+            level_price = prices[pos]
+            offset = np.clip(t[:, None] - pos - first_offset, 0, touches.shape[1] - 1)
+            level_touches = np.where(valid, touches[slots, offset], -1)
+        qualified = level_touches >= 2
+        level_touches = np.where(qualified, level_touches, -1)
+
+        # Nivel dinámico (última ruptura) si no coincide con un nivel ya detectado
+        dyn = dynamic_levels[t]
+        has_dyn = ~np.isnan(dyn)
+        if width:
+            close_to_existing = (qualified & (np.abs(level_price - dyn[:, None]) < dyn[:, None] * tolerance)).any(axis=1)
+            has_dyn &= ~close_to_existing
+        level_price = np.column_stack([level_price, np.where(has_dyn, dyn, 0.0)])
+        level_touches = np.column_stack([level_touches, np.where(has_dyn, 1, -1)])
+
+        # Top 3 por toques conservando el orden original en empates
+        order = np.argsort(-level_touches, axis=1, kind='stable')[:, :3]
+        top_touches = np.take_along_axis(level_touches, order, axis=1)
+        top_price = np.take_along_axis(level_price, order, axis=1)
+        price = close[t][:, None]
+        near = (top_touches > 0) & (0.99 * top_price <= price) & (price <= 1.01 * top_price)
+        near_count[t] = near.sum(axis=1)
+    return near_count
+
+
+# Cantidad de soportes y resistencias clave a menos del 1% del cierre en cada vela.
+# No depende de los parámetros de la estrategia, por lo que se puede calcular una sola
+# vez y pasar como levels_near a compute_signal_counts al probar varios parámetros.
+# `break_levels` reemplaza las últimas rupturas calculadas por last_break_levels(df).
+def key_level_counts(df, break_levels=None):
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    is_support = df['is_support'].to_numpy().astype(bool)
+    is_resistance = df['is_resistance'].to_numpy().astype(bool)
+    lag = pivot_confirmation_lag()
+    last_broke_resistance, last_broke_support = last_break_levels(df) if break_levels is None else break_levels
+
+    supports_near = _levels_near_price(is_support, low, last_broke_resistance, close,
+                                       KEY_LEVELS_LOOKBACK, lag, KEY_LEVELS_TOLERANCE)
+    resistances_near = _levels_near_price(is_resistance, high, last_broke_support, close,
+                                          KEY_LEVELS_LOOKBACK, lag, KEY_LEVELS_TOLERANCE)
+    return supports_near, resistances_near
+
+
+# Precio de la última ruptura de resistencia y de soporte visible en cada vela. Con `since`
+# sólo cuentan las rupturas desde esa fila y antes se usan las de `initial` (resistencia,
+# soporte): así un tramo del historial continúa las rupturas de las velas anteriores.
+def last_break_levels(df, since=0, initial=(np.nan, np.nan)):
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    is_support = df['is_support'].to_numpy().astype(bool)
+    is_resistance = df['is_resistance'].to_numpy().astype(bool)
+    lag = pivot_confirmation_lag()
+
+    prev_close, prev_high, prev_low = (np.r_[np.nan, values[:-1]] for values in (close, high, low))
+    prev_support = np.r_[False, is_support[:-1]]
+    prev_resistance = np.r_[False, is_resistance[:-1]]
+
+    broke_resistance = (close > prev_close) & prev_resistance & (close > prev_high)
+    broke_support = (close < prev_close) & prev_support & (close < prev_low)
+    return (_last_break_values(broke_resistance, high, lag, since, initial[0]),
+            _last_break_values(broke_support, low, lag, since, initial[1]))
+
+
+# Valor de la vela anterior sobre el último eje (la primera vela se compara consigo misma)
+def previous(values):
+    out = np.empty_like(values)
+    if values.shape[-1]:
+        out[..., 0] = values[..., 0]
+        out[..., 1:] = values[..., :-1]
+    return out
+
+
+# Máscaras long/short de cada regla activa de analyze_signals, sin los niveles clave.
+# col(name, dtype) devuelve la columna como array con el tiempo en el último eje: una serie
+# (velas) o una matriz (símbolos × velas); 'trend' se lee como códigos de TREND_CATEGORIES.
+def rule_masks(col, params, rules):
+    close = col('close')
+    prev_close = np.empty_like(close)
+    prev_close[..., :1] = np.nan
+    prev_close[..., 1:] = close[..., :-1]
+    prev = previous
+
+    def trend(value):
+        return col('trend', np.int8) == TREND_CATEGORIES.index(value)
+
+    long_rules = []
+    short_rules = []
+
+    # Cruce de medias móviles
+    if 'ma_cross' in rules:
+        sma_fast, sma_slow = col('sma_fast'), col('sma_slow')
+        long_ma = (prev(sma_fast) <= prev(sma_slow)) & (sma_fast > sma_slow)
+        long_rules.append(long_ma)
+        short_rules.append(~long_ma & (prev(sma_fast) >= prev(sma_slow)) & (sma_fast < sma_slow))
+    # RSI
+    if 'rsi' in rules:
+        rsi = col('rsi')
+        long_rsi = (prev(rsi) < params['rsi_oversold']) & (rsi > params['rsi_oversold'])
+        long_rules.append(long_rsi)
+        short_rules.append(~long_rsi & (prev(rsi) > params['rsi_overbought']) & (rsi < params['rsi_overbought']))
+    # MACD
+    if 'macd' in rules:
+        macd, macd_signal = col('macd'), col('macd_signal')
+        long_macd = (prev(macd) <= prev(macd_signal)) & (macd > macd_signal)
+        long_rules.append(long_macd)
+        short_rules.append(~long_macd & (prev(macd) >= prev(macd_signal)) & (macd < macd_signal))
+    # ADX y direccionales
+    if 'adx' in rules:
+        adx, di_plus, di_minus = col('adx'), col('di_plus'), col('di_minus')
+        strong = adx > params['adx_threshold']
+        long_adx = strong & (di_plus > di_minus)
+        long_rules.append(long_adx)
+        short_rules.append(strong & ~long_adx & (di_minus > di_plus))
+    # Bollinger
+    if 'bollinger' in rules:
+        long_bb = close < col('bollinger_low')
+        long_rules.append(long_bb)
+        short_rules.append(~long_bb & (close > col('bollinger_high')))
+
+    # Volumen: sólo genera señal nueva si ninguna regla anterior la generó
+    if 'volume' in rules:
+        any_before = np.logical_or.reduce(long_rules + short_rules) if long_rules else np.zeros(close.shape, dtype=bool)
+        high_volume = (col('volume_ratio') > params['volume_threshold']) & ~any_before
+        long_volume = high_volume & (close > prev_close * 1.01)
+        long_rules.append(long_volume)
+        short_rules.append(high_volume & ~long_volume & (close < prev_close * 0.99))
+
+    # Agotamiento por volumen decreciente
+    if 'volume_exhaustion' in rules:
+        volume_decreasing = col('volume_decreasing_trend', bool)
+        long_rules.append(volume_decreasing & trend('BEARISH'))
+        short_rules.append(volume_decreasing & trend('BULLISH'))
+
+    # Ichimoku
+    if 'ichimoku' in rules:
+        above_cloud, below_cloud = col('above_cloud', bool), col('below_cloud', bool)
+        conversion, base = col('ichimoku_conversion_line'), col('ichimoku_base_line')
+        long_rules.append(above_cloud & (conversion > base))
+        short_rules.append(~above_cloud & below_cloud & (conversion < base))
+
+    # Kumo futuro
+    if 'kumo' in rules:
+        cloud_bullish, cloud_bearish = col('future_cloud_bullish', bool), col('future_cloud_bearish', bool)
+        long_kumo = cloud_bullish & ~prev(cloud_bullish)
+        long_rules.append(long_kumo)
+        short_rules.append(~long_kumo & cloud_bearish & ~prev(cloud_bearish))
+
+    return long_rules, short_rules
+
+
+# Cantidad de reglas long y short que se cumplen en cada vela (la primera vela queda en 0)
+def count_rules(long_rules, short_rules, shape):
+    long_count = np.sum(long_rules, axis=0, dtype=np.int32) if long_rules else np.zeros(shape, dtype=np.int32)
+    short_count = np.sum(short_rules, axis=0, dtype=np.int32) if short_rules else np.zeros(shape, dtype=np.int32)
+    long_count[..., :1] = 0
+    short_count[..., :1] = 0
+    return long_count, short_count
+
+
+# Evaluar las reglas de analyze_signals como máscaras sobre el historial completo.
+# df debe tener los indicadores calculados una sola vez con apply_technical_indicators.
+# Devuelve un DataFrame con long_count y short_count por vela, iguales a los que
+# obtendría analyze_signals(df.iloc[:i+1], params=params, rules=rules) con sus niveles
+# clave en cada vela i. Sólo se leen las columnas de las reglas activas.
+def compute_signal_counts(df, key_levels=True, params=None, levels_near=None, rules=None):
+    params = resolve_params(params)
+    rules = enabled_rules(rules)
+    n = len(df)
+
+    def col(name, dtype=float):
+        if name == 'trend':
+            return pd.Categorical(df['trend'], dtype=TREND_DTYPE).codes
+        return df[name].to_numpy(dtype=dtype)
+
+    long_count, short_count = count_rules(*rule_masks(col, params, rules), n)
+
+    # Soportes y resistencias
+    if key_levels and 'key_levels' in rules and n > 1:
+        bullish = col('trend') == TREND_CATEGORIES.index('BULLISH')
+        bearish = col('trend') == TREND_CATEGORIES.index('BEARISH')
+        macd_histogram = col('macd_histogram')
+        supports_near, resistances_near = key_level_counts(df) if levels_near is None else levels_near
+        long_count[1:] += np.where(bullish | (macd_histogram > 0), supports_near, 0).astype(np.int32)[1:]
+        short_count[1:] += np.where(bearish | (macd_histogram < 0), resistances_near, 0).astype(np.int32)[1:]
+
+    return pd.DataFrame({'long_count': long_count, 'short_count': short_count}, index=df.index)